@@ -1,21 +1,293 @@
-import psycopg2
-from flask import Flask, render_template, request, redirect, flash
+from flask import Flask, render_template, request, redirect, flash, g, url_for, has_app_context, stream_with_context
 from dotenv import load_dotenv
 from flask_sqlalchemy import SQLAlchemy
-from sqlalchemy.dialects.postgresql import ENUM
-from sqlalchemy import CheckConstraint
+from flask_sqlalchemy.session import Session
+from sqlalchemy.dialects.postgresql import ENUM, DATERANGE
+from sqlalchemy import CheckConstraint, create_engine
+from sqlalchemy.pool import QueuePool
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+import base64
+import csv
+import gzip
+import hashlib
+import heapq
+import io
+import json
 import os
-from flask import jsonify
-from sqlalchemy import func
+import psycopg2
+import threading
+import time
+from contextlib import contextmanager
+from datetime import date, timedelta
+from decimal import Decimal
+from flask import jsonify, Response
+from sqlalchemy import func, String, Enum, cast, tuple_, and_, or_
+from fleet_index import FleetIndex, CarIntervals
+from csv_import import IMPORTS, CsvImportError, import_csv
+from reference_cache import ReferenceCache
+from change_listener import ChangeListener
+from revenue_merger import RevenueMerger
+from metrics import RouteMetrics, begin_request, end_request
+from query_audit import AuditedCursor, query_audit
+from replicas import ReplicaSet
+from utilization import Utilization, free_cars_per_day
+
+
+class MonitoredPool(QueuePool):
+    """
+    Pula połączeń SQLAlchemy zbierająca statystyki pobierania połączeń.
+
+    Wspólna dla zapytań ORM i surowych kursorów psycopg2 (patrz `get_db`). Pozwala dobrać rozmiar puli
+    do liczby workerów gunicorna na podstawie czasu oczekiwania i liczby połączeń w użyciu.
+
+    Attributes:
+        pobrania (int): Liczba udanych pobrań połączenia z puli.
+        przekroczenia_czasu (int): Liczba pobrań zakończonych przekroczeniem `pool_timeout`.
+        laczny_czas_oczekiwania (float): Suma czasów pobrania połączenia w sekundach.
+        maks_czas_oczekiwania (float): Najdłuższy czas pobrania połączenia w sekundach.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._stats_lock = threading.Lock()
+        self.pobrania = 0
+        self.przekroczenia_czasu = 0
+        self.laczny_czas_oczekiwania = 0.0
+        self.maks_czas_oczekiwania = 0.0
+
+    def connect(self):
+        start = time.perf_counter()
+        try:
+            connection = super().connect()
+        except PoolTimeoutError:
+            with self._stats_lock:
+                self.przekroczenia_czasu += 1
+            raise
+        czas = time.perf_counter() - start
+        with self._stats_lock:
+            self.pobrania += 1
+            self.laczny_czas_oczekiwania += czas
+            self.maks_czas_oczekiwania = max(self.maks_czas_oczekiwania, czas)
+        return connection
+
+    def stats(self):
+        """
+        Zwraca bieżący stan puli.
+
+        Returns:
+            dict: Rozmiar i limit puli, liczba połączeń w użyciu i wolnych oraz statystyki czasu oczekiwania.
+        """
+        with self._stats_lock:
+            return {
+                'rozmiar': self.size(),
+                'limit': self.size() + self._max_overflow,
+                'w_uzyciu': self.checkedout(),
+                'wolne': self.checkedin(),
+                'nadmiarowe': max(self.overflow(), 0),
+                'pobrania': self.pobrania,
+                'przekroczenia_czasu': self.przekroczenia_czasu,
+                'sredni_czas_oczekiwania_ms': round(1000 * self.laczny_czas_oczekiwania / self.pobrania, 3) if self.pobrania else 0.0,
+                'maks_czas_oczekiwania_ms': round(1000 * self.maks_czas_oczekiwania, 3),
+            }
+
+
+class RoutingSession(Session):
+    """
+    Sesja ORM wykonująca zapytania tras tylko do odczytu na replice wybranej dla żądania (`g.read_engine`).
+
+    Zapis (flush) zawsze trafia na serwer główny.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        engine = g.get('read_engine') if has_app_context() else None
+        if engine is not None and bind is None and not self._flushing:
+            return engine
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
 
 load_dotenv()
 DB_URL = os.getenv('DATABASE_URL') 
+query_audit.configure(os.getenv('QUERY_AUDIT', 'off'), int(os.getenv('QUERY_AUDIT_THRESHOLD', 5)))
 app = Flask(__name__)
 app.debug = True
 app.config['SQLALCHEMY_DATABASE_URI'] = DB_URL
-conn = psycopg2.connect(DB_URL)
+app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {
+    'poolclass': MonitoredPool,
+    'pool_size': int(os.getenv('DB_POOL_SIZE', 5)),
+    'max_overflow': int(os.getenv('DB_POOL_MAX_OVERFLOW', 10)),
+    'pool_timeout': int(os.getenv('DB_POOL_TIMEOUT', 30)),
+    'pool_recycle': int(os.getenv('DB_POOL_RECYCLE', 1800)),
+    'pool_pre_ping': True,
+    # Kursor audytu jest zawsze włączony, aby `query_audit.capture()` działało także bez QUERY_AUDIT;
+    # poza żądaniem lub blokiem `capture()` rejestracja zapytania nic nie robi.
+    'connect_args': {'cursor_factory': AuditedCursor},
+}
 app.secret_key = os.urandom(24)
-db = SQLAlchemy(app)
+db = SQLAlchemy(app, session_options={'class_': RoutingSession})
+REPLICA_URLS = [url.strip() for url in os.getenv('REPLICA_URLS', '').split(',') if url.strip()]
+REPLICA_PIN_SECONDS = int(os.getenv('REPLICA_PIN_SECONDS', 10))
+REPLICA_PIN_COOKIE = 'odczyt_z_glownej'
+# Sprawdzenie repliki wykonuje się w trakcie żądania, więc połączenie z repliką, która nie odpowiada
+# (np. gubi pakiety zamiast odrzucać połączenia), nie może czekać na systemowy limit TCP.
+REPLICA_ENGINE_OPTIONS = dict(app.config['SQLALCHEMY_ENGINE_OPTIONS'], connect_args=dict(
+    app.config['SQLALCHEMY_ENGINE_OPTIONS']['connect_args'],
+    connect_timeout=int(os.getenv('REPLICA_CONNECT_TIMEOUT', 2))))
+replicas = ReplicaSet(
+    [create_engine(url, **REPLICA_ENGINE_OPTIONS) for url in REPLICA_URLS],
+    check_interval=float(os.getenv('REPLICA_CHECK_INTERVAL', 10)),
+    retry_interval=float(os.getenv('REPLICA_RETRY_INTERVAL', 30)),
+) if REPLICA_URLS else None
+query_audit.install(db.session)
+fleet_index = FleetIndex(
+    max_age=int(os.getenv('FLEET_INDEX_MAX_AGE', 300)),
+    history_days=int(os.getenv('FLEET_INDEX_HISTORY_DAYS', 30)),
+) if os.getenv('FLEET_INDEX_ENABLED') == '1' else None
+BULK_ORDER_MAX = int(os.getenv('BULK_ORDER_MAX', 1000))
+EXPORT_CHUNK_SIZE = int(os.getenv('EXPORT_CHUNK_SIZE', 5000))
+reference_cache = ReferenceCache(
+    max_entries=int(os.getenv('REFERENCE_CACHE_SIZE', 256)),
+    ttl=float(os.getenv('REFERENCE_CACHE_TTL', 300)),
+)
+route_metrics = RouteMetrics()
+utilization_cache = ReferenceCache(
+    max_entries=int(os.getenv('UTILIZATION_CACHE_SIZE', 16)),
+    ttl=float(os.getenv('UTILIZATION_CACHE_TTL', 300)),
+)
+UTILIZATION_MAX_PERIODS = int(os.getenv('UTILIZATION_MAX_PERIODS', 400))
+CALENDAR_MAX_DAYS = int(os.getenv('CALENDAR_MAX_DAYS', 366))
+
+
+def request_engine():
+    """
+    Zwraca silnik, na którym wykonywane są zapytania bieżącego żądania: replikę wybraną dla trasy
+    tylko do odczytu albo serwer główny.
+    """
+    return g.get('read_engine') or db.engine
+
+
+def get_db():
+    """
+    Zwraca połączenie psycopg2 przypisane do bieżącego żądania.
+
+    Połączenie jest pobierane z puli silnika SQLAlchemy (repliki dla tras tylko do odczytu, patrz
+    `route_reads`) przy pierwszym wywołaniu w danym żądaniu i oddawane w `close_db`. Pula sprawdza
+    połączenie przed wydaniem (`pool_pre_ping`), więc zerwane połączenia są odtwarzane automatycznie.
+
+    Returns:
+        Connection: Połączenie DBAPI z puli.
+    """
+    key = 'db_read_conn' if g.get('read_engine') is not None else 'db_conn'
+    if key not in g:
+        setattr(g, key, request_engine().raw_connection())
+    return g.get(key)
+
+
+@contextmanager
+def on_primary():
+    """
+    Kieruje zapytania wykonywane w bloku (ORM i `get_db`) na serwer główny także w trasie tylko do odczytu.
+    """
+    engine = g.pop('read_engine', None)
+    try:
+        yield
+    finally:
+        if engine is not None:
+            g.read_engine = engine
+
+
+@app.teardown_appcontext
+def close_db(exception):
+    """
+    Oddaje połączenie żądania do puli.
+
+    Przy zwrocie pula wycofuje niezakończoną transakcję, dzięki czemu błąd w jednym żądaniu
+    nie psuje połączenia dla kolejnych.
+
+    Args:
+        exception (Exception): Wyjątek, który zakończył żądanie (lub None).
+    """
+    for key in ('db_conn', 'db_read_conn'):
+        connection = g.pop(key, None)
+        if connection is not None:
+            connection.close()
+
+
+# Widoki, które tylko odczytują dane (także wyszukiwania wysyłane metodą POST), kierowane na repliki.
+READ_ONLY_ENDPOINTS = frozenset({
+    'car_details', 'clients_details', 'clients_search', 'rentals_details', 'orders_details', 'payment_details',
+    'get_raport', 'available_cars_search', 'available_cars_calendar', 'popular_cars_search', 'workers_load', 'export_data',
+    'api_list', 'api_detail', 'api_available_cars', 'api_popular_cars', 'utilization_search', 'api_utilization',
+})
+
+
+@app.before_request
+def route_reads():
+    """
+    Wybiera replikę dla trasy tylko do odczytu.
+
+    Przez `REPLICA_PIN_SECONDS` sekund po zapisie (ciasteczko `REPLICA_PIN_COOKIE`) odczyty klienta trafiają
+    na serwer główny, aby np. lista wypożyczeń po przekierowaniu z `/rentals/add` zawierała nowe wypożyczenie
+    mimo opóźnienia replikacji.
+    """
+    if replicas is None or request.endpoint not in READ_ONLY_ENDPOINTS or request.cookies.get(REPLICA_PIN_COOKIE):
+        return
+    g.read_engine = replicas.choose()
+
+
+@app.after_request
+def pin_primary_after_write(response):
+    """
+    Po żądaniu zapisującym ustawia ciasteczko kierujące kolejne odczyty klienta na serwer główny.
+    """
+    if replicas is not None and request.method not in ('GET', 'HEAD', 'OPTIONS') and request.endpoint not in READ_ONLY_ENDPOINTS:
+        response.set_cookie(REPLICA_PIN_COOKIE, '1', max_age=REPLICA_PIN_SECONDS, httponly=True, samesite='Lax')
+    return response
+
+
+@app.before_request
+def start_request_metrics():
+    """
+    Rozpoczyna pomiar czasu żądania i zapytań SQL wykonanych w jego trakcie.
+    """
+    g.request_started = time.perf_counter()
+    begin_request()
+    if query_audit.enabled:
+        query_audit.begin()
+
+
+@app.after_request
+def remember_response_status(response):
+    """
+    Zapamiętuje kod odpowiedzi dla `record_request_metrics`, a w trybie audytu zapytań (QUERY_AUDIT)
+    dołącza do odpowiedzi liczbę zapytań, powtórzeń i leniwych ładowań relacji.
+    """
+    g.response_status = response.status_code
+    if query_audit.enabled:
+        report = query_audit.end()
+        if report is not None:
+            response.headers['X-Zapytania-SQL'] = str(report.total)
+            response.headers['X-Powtorzone-Zapytania'] = str(sum(count - 1 for _, count in report.repeated))
+            response.headers['X-Leniwe-Ladowania'] = str(sum(report.lazy_loads.values()))
+    return response
+
+
+@app.teardown_request
+def record_request_metrics(exception):
+    """
+    Zapisuje czas obsługi żądania oraz liczbę, czas i wiersze zapytań SQL w `route_metrics`.
+
+    Args:
+        exception (Exception): Wyjątek, który zakończył żądanie (lub None); takie żądanie liczone jest jako 500.
+    """
+    stats = end_request()
+    if query_audit.enabled:
+        query_audit.end()
+    started = g.pop('request_started', None)
+    if started is None:
+        return
+    status = 500 if exception is not None else g.pop('response_status', 500)
+    route_metrics.record(request.endpoint or 'nieznany', request.method, status, time.perf_counter() - started, stats)
+
 
 class Brand(db.Model):
     __tablename__ = 'marki'
@@ -25,7 +297,7 @@ class Brand(db.Model):
 
     id_marka = db.Column(db.Integer, primary_key = True)
     nazwa_marki = db.Column(db.String(64), nullable=False, unique=True)
-    model_b = db.relationship('Model', back_populates='marka')
+    model_b = db.relationship('Model', back_populates='marka', passive_deletes=True)
 
 
 class Model(db.Model):
@@ -54,9 +326,9 @@ class Model(db.Model):
     id_marka = db.Column(db.Integer, db.ForeignKey('wypozyczalnia.marki.id_marka'), nullable=False)
     id_klasa = db.Column(db.Integer, db.ForeignKey('wypozyczalnia.klasa.id_klasa'), nullable=False) 
     marka = db.relationship('Brand', back_populates="model_b")
-    auta = db.relationship('Car', back_populates='model_a')
+    auta = db.relationship('Car', back_populates='model_a', passive_deletes=True)
     klasa = db.relationship('CarClass', back_populates='model_k')
-    zamowienia = db.relationship('Order', back_populates='model')
+    zamowienia = db.relationship('Order', back_populates='model', passive_deletes=True)
 
 
 class CarClass(db.Model):
@@ -77,8 +349,8 @@ class CarClass(db.Model):
     id_klasa = db.Column(db.Integer, primary_key = True)				
     nazwa = db.Column(db.String(32), nullable=False, unique=True)
     opis = db.Column(db.Text, nullable=True)
-    model_k = db.relationship('Model', back_populates='klasa')
-    cennik = db.relationship('PriceList', back_populates='klasa_p')
+    model_k = db.relationship('Model', back_populates='klasa', passive_deletes=True)
+    cennik = db.relationship('PriceList', back_populates='klasa_p', passive_deletes=True)
 
     
 
@@ -106,7 +378,7 @@ class Car(db.Model):
     numer_rejestracyjny = db.Column(db.String(50), nullable=False, unique=True)
     rok = db.Column(db.Integer, nullable=False)
     model_a  = db.relationship('Model', back_populates="auta")
-    wypozyczenia = db.relationship('Rental', back_populates = 'auto')
+    wypozyczenia = db.relationship('Rental', back_populates = 'auto', passive_deletes=True)
 
 class Client(db.Model):
     """
@@ -131,8 +403,8 @@ class Client(db.Model):
     imie = db.Column(db.String(64), nullable=False)
     nazwisko = db.Column(db.String(64), nullable=False)
     telefon = db.Column(db.String(20), nullable=False, unique=True)
-    wypozyczenia = db.relationship('Rental', back_populates='klient')
-    zamowienia = db.relationship('Order', back_populates='klient')
+    wypozyczenia = db.relationship('Rental', back_populates='klient', passive_deletes=True)
+    zamowienia = db.relationship('Order', back_populates='klient', passive_deletes=True)
 
     
 class Job(db.Model):
@@ -157,7 +429,7 @@ class Job(db.Model):
     nazwa = db.Column(db.String(64), nullable=False)
     wyplata = db.Column(db.Numeric(10, 2), nullable=False)
     czy_moze_wynajmowac = db.Column(db.Boolean, nullable=False, default=False)
-    stanowisko = db.relationship('Employee', back_populates = 'rola')
+    stanowisko = db.relationship('Employee', back_populates = 'rola', passive_deletes=True)
 
 class Employee(db.Model):
     """
@@ -185,7 +457,7 @@ class Employee(db.Model):
     telefon = db.Column(db.String(20), nullable=False, unique=True)
     id_rola = db.Column(db.Integer, db.ForeignKey('wypozyczalnia.role.id_rola'), nullable=False) 
     rola  = db.relationship('Job', back_populates="stanowisko")
-    wypozyczenia = db.relationship('Rental', back_populates='pracownik')
+    wypozyczenia = db.relationship('Rental', back_populates='pracownik', passive_deletes=True)
 
 
 class PriceList(db.Model):
@@ -218,6 +490,7 @@ class Rental(db.Model):
         id_wypozyczenia (int): Klucz główny, identyfikator wypożyczenia.
         data_wypozyczenia (date): Data rozpoczęcia wypożyczenia.
         data_oddania (date): Data zakończenia wypożyczenia.
+        okres (DateRange): Okres wypożyczenia jako przedział dat (kolumna generowana, indeks GiST).
         id_klient (int): Identyfikator klienta, klucz obcy do tabeli `klienci`.
         id_auto (int): Identyfikator auta, klucz obcy do tabeli `auta`.
         id_pracownik (int): Identyfikator pracownika, klucz obcy do tabeli `pracownicy`.
@@ -234,6 +507,7 @@ class Rental(db.Model):
     id_wypozyczenia = db.Column(db.Integer, primary_key=True)
     data_wypozyczenia = db.Column(db.Date, nullable=False)
     data_oddania = db.Column(db.Date, nullable=False)
+    okres = db.Column(DATERANGE, db.Computed("daterange(data_wypozyczenia, data_oddania, '[]')"))
     
     id_klient = db.Column(db.Integer, db.ForeignKey('wypozyczalnia.klienci.id_klient'), nullable=False)
     id_auto = db.Column(db.Integer, db.ForeignKey('wypozyczalnia.auta.id_auto'), nullable=False)
@@ -242,7 +516,7 @@ class Rental(db.Model):
     klient = db.relationship('Client', back_populates='wypozyczenia')
     auto = db.relationship('Car', back_populates='wypozyczenia')
     pracownik = db.relationship('Employee', back_populates='wypozyczenia')
-    platnosc = db.relationship('Payment', back_populates='wypozyczenia')
+    platnosc = db.relationship('Payment', back_populates='wypozyczenia', passive_deletes=True)
 
 
 status_enum = ENUM('udane', 'nieudane', 'oczekujące', name='status_enum', schema='wypozyczalnia')
@@ -296,11 +570,11 @@ class CarDetails(db.Model):
     )
 
     id_auto = db.Column(db.Integer, primary_key=True)
-    nazwa_modelu = db.Column(db.String(64))
-    nazwa_marki = db.Column(db.String(64))
-    numer_rejestracyjny = db.Column(db.String(50))
-    id_klasa = db.Column(db.Integer)
-    nazwa_klasy = db.Column(db.String(32)) 
+    nazwa_modelu = db.Column(db.String(64), nullable=False)
+    nazwa_marki = db.Column(db.String(64), nullable=False)
+    numer_rejestracyjny = db.Column(db.String(50), nullable=False)
+    id_klasa = db.Column(db.Integer, nullable=False)
+    nazwa_klasy = db.Column(db.String(32), nullable=False) 
 
 class RentalDetails(db.Model):
     """
@@ -323,16 +597,16 @@ class RentalDetails(db.Model):
     __table_args__ = {'schema': 'wypozyczalnia'}
     
     id_wypozyczenia = db.Column(db.Integer, primary_key=True)
-    id_klient = db.Column(db.Integer)
-    klient = db.Column(db.String(128))
-    id_auto = db.Column(db.Integer)
-    nazwa_marki = db.Column(db.String(64))
-    nazwa_modelu = db.Column(db.String(64))
-    numer_rejestracyjny = db.Column(db.String(50))
-    data_wypozyczenia = db.Column(db.Date)
-    data_oddania = db.Column(db.Date)
-    id_pracownik = db.Column(db.Integer)
-    pracownik = db.Column(db.String(128))
+    id_klient = db.Column(db.Integer, nullable=False)
+    klient = db.Column(db.String(128), nullable=False)
+    id_auto = db.Column(db.Integer, nullable=False)
+    nazwa_marki = db.Column(db.String(64), nullable=False)
+    nazwa_modelu = db.Column(db.String(64), nullable=False)
+    numer_rejestracyjny = db.Column(db.String(50), nullable=False)
+    data_wypozyczenia = db.Column(db.Date, nullable=False)
+    data_oddania = db.Column(db.Date, nullable=False)
+    id_pracownik = db.Column(db.Integer, nullable=False)
+    pracownik = db.Column(db.String(128), nullable=False)
 
 class Payment(db.Model):
     """
@@ -341,7 +615,7 @@ class Payment(db.Model):
     Attributes:
         id_platnosc (int): Klucz główny, identyfikator płatności.
         id_wypozyczenia (int): Identyfikator powiązanego wypożyczenia.
-        kwota (decimal): Kwota płatności za dane wypożyczenie.
+        kwota (decimal): Kwota płatności za dane wypożyczenie (NULL, gdy klasa auta nie ma stawki w cenniku).
         wypozyczenia (Rental): Relacja do modelu 'Rental', reprezentująca powiązanie płatności z wypożyczeniem.
     """
     __tablename__ = 'platnosci'
@@ -349,7 +623,7 @@ class Payment(db.Model):
 
     id_platnosc = db.Column(db.Integer, primary_key=True)
     id_wypozyczenia = db.Column(db.Integer, db.ForeignKey('wypozyczalnia.wypozyczenia.id_wypozyczenia'),nullable=False)
-    kwota = db.Column(db.Numeric(10,2), nullable=False)
+    kwota = db.Column(db.Numeric(10,2))
     wypozyczenia = db.relationship('Rental', back_populates='platnosc')
 
 context_data = {
@@ -361,7 +635,7 @@ context_data = {
     'jobs' : {'data' : []},
     'workers' : {'data' : [Job]},
     'pricelist' : {'data' : [CarClass]},
-    'rentals' : {'data' : [Client, Model, Brand]},
+    'rentals' : {'data' : [Model, Brand]},
     'rentals_cost' : {},
     'payments' : {'data' : []}
 }
@@ -379,6 +653,20 @@ labels = {
     'orders' : ['ID' , 'Klient', 'Model', 'Początek', 'Koniec', 'Status'],
     'payments' : ['ID', 'ID wypozyczenia', 'Kwota']
 }
+
+columns = {
+    'cars' : {'id' : CarDetails.id_auto, 'model' : CarDetails.nazwa_modelu, 'marka' : CarDetails.nazwa_marki,
+              'numer_rejestracyjny' : CarDetails.numer_rejestracyjny, 'klasa' : CarDetails.nazwa_klasy},
+    'models' : {'id' : Model.id_model, 'marka' : Brand.nazwa_marki, 'model' : Model.nazwa_modelu},
+    'brands' : {'id' : Brand.id_marka, 'marka' : Brand.nazwa_marki},
+    'clients' : {'id' : Client.id_klient, 'imie' : Client.imie, 'nazwisko' : Client.nazwisko, 'telefon' : Client.telefon},
+    'rentals' : {'id' : RentalDetails.id_wypozyczenia, 'klient' : RentalDetails.klient, 'numer_rejestracyjny' : RentalDetails.numer_rejestracyjny,
+                 'marka' : RentalDetails.nazwa_marki, 'model' : RentalDetails.nazwa_modelu, 'poczatek' : RentalDetails.data_wypozyczenia,
+                 'koniec' : RentalDetails.data_oddania, 'pracownik' : RentalDetails.pracownik},
+    'orders' : {'id' : Order.id_zamowienia, 'klient' : func.concat(Client.imie, ' ', Client.nazwisko), 'model' : Model.nazwa_modelu,
+                'poczatek' : Order.data_rozpoczecia, 'koniec' : Order.data_zakonczenia, 'status' : Order.status},
+    'payments' : {'id' : Payment.id_platnosc, 'id_wypozyczenia' : Payment.id_wypozyczenia, 'kwota' : Payment.kwota}
+}
   
 @app.route('/')
 def home():
@@ -404,6 +692,206 @@ def getattr_filter(obj, attr):
     """
     return getattr(obj, attr, None)
 
+PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+
+def encode_cursor(values):
+    """
+    Koduje wartości klucza sortowania wiersza do postaci kursora przekazywanego w adresie URL.
+
+    Args:
+        values (list): Wartości kolumny sortowania i identyfikatora wiersza.
+
+    Returns:
+        str: Kursor w formacie base64 (bezpieczny dla URL).
+    """
+    return base64.urlsafe_b64encode(json.dumps(values, default=str).encode()).decode()
+
+
+def decode_cursor(token, columns):
+    """
+    Dekoduje kursor i rzutuje jego wartości na typy odpowiadających kolumn.
+
+    Args:
+        token (str): Kursor utworzony przez `encode_cursor`.
+        columns (list): Kolumny, z których pochodzą kolejne wartości kursora.
+
+    Returns:
+        list: Wartości klucza sortowania lub None, jeśli kursor jest niepoprawny.
+    """
+    try:
+        values = json.loads(base64.urlsafe_b64decode(token.encode()))
+        return [None if value is None else parse_column_value(column, value) for column, value in zip(columns, values)]
+    except (ValueError, TypeError):
+        return None
+
+
+def parse_column_value(column, value):
+    """
+    Zamienia tekst (z kursora lub filtra) na wartość zgodną z typem kolumny.
+
+    Args:
+        column (ColumnElement): Kolumna lub wyrażenie SQLAlchemy.
+        value (str): Wartość tekstowa.
+
+    Returns:
+        any: Wartość w typie kolumny.
+
+    Raises:
+        ValueError: Jeśli wartości nie da się zamienić na typ kolumny.
+    """
+    try:
+        python_type = column.type.python_type
+    except NotImplementedError:
+        return value
+    if python_type is date:
+        return date.fromisoformat(str(value))
+    if python_type is Decimal:
+        return Decimal(str(value))
+    if python_type is int:
+        return int(value)
+    return python_type(value)
+
+
+def like_pattern(text):
+    """
+    Zamienia tekst na wzorzec LIKE dopasowujący go w dowolnym miejscu; znaki `%`, `_` i `\\` traktowane są dosłownie.
+    """
+    return '%' + text.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+
+
+def keyset_condition(sort_column, id_column, cursor, ascending):
+    """
+    Warunek wierszy leżących za kursorem w porządku (kolumna sortowania, id).
+
+    Dla kolumn NOT NULL jest to porównanie wierszy `(kolumna, id) > (wartości_kursora)`, które może korzystać
+    z indeksu. Dla kolumn dopuszczających NULL takie porównanie daje NULL, więc wiersze z NULL nigdy nie
+    trafiłyby na kolejną stronę; NULL-e traktowane są wtedy jak wartości największe, zgodnie z domyślnym
+    porządkiem PostgreSQL (NULLS LAST rosnąco, NULLS FIRST malejąco).
+
+    Args:
+        sort_column (ColumnElement): Kolumna sortowania.
+        id_column (ColumnElement): Kolumna identyfikatora (rozstrzyga remisy).
+        cursor (list): Wartości kolumny sortowania (może być None) i identyfikatora z kursora.
+        ascending (bool): Czy wiersze pobierane są w porządku rosnącym.
+
+    Returns:
+        ColumnElement: Warunek filtra.
+    """
+    value, id_value = cursor
+    key = tuple_(sort_column, id_column)
+    if not getattr(sort_column, 'nullable', False):
+        return key > tuple_(*cursor) if ascending else key < tuple_(*cursor)
+    if ascending:
+        if value is None:
+            return and_(sort_column.is_(None), id_column > id_value)
+        return or_(key > tuple_(*cursor), sort_column.is_(None))
+    if value is None:
+        return or_(sort_column.isnot(None), id_column < id_value)
+    return key < tuple_(*cursor)
+
+
+class KeysetPage:
+    """
+    Strona wyników stronicowana kluczem (keyset pagination).
+
+    Zamiast OFFSET wykorzystuje warunek `(kolumna_sortowania, id) > (wartości_kursora)` (`keyset_condition`),
+    dzięki czemu koszt pobrania strony zależy od jej rozmiaru, a nie od liczby wierszy w tabeli. Parametry stronicowania,
+    sortowania i filtrowania pobierane są z adresu URL bieżącego żądania.
+
+    Attributes:
+        rows (list): Wiersze bieżącej strony.
+        columns (list[str]): Klucze kolumn w kolejności etykiet tabeli.
+        sort (str): Klucz kolumny sortowania.
+        direction (str): Kierunek sortowania ('asc' lub 'desc').
+        limit (int): Rozmiar strony.
+        filter (str): Klucz filtrowanej kolumny.
+        q (str): Wartość filtra.
+        next_cursor (str): Kursor następnej strony lub None.
+        prev_cursor (str): Kursor poprzedniej strony lub None.
+    """
+
+    def __init__(self, query, columns, id_key, default_sort=None, args=None):
+        args = request.args if args is None else args
+        self.columns = list(columns)
+        self.id_key = id_key
+        self.sort = args.get('sort') if args.get('sort') in columns else (default_sort or id_key)
+        self.direction = 'desc' if args.get('dir') == 'desc' else 'asc'
+        try:
+            self.limit = min(max(int(args.get('limit', PAGE_SIZE)), 1), MAX_PAGE_SIZE)
+        except ValueError:
+            self.limit = PAGE_SIZE
+        self.filter = args.get('filter') if args.get('filter') in columns else None
+        self.q = args.get('q', '').strip()
+
+        sort_column = columns[self.sort]
+        id_column = columns[id_key]
+        key_columns = [sort_column, id_column]
+
+        if self.filter and self.q:
+            column = columns[self.filter]
+            if isinstance(column.type, String) and not isinstance(column.type, Enum):
+                query = query.filter(column.ilike(like_pattern(self.q), escape='\\'))
+            else:
+                try:
+                    query = query.filter(column == parse_column_value(column, self.q))
+                except ValueError:
+                    query = query.filter(cast(column, String) == self.q)
+
+        after = decode_cursor(args['after'], key_columns) if args.get('after') else None
+        before = decode_cursor(args['before'], key_columns) if args.get('before') else None
+        backwards = before is not None and after is None
+        ascending = (self.direction == 'asc') != backwards
+
+        cursor = before if backwards else after
+        if cursor is not None:
+            query = query.filter(keyset_condition(sort_column, id_column, cursor, ascending))
+        if ascending:
+            query = query.order_by(sort_column.asc(), id_column.asc())
+        else:
+            query = query.order_by(sort_column.desc(), id_column.desc())
+
+        rows = query.limit(self.limit + 1).all()
+        has_more = len(rows) > self.limit
+        rows = rows[:self.limit]
+        if backwards:
+            rows.reverse()
+        self.rows = rows
+
+        sort_index = self.columns.index(self.sort)
+        id_index = self.columns.index(id_key)
+        has_next = has_more if not backwards else True
+        has_prev = has_more if backwards else cursor is not None
+        self.next_cursor = encode_cursor([rows[-1][sort_index], rows[-1][id_index]]) if rows and has_next else None
+        self.prev_cursor = encode_cursor([rows[0][sort_index], rows[0][id_index]]) if rows and has_prev else None
+
+    def __iter__(self):
+        return iter(self.rows)
+
+    def _url(self, **changes):
+        params = {'sort': self.sort, 'dir': self.direction, 'limit': self.limit}
+        if self.filter and self.q:
+            params.update({'filter': self.filter, 'q': self.q})
+        params.update(changes)
+        return url_for(request.endpoint, **{k: v for k, v in params.items() if v is not None}, **request.view_args)
+
+    def sort_url(self, key):
+        """
+        Zwraca adres pierwszej strony posortowanej po danej kolumnie (ponowne kliknięcie odwraca kierunek).
+        """
+        direction = 'desc' if key == self.sort and self.direction == 'asc' else 'asc'
+        return self._url(sort=key, dir=direction)
+
+    @property
+    def next_url(self):
+        return self._url(after=self.next_cursor) if self.next_cursor else None
+
+    @property
+    def prev_url(self):
+        return self._url(before=self.prev_cursor) if self.prev_cursor else None
+
+
 @app.route('/models')
 def models():
     """
@@ -414,9 +902,10 @@ def models():
     Returns:
         str: Renderowany szablon HTML z listą modeli pojazdów.
     """
-    data = Model.query.with_entities(Model.id_model, Model.nazwa_modelu).all()
-    data = db.session.query(Model.id_model, Brand.nazwa_marki, Model.nazwa_modelu).join(Brand, Model.id_marka == Brand.id_marka).all()
-    return render_template('models.html', title="Modele", labels=labels['models'], data=data, context="models")
+    query = db.session.query(Model.id_model, Brand.nazwa_marki, Model.nazwa_modelu).join(Brand, Model.id_marka == Brand.id_marka)
+    data = reference_cache.get_or_load(('modele', tuple(sorted(request.args.items()))), ('modele', 'marki'),
+                                       lambda: KeysetPage(query, columns['models'], 'id'))
+    return render_template('models.html', title="Modele", labels=labels['models'], data=data, page=data, context="models")
 
 @app.route('/cars')
 def car_details():
@@ -428,9 +917,10 @@ def car_details():
     Returns:
         str: Renderowany szablon HTML z listą szczegółów samochodów.
     """
-    data = CarDetails.query.with_entities(CarDetails.id_auto, CarDetails.nazwa_modelu, CarDetails.nazwa_marki, CarDetails.numer_rejestracyjny,
-                                        CarDetails.nazwa_klasy).all()
-    return render_template('cars.html', title="Auta", labels=labels['cars'], data=data, context="cars")
+    query = CarDetails.query.with_entities(CarDetails.id_auto, CarDetails.nazwa_modelu, CarDetails.nazwa_marki, CarDetails.numer_rejestracyjny,
+                                        CarDetails.nazwa_klasy)
+    data = KeysetPage(query, columns['cars'], 'id')
+    return render_template('cars.html', title="Auta", labels=labels['cars'], data=data, page=data, context="cars")
 
 @app.route('/brands')
 def brand_details():
@@ -442,7 +932,7 @@ def brand_details():
     Returns:
         str: Renderowany szablon HTML z listą marek.
     """
-    data = Brand.query.with_entities(Brand.id_marka, Brand.nazwa_marki).all()
+    data = reference_cache.get_or_load(('marki',), ('marki',), lambda: Brand.query.with_entities(Brand.id_marka, Brand.nazwa_marki).all())
     return render_template('brands.html', title="Marki", labels=labels['brands'], data=data, context="brands")
 
 @app.route('/classes')
@@ -455,7 +945,7 @@ def classes_details():
     Returns:
         str: Renderowany szablon HTML z listą klas pojazdów.
     """
-    data = CarClass.query.with_entities(CarClass.id_klasa, CarClass.nazwa, CarClass.opis).all()
+    data = reference_cache.get_or_load(('klasy',), ('klasa',), lambda: CarClass.query.with_entities(CarClass.id_klasa, CarClass.nazwa, CarClass.opis).all())
     return render_template('classes.html', title="Klasy aut", labels=labels['classes'], data=data, context="classes")
 
 @app.route('/clients')
@@ -468,8 +958,64 @@ def clients_details():
     Returns:
         str: Renderowany szablon HTML z listą klientów.
     """
-    data = Client.query.with_entities(Client.id_klient, Client.imie, Client.nazwisko, Client.telefon).all()
-    return render_template('clients.html', title="Klienci", labels=labels['clients'], data=data, context="clients")
+    query = Client.query.with_entities(Client.id_klient, Client.imie, Client.nazwisko, Client.telefon)
+    data = KeysetPage(query, columns['clients'], 'id')
+    return render_template('clients.html', title="Klienci", labels=labels['clients'], data=data, page=data, context="clients")
+
+CLIENT_SEARCH_LIMIT = 10
+CLIENT_SEARCH_MAX_LIMIT = 50
+
+
+@app.route('/clients/search')
+def clients_search():
+    """
+    Podpowiada klientów w formularzach na podstawie wpisanego fragmentu.
+
+    Fragment złożony z cyfr jest traktowany jako początek numeru telefonu, pozostałe jako początek
+    nazwiska i imienia w dowolnej kolejności (np. "kowal", "jan kow"), bez rozróżniania wielkości liter.
+    Każdy wariant odczytuje z indeksu tylko `limit` pierwszych dopasowań, więc czas odpowiedzi nie zależy
+    od liczby klientów ani od liczby pasujących rekordów.
+
+    Args:
+        q (str): Wyszukiwany fragment, co najmniej 2 znaki.
+        limit (int): Maksymalna liczba wyników (domyślnie 10, najwyżej 50).
+
+    Returns:
+        Response: JSON z listą klientów (id_klient, imie, nazwisko, telefon).
+    """
+    q = ' '.join(request.args.get('q', '').split())
+    limit = min(max(request.args.get('limit', CLIENT_SEARCH_LIMIT, type=int), 1), CLIENT_SEARCH_MAX_LIMIT)
+    if len(q) < 2:
+        return jsonify([])
+    pattern = q.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+    cursor = get_db().cursor()
+    if q.isdigit():
+        cursor.execute("""
+            select id_klient, imie, nazwisko, telefon
+            from wypozyczalnia.klienci
+            where telefon collate "C" like %s
+            order by telefon collate "C"
+            limit %s""", (pattern, limit))
+    else:
+        cursor.execute("""
+            select id_klient, imie, nazwisko, telefon from (
+                (select id_klient, imie, nazwisko, telefon
+                from wypozyczalnia.klienci
+                where lower(nazwisko || ' ' || imie) collate "C" like lower(%(wzorzec)s)
+                order by lower(nazwisko || ' ' || imie) collate "C"
+                limit %(limit)s)
+                union
+                (select id_klient, imie, nazwisko, telefon
+                from wypozyczalnia.klienci
+                where lower(imie || ' ' || nazwisko) collate "C" like lower(%(wzorzec)s)
+                order by lower(imie || ' ' || nazwisko) collate "C"
+                limit %(limit)s)
+            ) k
+            order by nazwisko, imie, id_klient
+            limit %(limit)s""", {'wzorzec': pattern, 'limit': limit})
+    rows = cursor.fetchall()
+    cursor.close()
+    return jsonify([{'id_klient': row[0], 'imie': row[1], 'nazwisko': row[2], 'telefon': row[3]} for row in rows])
 
 @app.route('/jobs')
 def jobs_details():
@@ -509,9 +1055,10 @@ def rentals_details():
     Returns:
         str: Renderowany szablon HTML z listą wypożyczeń.
     """
-    data = RentalDetails.query.with_entities(RentalDetails.id_wypozyczenia , RentalDetails.klient, RentalDetails.numer_rejestracyjny,
-                            RentalDetails.nazwa_marki, RentalDetails.nazwa_modelu, RentalDetails.data_wypozyczenia, RentalDetails.data_oddania, RentalDetails.pracownik).all()
-    return render_template('rentals.html', title="Wypożyczenia", labels=labels['rentals'], data=data, context="rentals")
+    query = RentalDetails.query.with_entities(RentalDetails.id_wypozyczenia , RentalDetails.klient, RentalDetails.numer_rejestracyjny,
+                            RentalDetails.nazwa_marki, RentalDetails.nazwa_modelu, RentalDetails.data_wypozyczenia, RentalDetails.data_oddania, RentalDetails.pracownik)
+    data = KeysetPage(query, columns['rentals'], 'id')
+    return render_template('rentals.html', title="Wypożyczenia", labels=labels['rentals'], data=data, page=data, context="rentals", export="rentals")
 
 @app.route('/orders')
 def orders_details():
@@ -523,10 +1070,343 @@ def orders_details():
     Returns:
         str: Renderowany szablon HTML z listą zamówień.
     """
-    data = (
+    query = (
         db.session.query(Order.id_zamowienia, func.concat(Client.imie, ' ', Client.nazwisko), Model.nazwa_modelu, Order.data_rozpoczecia,
         Order.data_zakonczenia,Order.status).join(Client, Order.id_klient == Client.id_klient).join(Model, Order.id_model == Model.id_model))
-    return render_template('orders.html',title="Zamówienia",labels=labels['orders'], data=data, context="orders")
+    data = KeysetPage(query, columns['orders'], 'id')
+    return render_template('orders.html',title="Zamówienia",labels=labels['orders'], data=data, page=data, context="orders", export="orders")
+
+
+# Eksporty: eksportowane kolumny, źródło z filtrem po dacie (kolejność zgodna z indeksem daty) i nazwa pliku.
+EXPORTS = {
+    'rentals': {
+        'kolumny': ('id_wypozyczenia', 'id_klient', 'klient', 'nazwa_marki', 'nazwa_modelu', 'numer_rejestracyjny',
+                    'data_wypozyczenia', 'data_oddania', 'id_pracownik', 'pracownik'),
+        'zrodlo': """
+            FROM wypozyczalnia.szczegoly_wypozyczenia
+            WHERE data_wypozyczenia >= %(od)s AND data_wypozyczenia <= %(do)s
+            ORDER BY data_wypozyczenia, id_wypozyczenia""",
+        'plik': 'wypozyczenia',
+    },
+    'orders': {
+        'kolumny': ('id_zamowienia', 'id_klient', 'id_model', 'data_rozpoczecia', 'data_zakonczenia', 'status'),
+        'zrodlo': """
+            FROM wypozyczalnia.zamowienia
+            WHERE data_rozpoczecia >= %(od)s AND data_rozpoczecia <= %(do)s
+            ORDER BY data_rozpoczecia, id_zamowienia""",
+        'plik': 'zamowienia',
+    },
+    'payments': {
+        'kolumny': ('p.id_platnosc', 'p.id_wypozyczenia', 'p.kwota', 'w.data_wypozyczenia', 'w.data_oddania'),
+        'zrodlo': """
+            FROM wypozyczalnia.platnosci p
+            JOIN wypozyczalnia.wypozyczenia w ON w.id_wypozyczenia = p.id_wypozyczenia
+            WHERE w.data_wypozyczenia >= %(od)s AND w.data_wypozyczenia <= %(do)s
+            ORDER BY w.data_wypozyczenia, p.id_platnosc""",
+        'plik': 'platnosci',
+    },
+}
+
+
+def stream_export(spec, params, fmt, engine):
+    """
+    Generuje eksport porcjami po `EXPORT_CHUNK_SIZE` wierszy z kursora po stronie serwera (nazwanego).
+
+    Nagłówek CSV jest wysyłany przed wykonaniem zapytania, więc pierwszy bajt odpowiedzi nie czeka na bazę.
+    Generator korzysta z własnego połączenia z puli, oddawanego po wysłaniu ostatniej porcji lub przerwaniu
+    pobierania. Trasa owija go w `stream_with_context`, więc kontekst żądania trwa do końca wysyłania,
+    a `record_request_metrics` zlicza zapytania i wiersze kursora oraz pełny czas eksportu.
+
+    Args:
+        spec (dict): Opis eksportu z `EXPORTS`.
+        params (dict): Parametry zapytania (`od`, `do`).
+        fmt (str): 'csv' lub 'ndjson'.
+        engine (Engine): Silnik, z którego puli pobierane jest połączenie (replika lub serwer główny).
+
+    Yields:
+        str: Kolejne fragmenty pliku.
+    """
+    names = [column.split('.')[-1] for column in spec['kolumny']]
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if fmt == 'csv':
+        writer.writerow(names)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+
+    connection = engine.raw_connection()
+    try:
+        cursor = connection.cursor(name='eksport')
+        cursor.execute(f"SELECT {', '.join(spec['kolumny'])} {spec['zrodlo']}", params)
+        while True:
+            rows = cursor.fetchmany(EXPORT_CHUNK_SIZE)
+            if not rows:
+                break
+            if fmt == 'csv':
+                writer.writerows(rows)
+            else:
+                for row in rows:
+                    buffer.write(json.dumps(dict(zip(names, row)), default=str, ensure_ascii=False))
+                    buffer.write('\n')
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+        cursor.close()
+    finally:
+        connection.rollback()
+        connection.close()
+
+
+@app.route('/export/<kind>')
+def export_data(kind):
+    """
+    Eksportuje wypożyczenia, zamówienia lub płatności jako strumień CSV lub NDJSON.
+
+    Wiersze są pobierane kursorem po stronie serwera i wysyłane porcjami, więc zużycie pamięci nie zależy
+    od liczby wierszy. Parametry `od` i `do` (RRRR-MM-DD, włącznie) filtrują po dacie rozpoczęcia,
+    a `format` wybiera 'csv' (domyślnie) lub 'ndjson'.
+
+    Args:
+        kind (str): 'rentals', 'orders' lub 'payments'.
+
+    Returns:
+        Response: Strumieniowana odpowiedź z plikiem do pobrania lub JSON z opisem błędu.
+    """
+    if kind not in EXPORTS:
+        return jsonify({'blad': f"Nieznany eksport. Dostępne: {', '.join(EXPORTS)}."}), 404
+    fmt = request.args.get('format', 'csv')
+    if fmt not in ('csv', 'ndjson'):
+        return jsonify({'blad': "Dostępne formaty: csv, ndjson."}), 400
+    try:
+        od = date.fromisoformat(request.args['od']) if request.args.get('od') else date.min
+        do = date.fromisoformat(request.args['do']) if request.args.get('do') else date.max
+    except ValueError:
+        return jsonify({'blad': "Nieprawidłowa data (oczekiwano RRRR-MM-DD)."}), 400
+
+    spec = EXPORTS[kind]
+    suffix = ''.join(f"_{value}" for value in (request.args.get('od'), request.args.get('do')) if value)
+    mimetype = 'text/csv' if fmt == 'csv' else 'application/x-ndjson'
+    return Response(stream_with_context(stream_export(spec, {'od': od, 'do': do}, fmt, request_engine())), mimetype=mimetype,
+                    headers={'Content-Disposition': f"attachment; filename={spec['plik']}{suffix}.{fmt}"})
+
+
+API_GZIP_MIN_SIZE = 1024
+
+# Zasoby API: zapytanie budowane dla wybranych kolumn (klucze i kolumny jak w słowniku `columns`).
+API_RESOURCES = {
+    'cars': lambda selected: db.session.query(*selected).select_from(CarDetails),
+    'models': lambda selected: db.session.query(*selected).select_from(Model).join(Brand, Model.id_marka == Brand.id_marka),
+    'brands': lambda selected: db.session.query(*selected).select_from(Brand),
+    'clients': lambda selected: db.session.query(*selected).select_from(Client),
+    'rentals': lambda selected: db.session.query(*selected).select_from(RentalDetails),
+    'orders': lambda selected: (db.session.query(*selected).select_from(Order)
+                                .join(Client, Order.id_klient == Client.id_klient).join(Model, Order.id_model == Model.id_model)),
+    'payments': lambda selected: db.session.query(*selected).select_from(Payment),
+}
+
+
+def api_response(payload, status=200):
+    """
+    Zwraca odpowiedź JSON API, skompresowaną gzipem, jeśli klient to akceptuje, a treść nie jest bardzo krótka.
+
+    Daty są zapisywane w formacie RRRR-MM-DD, a kwoty jako tekst (bez utraty precyzji), tak jak w eksportach.
+
+    Args:
+        payload (dict | list): Treść odpowiedzi.
+        status (int): Kod odpowiedzi HTTP.
+
+    Returns:
+        Response: Odpowiedź z typem application/json.
+    """
+    body = json.dumps(payload, default=str, ensure_ascii=False, separators=(',', ':')).encode()
+    response = Response(body, status=status, mimetype='application/json')
+    response.vary.add('Accept-Encoding')
+    if len(body) >= API_GZIP_MIN_SIZE and request.accept_encodings['gzip']:
+        response.set_data(gzip.compress(body, compresslevel=5))
+        response.headers['Content-Encoding'] = 'gzip'
+    return response
+
+
+def api_fields(available, default=None):
+    """
+    Odczytuje listę pól z parametru `fields` (np. `fields=id,marka`).
+
+    Args:
+        available (Iterable[str]): Dostępne pola zasobu.
+        default (list[str]): Pola zwracane, gdy parametr nie został podany (domyślnie wszystkie).
+
+    Returns:
+        list[str]: Wybrane pola w kolejności podanej przez klienta.
+
+    Raises:
+        ValueError: Gdy któreś z pól nie istnieje.
+    """
+    available = list(available)
+    if not request.args.get('fields'):
+        return default or available
+    fields = list(dict.fromkeys(field.strip() for field in request.args['fields'].split(',') if field.strip()))
+    unknown = [field for field in fields if field not in available]
+    if unknown or not fields:
+        raise ValueError(f"Nieznane pola: {', '.join(unknown) or '(brak)'}. Dostępne: {', '.join(available)}.")
+    return fields
+
+
+@app.route('/api/v1/<resource>')
+def api_list(resource):
+    """
+    Zwraca rekordy zasobu w formacie JSON.
+
+    Parametry:
+        fields: Lista zwracanych pól oddzielonych przecinkami (domyślnie wszystkie).
+        ids: Lista identyfikatorów oddzielonych przecinkami (najwyżej `MAX_PAGE_SIZE`); zwraca tylko te
+            rekordy, bez stronicowania.
+        sort, dir, limit, filter, q, after, before: Stronicowanie kluczem jak w widokach HTML (`KeysetPage`);
+            kursor kolejnej strony zwracany jest w polu `nastepna`.
+
+    Args:
+        resource (str): 'cars', 'models', 'brands', 'clients', 'rentals', 'orders' lub 'payments'.
+
+    Returns:
+        Response: JSON `{"dane": [...], "nastepna": ..., "poprzednia": ...}` lub opis błędu.
+    """
+    if resource not in API_RESOURCES:
+        return api_response({'blad': f"Nieznany zasób. Dostępne: {', '.join(API_RESOURCES)}."}, 404)
+    resource_columns = columns[resource]
+    try:
+        fields = api_fields(resource_columns)
+    except ValueError as e:
+        return api_response({'blad': str(e)}, 400)
+
+    if request.args.get('ids'):
+        id_column = resource_columns['id']
+        try:
+            ids = list(dict.fromkeys(int(value) for value in request.args['ids'].split(',') if value.strip()))
+        except ValueError:
+            return api_response({'blad': "Parametr ids musi być listą liczb całkowitych."}, 400)
+        if len(ids) > MAX_PAGE_SIZE:
+            return api_response({'blad': f"Można pobrać najwyżej {MAX_PAGE_SIZE} rekordów naraz."}, 400)
+        rows = API_RESOURCES[resource]([resource_columns[field] for field in fields]).filter(id_column.in_(ids)).order_by(id_column).all()
+        return api_response({'dane': [dict(zip(fields, row)) for row in rows]})
+
+    # Kolumny sortowania, identyfikatora i filtra muszą być w zapytaniu, aby wyznaczyć kursor i warunek.
+    sort = request.args.get('sort') if request.args.get('sort') in resource_columns else 'id'
+    required = set(fields) | {'id', sort, request.args.get('filter')}
+    selected = {key: column for key, column in resource_columns.items() if key in required}
+    page = KeysetPage(API_RESOURCES[resource](list(selected.values())), selected, 'id')
+    positions = [page.columns.index(field) for field in fields]
+    return api_response({
+        'dane': [{field: row[position] for field, position in zip(fields, positions)} for row in page.rows],
+        'nastepna': page.next_cursor,
+        'poprzednia': page.prev_cursor,
+    })
+
+
+@app.route('/api/v1/<resource>/<int:id>')
+def api_detail(resource, id):
+    """
+    Zwraca jeden rekord zasobu (z opcjonalnym wyborem pól `fields`).
+
+    Args:
+        resource (str): Nazwa zasobu jak w `api_list`.
+        id (int): Identyfikator rekordu.
+
+    Returns:
+        Response: JSON z rekordem lub opis błędu (404, gdy rekord nie istnieje).
+    """
+    if resource not in API_RESOURCES:
+        return api_response({'blad': f"Nieznany zasób. Dostępne: {', '.join(API_RESOURCES)}."}, 404)
+    resource_columns = columns[resource]
+    try:
+        fields = api_fields(resource_columns)
+    except ValueError as e:
+        return api_response({'blad': str(e)}, 400)
+    row = API_RESOURCES[resource]([resource_columns[field] for field in fields]).filter(resource_columns['id'] == id).first()
+    if row is None:
+        return api_response({'blad': f"Nie znaleziono rekordu o ID {id}."}, 404)
+    return api_response(dict(zip(fields, row)))
+
+
+@app.route('/api/v1/reports/available')
+def api_available_cars():
+    """
+    Zwraca auta dostępne w podanym terminie wraz z podsumowaniem wg marek i modeli.
+
+    Args:
+        od (str): Data rozpoczęcia (RRRR-MM-DD).
+        do (str): Data zakończenia (RRRR-MM-DD).
+        fields (str): Pola zwracane dla aut (jak w zasobie `cars`).
+
+    Returns:
+        Response: JSON `{"liczba_aut": ..., "auta": [...], "marki": [...], "modele": [...]}` lub opis błędu.
+    """
+    try:
+        od, do = date.fromisoformat(request.args.get('od', '')), date.fromisoformat(request.args.get('do', ''))
+    except ValueError:
+        return api_response({'blad': "Parametry od i do muszą być datami w formacie RRRR-MM-DD."}, 400)
+    if od > do:
+        return api_response({'blad': "Data rozpoczęcia nie może być późniejsza niż data zakończenia."}, 400)
+    try:
+        fields = api_fields(columns['cars'])
+    except ValueError as e:
+        return api_response({'blad': str(e)}, 400)
+    cars, amount, brands_amount, models_amount = search_available_cars(od.isoformat(), do.isoformat())
+    positions = [list(columns['cars']).index(field) for field in fields]
+    return api_response({
+        'liczba_aut': amount[0] if amount else 0,
+        'auta': [{field: car[position] for field, position in zip(fields, positions)} for car in cars],
+        'marki': [{'marka': marka, 'ilosc': ilosc} for marka, ilosc in brands_amount],
+        'modele': [{'marka': marka, 'model': model, 'ilosc': ilosc} for marka, model, ilosc in models_amount],
+    })
+
+
+@app.route('/api/v1/reports/popular')
+def api_popular_cars():
+    """
+    Zwraca modele wypożyczone co najmniej `min` razy (domyślnie 0), od najpopularniejszych.
+
+    Returns:
+        Response: JSON `{"dane": [{"model", "marka", "liczba_wypozyczen"}, ...]}` lub opis błędu.
+    """
+    minimum = request.args.get('min', 0, type=int)
+    cursor = get_db().cursor()
+    cursor.execute("SELECT * FROM wypozyczalnia.najpopularniejsze_modele(%s);", (minimum,))
+    rows = cursor.fetchall()
+    cursor.close()
+    return api_response({'dane': [{'model': model, 'marka': marka, 'liczba_wypozyczen': liczba} for model, marka, liczba in rows]})
+
+
+@app.route('/api/v1/reports/utilization')
+def api_utilization():
+    """
+    Zwraca wykorzystanie floty (odsetek dni wypożyczenia) w podanym okresie.
+
+    Args:
+        od (str): Data rozpoczęcia (RRRR-MM-DD).
+        do (str): Data zakończenia (RRRR-MM-DD).
+        szczegolowosc (str): 'dzien', 'tydzien' lub 'miesiac' (domyślnie).
+        poziom (str): 'auto', 'model' (domyślnie) lub 'klasa'.
+
+    Returns:
+        Response: JSON `{"okresy": [{"od", "do"}, ...], "flota": {...}, "dane": [{"opis", "liczba_aut",
+            "wykorzystanie", "razem"}, ...]}` z wartościami w procentach lub opis błędu.
+    """
+    try:
+        od, do = date.fromisoformat(request.args.get('od', '')), date.fromisoformat(request.args.get('do', ''))
+    except ValueError:
+        return api_response({'blad': "Parametry od i do muszą być datami w formacie RRRR-MM-DD."}, 400)
+    try:
+        result = fleet_utilization(od, do, request.args.get('szczegolowosc', 'miesiac'))
+        rows = result.rows(request.args.get('poziom', 'model'))
+    except ValueError as e:
+        return api_response({'blad': str(e)}, 400)
+    fleet, overall = result.fleet()
+    return api_response({
+        'okresy': [{'od': first, 'do': last} for first, last in result.periods],
+        'flota': {'liczba_aut': len(result.cars), 'wykorzystanie': fleet, 'razem': overall},
+        'dane': [{'opis': opis, 'liczba_aut': liczba, 'wykorzystanie': values, 'razem': razem}
+                 for opis, liczba, values, razem in rows],
+    })
 
 
 @app.route('/pricelist')
@@ -539,7 +1419,8 @@ def price_list():
     Returns:
         str: Renderowany szablon HTML z listą cenników.
     """
-    data = db.session.query(PriceList.id_cennik, CarClass.nazwa, PriceList.stawka_za_dzien).join(PriceList, PriceList.id_klasa == CarClass.id_klasa).all()
+    data = reference_cache.get_or_load(('cennik',), ('cennik', 'klasa'), lambda: db.session.query(
+        PriceList.id_cennik, CarClass.nazwa, PriceList.stawka_za_dzien).join(PriceList, PriceList.id_klasa == CarClass.id_klasa).all())
     return render_template('pricelist.html', title="Cennik", labels=labels['pricelist'], data=data, context="pricelist")
 
 @app.route('/payments', methods= ['GET', 'POST'])
@@ -552,8 +1433,9 @@ def payment_details():
     Returns:
         str: Renderowany szablon HTML z listą płatności.
     """
-    data = db.session.query(Payment.id_platnosc, Payment.id_wypozyczenia, Payment.kwota).all()
-    return render_template('payments.html', title="Płatności", labels=labels['payments'], data = data, context="payments")
+    query = db.session.query(Payment.id_platnosc, Payment.id_wypozyczenia, Payment.kwota)
+    data = KeysetPage(query, columns['payments'], 'id')
+    return render_template('payments.html', title="Płatności", labels=labels['payments'], data = data, page=data, context="payments", export="payments")
 
 @app.route('/incomes', methods =['GET', 'POST'])
 def income():
@@ -568,6 +1450,146 @@ def income():
     return render_template('incomes.html', title="Przychody", context="incomes")
 
 
+REFERENCE_TABLES = ('marki', 'modele', 'klasa', 'cennik', 'role')
+
+
+def reference_rows(model):
+    """
+    Zwraca wszystkie wiersze tabeli słownikowej z pamięci podręcznej `reference_cache`.
+
+    Wiersze są zwracane jako krotki z dostępem do kolumn przez atrybuty (jak obiekty modelu w szablonach),
+    więc nie są związane z sesją żądania, w którym zostały wczytane.
+
+    Args:
+        model (db.Model): Model tabeli słownikowej.
+
+    Returns:
+        list[Row]: Wiersze tabeli.
+    """
+    table = model.__table__
+
+    def load():
+        # Wpis jest unieważniany powiadomieniem z serwera głównego, więc ładowanie z opóźnionej repliki
+        # mogłoby ponownie zapisać w pamięci dane sprzed zmiany.
+        with on_primary():
+            return db.session.execute(db.select(*table.columns)).all()
+
+    return reference_cache.get_or_load(('tabela', table.name), (table.name,), load)
+
+
+FLEET_TABLES = ('auta', 'modele', 'marki', 'klasa', 'wypozyczenia')
+
+
+def apply_change(change):
+    """
+    Uwzględnia w pamięci procesu zmianę zgłoszoną przez wyzwalacz `powiadom_o_zmianie` (także z innych procesów).
+
+    Zmiany tabel słownikowych unieważniają zależne wpisy `reference_cache`, a zmiany floty - wyniki
+    `utilization_cache`. Wypożyczenia przekazane
+    w powiadomieniu są nanoszone na indeks floty przyrostowo; pozostałe zmiany floty oznaczają indeks
+    jako nieaktualny.
+
+    Args:
+        change (dict): Treść powiadomienia: `tabela` oraz `operacja` albo listy `dodane` i `usuniete`.
+    """
+    table = change.get('tabela')
+    if table in REFERENCE_TABLES:
+        reference_cache.invalidate(table)
+    if table in FLEET_TABLES:
+        utilization_cache.invalidate(table)
+    if fleet_index is None or table not in FLEET_TABLES:
+        return
+    if table != 'wypozyczenia' and table != 'auta' and change.get('operacja') == 'INSERT':
+        # Nowa marka, model lub klasa nie zmienia danych aut zapisanych w indeksie.
+        return
+    if table == 'wypozyczenia' and 'dodane' in change:
+        for id_wypozyczenia in change['usuniete']:
+            fleet_index.remove_rental(id_wypozyczenia)
+        for id_wypozyczenia, id_auto, start, end in change['dodane']:
+            fleet_index.add_rental(id_wypozyczenia, id_auto, date.fromisoformat(start), date.fromisoformat(end))
+    else:
+        fleet_index.mark_stale()
+
+
+def reset_local_caches():
+    """
+    Unieważnia całą pamięć procesu, gdy powiadomienia o zmianach mogły przepaść (np. po zerwaniu połączenia).
+    """
+    reference_cache.clear()
+    utilization_cache.clear()
+    if fleet_index is not None:
+        fleet_index.mark_stale()
+
+
+def listener_connection():
+    """
+    Otwiera połączenie dla wątku nasłuchującego, odłączone od puli, aby nie zajmowało miejsca żądaniom.
+    """
+    with app.app_context():
+        connection = db.engine.raw_connection()
+        connection.detach()
+        return connection.dbapi_connection
+
+
+change_listener = ChangeListener(
+    listener_connection, apply_change, on_reconnect=reset_local_caches,
+    poll_interval=float(os.getenv('CHANGE_LISTENER_POLL_INTERVAL', 30)),
+) if os.getenv('CHANGE_LISTENER_ENABLED', '1') == '1' else None
+change_listener_lock = threading.Lock()
+
+
+@app.before_request
+def start_change_listener():
+    """
+    Uruchamia wątek nasłuchujący przy pierwszym żądaniu w danym procesie.
+
+    Wątek nie jest uruchamiany przy imporcie modułu, ponieważ serwery z wieloma procesami (np. gunicorn
+    z `--preload`) importują aplikację przed `fork`, a wątki nie są dziedziczone przez procesy potomne.
+    """
+    if change_listener is None or change_listener.running():
+        return
+    with change_listener_lock:
+        if not change_listener.running():
+            change_listener.start()
+
+
+def merge_revenue():
+    """
+    Scala zmiany podsumowań przychodów na serwerze głównym.
+
+    Returns:
+        int: Liczba scalonych wierszy zmian.
+    """
+    with app.app_context():
+        connection = db.engine.raw_connection()
+    try:
+        cursor = connection.cursor()
+        cursor.execute("select wypozyczalnia.scal_przychody()")
+        merged = cursor.fetchone()[0]
+        connection.commit()
+        return merged
+    finally:
+        connection.close()
+
+
+revenue_merger = RevenueMerger(
+    merge_revenue, interval=float(os.getenv('REVENUE_MERGE_INTERVAL', 60)),
+) if os.getenv('REVENUE_MERGE_ENABLED', '1') == '1' else None
+revenue_merger_lock = threading.Lock()
+
+
+@app.before_request
+def start_revenue_merger():
+    """
+    Uruchamia wątek scalający zmiany przychodów przy pierwszym żądaniu w danym procesie (jak nasłuch zmian).
+    """
+    if revenue_merger is None or revenue_merger.running():
+        return
+    with revenue_merger_lock:
+        if not revenue_merger.running():
+            revenue_merger.start()
+
+
 @app.route('/data', methods=['GET', 'POST'])
 def data_view():
     """
@@ -582,7 +1604,8 @@ def data_view():
         str: Renderowany szablon HTML odpowiadający wybranemu kontekstowi.
     """
     context = request.form.get('context') or request.args.get('context', 'index')
-    data = [elem.query.all() for elem in context_data[context]['data']]
+    data = [reference_rows(elem) if elem.__table__.name in REFERENCE_TABLES else elem.query.all()
+            for elem in context_data[context]['data']]
     if request.method == 'POST':
         action = request.form.get('action')
         if action == 'add':
@@ -605,34 +1628,111 @@ def get_brands(brand_id):
     Returns:
         Response: JSON z listą modeli zawierającą 'id_model' i 'nazwa_model'.
     """
-    cursor = conn.cursor()
-    cursor.execute("SELECT * FROM wypozyczalnia.wyszukaj_modele(%s)", (brand_id,))
-    rows = cursor.fetchall()
-    model_list = [{'id_model': row[0], 'nazwa_model': row[1]} for row in rows]
-    cursor.close()
-    return jsonify(model_list)
+    def load():
+        cursor = get_db().cursor()
+        cursor.execute("SELECT * FROM wypozyczalnia.wyszukaj_modele(%s)", (brand_id,))
+        rows = cursor.fetchall()
+        cursor.close()
+        return [{'id_model': row[0], 'nazwa_model': row[1]} for row in rows]
+
+    return jsonify(reference_cache.get_or_load(('modele_marki', brand_id), ('modele', 'marki'), load))
+
+
+def model_catalog():
+    """
+    Zwraca katalog marek, modeli i klas jako gotowy dokument JSON wraz z jego wersją.
+
+    Wersja jest skrótem treści, więc wszystkie procesy aplikacji wyznaczają ją tak samo, a zmienia się
+    tylko wtedy, gdy zmienią się dane katalogu. Dokument jest przechowywany w `reference_cache`.
+
+    Returns:
+        tuple[str, bytes]: Wersja i treść dokumentu.
+    """
+    def load():
+        # Jak w `reference_rows`: katalog ładowany jest z serwera głównego także w trasach kierowanych na repliki.
+        with on_primary():
+            cursor = get_db().cursor()
+            cursor.execute("""
+                select id_marka, nazwa_marki, id_model, nazwa_modelu, id_klasa, nazwa
+                from wypozyczalnia.modele_marki_klasy
+                order by nazwa_marki, id_marka, nazwa_modelu, id_model""")
+            rows = cursor.fetchall()
+            cursor.close()
+        brands, classes = {}, {}
+        for id_marka, nazwa_marki, id_model, nazwa_modelu, id_klasa, nazwa_klasy in rows:
+            brands.setdefault(id_marka, [id_marka, nazwa_marki, []])[2].append([id_model, nazwa_modelu, id_klasa])
+            classes[id_klasa] = nazwa_klasy
+        catalog = {'marki': list(brands.values()), 'klasy': sorted([id_klasa, nazwa] for id_klasa, nazwa in classes.items())}
+        body = json.dumps(catalog, ensure_ascii=False, separators=(',', ':')).encode()
+        version = hashlib.sha1(body).hexdigest()[:16]
+        return version, body
+
+    return reference_cache.get_or_load(('katalog_modeli',), ('modele', 'marki', 'klasa'), load)
+
+
+@app.template_global()
+def catalog_url():
+    """
+    Zwraca adres bieżącej wersji katalogu modeli, osadzany w formularzach z wyborem marki i modelu.
+    """
+    return url_for('catalog_models', v=model_catalog()[0])
+
+
+@app.route('/catalog/models')
+def catalog_models():
+    """
+    Zwraca katalog marek z ich modelami i klasami, na podstawie którego formularze filtrują modele po stronie przeglądarki.
+
+    Dokument ma postać `{"marki": [[id_marka, nazwa_marki, [[id_model, nazwa_modelu, id_klasa], ...]], ...],
+    "klasy": [[id_klasa, nazwa], ...]}`. Odpowiedź zawiera ETag i obsługuje zapytania warunkowe
+    (`If-None-Match` -> 304). Adres z aktualną wersją (`?v=`) jest niezmienny i może być przechowywany
+    przez przeglądarkę bez ponownej weryfikacji; pozostałe odpowiedzi wymagają weryfikacji przy każdym użyciu.
+
+    Returns:
+        Response: Dokument JSON katalogu lub odpowiedź 304.
+    """
+    version, body = model_catalog()
+    response = Response(body, mimetype='application/json')
+    response.set_etag(version)
+    if request.args.get('v') == version:
+        response.cache_control.public = True
+        response.cache_control.max_age = 31536000
+        response.cache_control.immutable = True
+    else:
+        response.cache_control.no_cache = True
+    return response.make_conditional(request)
 
 @app.route('/incomes/all')
 def get_raport():
     """
     Wyświetla raport finansowy.
 
-    Pobiera dane o całkowitych i średnich przychodach oraz przychodach na klasy aut.
+    Pobiera dane o całkowitych i średnich przychodach oraz przychodach na klasy aut z podsumowań
+    utrzymywanych przez wyzwalacze na tabeli płatności i zmian scalanych co `REVENUE_MERGE_INTERVAL` sekund
+    (`revenue_merger`), więc czas odczytu nie zależy od liczby wypożyczeń.
+    Parametr `podzial=miesiace` rozbija raport na miesiące rozpoczęcia wypożyczeń.
 
     Returns:
         str: Renderowany szablon HTML z raportem finansowym.
     """
-    cursor = conn.cursor()
-    cursor.execute("SELECT * FROM wypozyczalnia.raport_finansowy;")
-    report = [cursor.fetchone()]
-
-    query = "SELECT * FROM wypozyczalnia.przychody_na_klasy_aut();"
-    cursor.execute(query)
-    class_report = cursor.fetchall()
-    cursor.close()
-    
+    monthly = request.args.get('podzial') == 'miesiace'
+    cursor = get_db().cursor()
+    if monthly:
+        cursor.execute("SELECT * FROM wypozyczalnia.raport_finansowy_miesieczny();")
+        report = cursor.fetchall()
+        cursor.execute("SELECT * FROM wypozyczalnia.przychody_na_klasy_aut_miesiecznie();")
+        class_report = cursor.fetchall()
+        labels = ['Miesiąc', 'Klasa', 'Liczba wypożyczeń', 'Całkowity przychód']
+        labels2 = ['Miesiąc', 'Całkowity przychód', 'Średni przychód']
+    else:
+        cursor.execute("SELECT * FROM wypozyczalnia.raport_finansowy;")
+        report = [cursor.fetchone()]
+        cursor.execute("SELECT * FROM wypozyczalnia.przychody_na_klasy_aut();")
+        class_report = cursor.fetchall()
+        labels = ['Klasa', 'Liczba wypożyczeń', 'Całkowity przychód']
+        labels2 = ['Całkowity przychód', 'Średni przychód']
     cursor.close()
-    return render_template('incomes.html', title = "Podsumowanie finansowe", labels=['Klasa', 'Liczba wypożyczeń', 'Całkowity przychód'],labels2=['Całkowity przychód' , 'Średni przychód'], data=class_report, report=report)
+    return render_template('incomes.html', title = "Podsumowanie finansowe", labels=labels, labels2=labels2, data=class_report, report=report, monthly=monthly)
     
 @app.route('/available_cars')
 def available_cars():
@@ -656,6 +1756,95 @@ def popular_cars():
 
 
 
+def search_available_cars(data_rozpoczecia, data_zakonczenia):
+    """
+    Wyszukuje auta dostępne w podanym terminie wraz z podsumowaniem wg marek i modeli.
+
+    Jeśli włączony jest indeks floty w pamięci (FLEET_INDEX_ENABLED=1) i jego migawka jest aktualna,
+    odpowiedź liczona jest bez zapytań do bazy. W przeciwnym razie wywoływana jest funkcja
+    `podsumuj_auta_dostepne_w_danym_terminie`, a nieaktualny indeks przebudowywany jest w tle.
+
+    Args:
+        data_rozpoczecia (str): Data rozpoczęcia w formacie RRRR-MM-DD.
+        data_zakonczenia (str): Data zakończenia w formacie RRRR-MM-DD.
+
+    Returns:
+        tuple: (lista aut, (liczba aut,), [(marka, ilość)], [(marka, model, ilość)]).
+    """
+    if fleet_index is not None:
+        try:
+            start, end = date.fromisoformat(data_rozpoczecia), date.fromisoformat(data_zakonczenia)
+        except (TypeError, ValueError):
+            start = end = None
+        if start and fleet_index.can_answer(start, end):
+            return fleet_index.summary(start, end)
+        if not fleet_index.is_fresh():
+            rebuild_fleet_index_in_background()
+
+    cursor = get_db().cursor()
+    query = "SELECT * FROM wypozyczalnia.podsumuj_auta_dostepne_w_danym_terminie(%s, %s);"
+    cursor.execute(query, (data_rozpoczecia, data_zakonczenia))
+    cars, amount, models_amount, brands_amount = [], None, [], []
+    for poziom, id_auto, nazwa_modelu, nazwa_marki, numer_rejestracyjny, nazwa_klasy, ilosc in cursor.fetchall():
+        if poziom == 'auto':
+            cars.append((id_auto, nazwa_modelu, nazwa_marki, numer_rejestracyjny, nazwa_klasy))
+        elif poziom == 'model':
+            brands_amount.append((nazwa_marki, nazwa_modelu, ilosc))
+        elif poziom == 'marka':
+            models_amount.append((nazwa_marki, ilosc))
+        else:
+            amount = (ilosc,)
+    cursor.close()
+    return cars, amount, models_amount, brands_amount
+
+
+def rebuild_fleet_index():
+    """
+    Przebudowuje indeks floty na osobnym połączeniu z puli.
+    """
+    with app.app_context():
+        connection = db.engine.raw_connection()
+        try:
+            fleet_index.rebuild(connection)
+        finally:
+            connection.close()
+
+
+def rebuild_fleet_index_in_background():
+    """
+    Uruchamia przebudowę indeksu floty w wątku w tle, jeśli nie trwa już inna przebudowa.
+    """
+    if not fleet_index.rebuilding:
+        threading.Thread(target=rebuild_fleet_index, daemon=True).start()
+
+
+@app.route('/available_cars/index')
+def fleet_index_stats():
+    """
+    Zwraca stan indeksu floty w pamięci.
+
+    Returns:
+        Response: JSON z informacją o aktualności migawki, liczbie aut i wypożyczeń oraz czasie budowy.
+    """
+    if fleet_index is None:
+        return jsonify({'blad': 'Indeks floty jest wyłączony (FLEET_INDEX_ENABLED).'}), 404
+    return jsonify(fleet_index.stats())
+
+
+@app.route('/available_cars/index/rebuild', methods=['POST'])
+def fleet_index_rebuild():
+    """
+    Przebudowuje indeks floty w pamięci na żądanie.
+
+    Returns:
+        Response: JSON ze stanem indeksu po przebudowie.
+    """
+    if fleet_index is None:
+        return jsonify({'blad': 'Indeks floty jest wyłączony (FLEET_INDEX_ENABLED).'}), 404
+    fleet_index.rebuild(get_db())
+    return jsonify(fleet_index.stats())
+
+
 @app.route("/available_cars/search", methods=['GET', 'POST'])
 def available_cars_search():
     """
@@ -670,29 +1859,50 @@ def available_cars_search():
     """
     data_rozpoczecia = request.form.get("search_start_date")
     data_zakonczenia = request.form.get("search_end_date")
-    cursor = conn.cursor()
-
-    query_cars = "SELECT * FROM wypozyczalnia.dostepne_auta_w_danym_terminie(%s, %s);"
-    cursor.execute(query_cars, (data_rozpoczecia, data_zakonczenia))
-    cars = cursor.fetchall()
+    cars, amount, models_amount, brands_amount = search_available_cars(data_rozpoczecia, data_zakonczenia)
     labels = ["ID", "Model", "Marka", "Numer rejestracyjny", "Klasa"]
-
-    query_amount = "SELECT * FROM wypozyczalnia.policz_auta_dostepne_w_danym_terminie(%s, %s);"
-    cursor.execute(query_amount, (data_rozpoczecia, data_zakonczenia))
-    amount = cursor.fetchone()
-
-    query_models_amount = "SELECT * FROM wypozyczalnia.policz_modele_auta_dostepne_w_danym_terminie(%s, %s);"
-    cursor.execute(query_models_amount, (data_rozpoczecia, data_zakonczenia))
-    models_amount = cursor.fetchall()
     labels2 = ['Marka', 'Ilość']
-
-    query_brands_amount = "SELECT * FROM wypozyczalnia.policz_marki_auta_dostepne_w_danym_terminie(%s, %s);"
-    cursor.execute(query_brands_amount, (data_rozpoczecia, data_zakonczenia))
-    brands_amount = cursor.fetchall()
     labels3 = ['Marka', 'Model', 'Ilość']
 
     return render_template('available_cars.html', title = "Dostępność aut", labels=labels, data=cars, amount=amount, models=models_amount, labels2=labels2, brands=brands_amount, labels3=labels3)
 
+@app.route('/available_cars/calendar')
+def available_cars_calendar():
+    """
+    Zwraca liczbę wolnych aut w każdym dniu okresu (np. do mapy cieplnej), opcjonalnie dla modelu, marki lub klasy.
+
+    Args:
+        od (str): Pierwszy dzień (RRRR-MM-DD), domyślnie dzisiaj.
+        do (str): Ostatni dzień (RRRR-MM-DD), domyślnie 89 dni po `od`.
+        id_model (int): Ogranicza auta do modelu.
+        id_marka (int): Ogranicza auta do marki.
+        id_klasa (int): Ogranicza auta do klasy.
+
+    Returns:
+        Response: JSON `{"od", "do", "liczba_aut", "wolne": [...]}`, gdzie `wolne[i]` to liczba aut wolnych
+            w dniu `od + i`, lub opis błędu.
+    """
+    try:
+        od = date.fromisoformat(request.args['od']) if request.args.get('od') else date.today()
+        do = date.fromisoformat(request.args['do']) if request.args.get('do') else od + timedelta(days=89)
+    except ValueError:
+        return api_response({'blad': "Parametry od i do muszą być datami w formacie RRRR-MM-DD."}, 400)
+    if od > do:
+        return api_response({'blad': "Data rozpoczęcia nie może być późniejsza niż data zakończenia."}, 400)
+    if (do - od).days + 1 > CALENDAR_MAX_DAYS:
+        return api_response({'blad': f"Okres może obejmować najwyżej {CALENDAR_MAX_DAYS} dni."}, 400)
+    filters = {}
+    for key in ('id_model', 'id_marka', 'id_klasa'):
+        value = request.args.get(key)
+        if value is None:
+            continue
+        if not value.isdigit():
+            return api_response({'blad': f"Parametr {key} musi być liczbą całkowitą."}, 400)
+        filters[key] = int(value)
+    car_count, free = free_cars_per_day(get_db(), od, do, **filters)
+    return api_response({'od': od, 'do': do, 'liczba_aut': car_count, 'wolne': free.tolist()})
+
+
 @app.route("/popular_cars/search", methods=['GET', 'POST'])
 def popular_cars_search():
     """
@@ -705,12 +1915,89 @@ def popular_cars_search():
         str: Renderowany szablon HTML z listą najpopularniejszych modeli samochodów.
     """
     rental_amount = request.form.get("rental_amount")
-    cursor = conn.cursor()
+    cursor = get_db().cursor()
     query = "SELECT * FROM wypozyczalnia.najpopularniejsze_modele(%s);"
-    cursor.execute(query, rental_amount)
+    cursor.execute(query, (rental_amount,))
     cars = cursor.fetchall()
 
     return render_template('popular_cars.html', title = "Dostępność aut", labels=['Model', 'Marka', 'Liczba wypożyczeń'], data=cars)
+
+
+UTILIZATION_GRANULARITIES = [('miesiac', 'Miesiące'), ('tydzien', 'Tygodnie'), ('dzien', 'Dni')]
+UTILIZATION_LEVELS = [('model', 'Modele'), ('klasa', 'Klasy'), ('auto', 'Auta')]
+
+
+def fleet_utilization(start, end, granularity):
+    """
+    Zwraca dni wypożyczenia aut floty w podokresach okresu z pamięci podręcznej `utilization_cache`.
+
+    Wynik jest zapamiętywany dla okresu i szczegółowości, a unieważniany przez `apply_change` przy zmianie
+    aut, modeli, marek, klas lub wypożyczeń (oraz po `UTILIZATION_CACHE_TTL` sekundach).
+
+    Args:
+        start (date): Pierwszy dzień okresu.
+        end (date): Ostatni dzień okresu.
+        granularity (str): 'dzien', 'tydzien' lub 'miesiac'.
+
+    Returns:
+        Utilization: Wykorzystanie floty.
+
+    Raises:
+        ValueError: Przy niepoprawnym okresie lub szczegółowości.
+    """
+    def load():
+        # Wynik unieważniany jest powiadomieniem z serwera głównego (jak `reference_rows`).
+        with on_primary():
+            return Utilization.load(get_db(), start, end, granularity, max_periods=UTILIZATION_MAX_PERIODS)
+
+    return utilization_cache.get_or_load(('wykorzystanie', start, end, granularity), FLEET_TABLES, load)
+
+
+@app.route('/utilization')
+def utilization():
+    """
+    Wyświetla widok raportu wykorzystania floty.
+
+    Returns:
+        str: Renderowany szablon HTML z formularzem wyboru okresu, szczegółowości i poziomu raportu.
+    """
+    return render_template('utilization.html', title="Wykorzystanie floty", form={},
+                           granularities=UTILIZATION_GRANULARITIES, levels=UTILIZATION_LEVELS)
+
+
+@app.route('/utilization/search', methods=['GET', 'POST'])
+def utilization_search():
+    """
+    Oblicza wykorzystanie aut, modeli lub klas (odsetek dni wypożyczenia) w podanym okresie.
+
+    Args:
+        search_start_date (str): Data rozpoczęcia okresu.
+        search_end_date (str): Data zakończenia okresu.
+        granularity (str): 'dzien', 'tydzien' lub 'miesiac'.
+        level (str): 'auto', 'model' lub 'klasa'.
+
+    Returns:
+        str: Renderowany szablon HTML z wykorzystaniem w każdym podokresie i w całym okresie.
+    """
+    form = request.values
+    page = dict(title="Wykorzystanie floty", form=form, granularities=UTILIZATION_GRANULARITIES, levels=UTILIZATION_LEVELS)
+    try:
+        start = date.fromisoformat(form.get('search_start_date', ''))
+        end = date.fromisoformat(form.get('search_end_date', ''))
+    except ValueError:
+        flash("Błąd: Wprowadź poprawne daty.", "error")
+        return render_template('utilization.html', **page)
+    level = form.get('level', 'model')
+    try:
+        result = fleet_utilization(start, end, form.get('granularity', 'miesiac'))
+        rows = result.rows(level)
+    except ValueError as e:
+        flash(f"Błąd: {e}", "error")
+        return render_template('utilization.html', **page)
+    labels = [{'auto': 'Auto', 'model': 'Model', 'klasa': 'Klasa'}[level], 'Liczba aut']
+    labels += [first.isoformat() for first, _ in result.periods] + ['Cały okres']
+    data = [(opis, liczba, *[f"{value}%" for value in values], f"{overall}%") for opis, liczba, values, overall in rows]
+    return render_template('utilization.html', labels=labels, data=data, fleet=result.fleet(), **page)
      
 
 
@@ -739,6 +2026,8 @@ def add_car():
         )
         db.session.add(new_car)
         db.session.commit()
+        if fleet_index is not None:
+            fleet_index.mark_stale()
         flash("Samochód został pomyślnie dodany!", "success")
         return redirect('/cars')
 
@@ -776,6 +2065,7 @@ def add_model():
         )
         db.session.add(new_model)
         db.session.commit()
+        reference_cache.invalidate('modele')
         flash("Model został pomyślnie dodany!", "success")
         return redirect('/models')
 
@@ -806,6 +2096,7 @@ def add_brand():
         )
         db.session.add(new_brand)
         db.session.commit()
+        reference_cache.invalidate('marki')
         flash(f"Marka {nazwa_marki} została pomyślnie dodana!", "success")
         return redirect('/brands')
 
@@ -839,6 +2130,7 @@ def add_class():
         )
         db.session.add(new_class)
         db.session.commit()
+        reference_cache.invalidate('klasa')
         flash(f"Klasa {nazwa_klasy} została pomyślnie dodana!", "success")
         return redirect('/classes')
 
@@ -911,6 +2203,7 @@ def add_job():
         )
         db.session.add(new_job)
         db.session.commit()
+        reference_cache.invalidate('role')
         flash(f"Stanowisko {stanowisko} zostało pomyślnie dodane", "success")
         return redirect('/jobs')
 
@@ -990,6 +2283,11 @@ def add_rental():
         if new_order.status == 'nieudane':
             flash(f"Brak dostępnych aut w podanym terminie. Spróbuj inny model lub zmień termin zamówienia.", "error")
         else:
+            if fleet_index is not None:
+                rental = Rental.query.filter_by(id_klient=new_order.id_klient, data_wypozyczenia=new_order.data_rozpoczecia,
+                                                data_oddania=new_order.data_zakonczenia).order_by(Rental.id_wypozyczenia.desc()).first()
+                if rental:
+                    fleet_index.add_rental(rental.id_wypozyczenia, rental.id_auto, rental.data_wypozyczenia, rental.data_oddania)
             flash(f"Zamówienie zostało pomyślnie dodane", "success")
         return redirect('/rentals')
 
@@ -1003,6 +2301,310 @@ def add_rental():
         return redirect('/rentals')
     
 
+BULK_ORDER_FIELDS = ('id_klient', 'id_model', 'data_rozpoczecia', 'data_zakonczenia')
+
+
+def parse_bulk_orders():
+    """
+    Odczytuje listę zamówień z treści żądania w formacie JSON lub CSV.
+
+    JSON to lista obiektów (lub obiekt z kluczem `zamowienia`), CSV to plik z nagłówkiem; w obu przypadkach
+    pola to `id_klient`, `id_model`, `data_rozpoczecia` i `data_zakonczenia` (daty w formacie RRRR-MM-DD).
+    CSV może zostać przesłany jako treść żądania (`text/csv`) lub jako plik formularza w polu `file`.
+
+    Returns:
+        list[dict]: Surowe wiersze zamówień.
+
+    Raises:
+        ValueError: Gdy treść żądania nie jest poprawnym JSON-em ani CSV.
+    """
+    if request.is_json:
+        payload = request.get_json(silent=True)
+        if isinstance(payload, dict):
+            payload = payload.get('zamowienia')
+        if not isinstance(payload, list):
+            raise ValueError('Oczekiwano listy zamówień w formacie JSON.')
+        return payload
+    if 'file' in request.files:
+        text = request.files['file'].read().decode('utf-8-sig')
+    else:
+        text = request.get_data(as_text=True)
+    if not text.strip():
+        raise ValueError('Brak zamówień w treści żądania.')
+    return list(csv.DictReader(io.StringIO(text)))
+
+
+def validate_bulk_order(row):
+    """
+    Sprawdza format pojedynczego zamówienia zbiorczego.
+
+    Returns:
+        tuple: (zamówienie jako krotka (id_klient, id_model, początek, koniec), None) lub (None, komunikat błędu).
+    """
+    if not isinstance(row, dict):
+        return None, 'Zamówienie musi być obiektem.'
+    missing = [field for field in BULK_ORDER_FIELDS if row.get(field) in (None, '')]
+    if missing:
+        return None, f"Brak pól: {', '.join(missing)}."
+    try:
+        order = (int(row['id_klient']), int(row['id_model']),
+                 date.fromisoformat(str(row['data_rozpoczecia']).strip()),
+                 date.fromisoformat(str(row['data_zakonczenia']).strip()))
+    except ValueError:
+        return None, 'Nieprawidłowy identyfikator lub data (oczekiwano RRRR-MM-DD).'
+    if order[3] <= order[2]:
+        return None, 'Data zakończenia musi być późniejsza niż data rozpoczęcia.'
+    return order, None
+
+
+class BookingError(Exception):
+    """
+    Błąd uniemożliwiający realizację partii zamówień (np. brak pracowników mogących wynajmować auta).
+    """
+
+
+def book_orders(connection, orders):
+    """
+    Realizuje listę zamówień w jednej transakcji, przydzielając auta i pracowników dla całej partii naraz.
+
+    Auta zamawianych modeli są blokowane (FOR NO KEY UPDATE, jak w `zloz_zamowienie`), więc partia nie koliduje
+    z równoległymi zamówieniami na te same modele, a nie wstrzymuje sprawdzeń klucza obcego `wypozyczenia.id_auto`. Liczniki obciążenia pracowników są tylko odczytywane:
+    blokowanie ich wszystkich na czas partii wstrzymałoby każde inne zamówienie (`wybierz_pracownika`
+    czeka na blokadę, gdy pominie wszystkich zablokowanych), a poprawne wartości liczników utrzymuje
+    wyzwalacz na wypożyczeniach. Istniejące wypożyczenia
+    tych aut są wczytywane jednym zapytaniem, a przydział odbywa się zachłannie w kolejności zamówień:
+    pierwsze wolne auto modelu (wg ID) i najmniej obciążony pracownik, tak jak w pojedynczym zamówieniu.
+    Wypożyczenia i zamówienia (z gotowym statusem, bez wyzwalacza `zloz_zamowienie`) są wstawiane
+    zbiorczo, a płatności dodaje wyzwalacz na poziomie instrukcji.
+
+    Args:
+        connection (connection): Połączenie psycopg2; transakcja jest zatwierdzana przez wywołującego.
+        orders (list[tuple]): Zamówienia (id_klient, id_model, początek, koniec) o poprawnym formacie.
+
+    Returns:
+        list[dict]: Wynik każdego zamówienia w kolejności wejściowej.
+
+    Raises:
+        BookingError: Gdy wolne auto znaleziono, ale żaden pracownik nie może wynajmować aut
+            (jak `brak dostępnych pracowników` w `wybierz_pracownika`).
+    """
+    cursor = connection.cursor()
+    cursor.execute("SELECT id_klient FROM wypozyczalnia.klienci WHERE id_klient = ANY(%s)",
+                   (sorted({order[0] for order in orders}),))
+    clients = {row[0] for row in cursor.fetchall()}
+    cursor.execute("""
+        SELECT id_auto, id_model FROM wypozyczalnia.auta
+        WHERE id_model = ANY(%s) ORDER BY id_auto FOR NO KEY UPDATE""", (sorted({order[1] for order in orders}),))
+    cars_by_model = {}
+    for id_auto, id_model in cursor.fetchall():
+        cars_by_model.setdefault(id_model, []).append(id_auto)
+    cursor.execute("SELECT id_model FROM wypozyczalnia.modele WHERE id_model = ANY(%s)",
+                   (sorted({order[1] for order in orders}),))
+    models = {row[0] for row in cursor.fetchall()}
+
+    intervals = {id_auto: CarIntervals() for cars in cars_by_model.values() for id_auto in cars}
+    if intervals:
+        cursor.execute("""
+            SELECT id_wypozyczenia, id_auto, data_wypozyczenia, data_oddania FROM wypozyczalnia.wypozyczenia
+            WHERE id_auto = ANY(%s) AND okres && daterange(%s, %s, '[]')""",
+                       (list(intervals), min(order[2] for order in orders), max(order[3] for order in orders)))
+        for id_wypozyczenia, id_auto, start, end in cursor.fetchall():
+            intervals[id_auto].add(id_wypozyczenia, start.toordinal(), end.toordinal())
+
+    cursor.execute("""
+        SELECT o.id_pracownik, o.liczba_wypozyczen FROM wypozyczalnia.obciazenie_pracownikow o
+        JOIN wypozyczalnia.pracownicy p ON p.id_pracownik = o.id_pracownik
+        JOIN wypozyczalnia.role r ON r.id_rola = p.id_rola
+        WHERE r.czy_moze_wynajmowac = True AND r.id_rola != 1
+        ORDER BY o.id_pracownik""")
+    employees = [(load, id_pracownik) for id_pracownik, load in cursor.fetchall()]
+    heapq.heapify(employees)
+
+    results = []
+    rentals = []
+    for nr, (id_klient, id_model, start, end) in enumerate(orders):
+        result = {'nr': nr, 'id_klient': id_klient, 'id_model': id_model,
+                  'data_rozpoczecia': start.isoformat(), 'data_zakonczenia': end.isoformat()}
+        results.append(result)
+        if id_klient not in clients:
+            result.update(status=None, blad='Nie ma klienta o podanym ID.')
+            continue
+        if id_model not in models:
+            result.update(status=None, blad='Nie ma modelu o podanym ID.')
+            continue
+        first, last = start.toordinal(), end.toordinal()
+        id_auto = next((car for car in cars_by_model.get(id_model, []) if not intervals[car].overlaps(first, last)), None)
+        if id_auto is None:
+            result['status'] = 'nieudane'
+            continue
+        if not employees:
+            raise BookingError('Brak dostępnych pracowników.')
+        load, id_pracownik = heapq.heappop(employees)
+        heapq.heappush(employees, (load + 1, id_pracownik))
+        intervals[id_auto].add(-len(rentals) - 1, first, last)
+        result.update(status='udane', id_auto=id_auto, id_pracownik=id_pracownik)
+        rentals.append(result)
+
+    if rentals:
+        cursor.execute("""
+            INSERT INTO wypozyczalnia.wypozyczenia (data_wypozyczenia, data_oddania, id_klient, id_auto, id_pracownik)
+            SELECT * FROM unnest(%s::date[], %s::date[], %s::int[], %s::int[], %s::int[])
+            RETURNING id_wypozyczenia, id_auto, data_wypozyczenia""",
+                       ([r['data_rozpoczecia'] for r in rentals], [r['data_zakonczenia'] for r in rentals],
+                        [r['id_klient'] for r in rentals], [r['id_auto'] for r in rentals],
+                        [r['id_pracownik'] for r in rentals]))
+        ids = {(id_auto, start): id_wypozyczenia for id_wypozyczenia, id_auto, start in cursor.fetchall()}
+        for rental in rentals:
+            rental['id_wypozyczenia'] = ids[(rental['id_auto'], date.fromisoformat(rental['data_rozpoczecia']))]
+
+    placed = [result for result in results if result['status'] is not None]
+    if placed:
+        cursor.execute("""
+            INSERT INTO wypozyczalnia.zamowienia (id_klient, id_model, data_rozpoczecia, data_zakonczenia, status)
+            SELECT k, m, p, z, s FROM unnest(%s::int[], %s::int[], %s::date[], %s::date[], %s::wypozyczalnia.status_enum[])
+                WITH ORDINALITY AS t(k, m, p, z, s, nr)
+            ORDER BY nr
+            RETURNING id_zamowienia""",
+                       ([r['id_klient'] for r in placed], [r['id_model'] for r in placed],
+                        [r['data_rozpoczecia'] for r in placed], [r['data_zakonczenia'] for r in placed],
+                        [r['status'] for r in placed]))
+        for result, id_zamowienia in zip(placed, sorted(row[0] for row in cursor.fetchall())):
+            result['id_zamowienia'] = id_zamowienia
+    cursor.close()
+    return results
+
+
+@app.route('/rentals/add/bulk', methods=['POST'])
+def add_rentals_bulk():
+    """
+    Dodaje zbiorczo listę zamówień na wynajem (JSON lub CSV, patrz `parse_bulk_orders`).
+
+    Wszystkie zamówienia są realizowane w jednej transakcji przez `book_orders`. Zamówienia o błędnym
+    formacie lub z nieistniejącym klientem albo modelem nie są zapisywane i mają status `null` z opisem błędu.
+
+    Returns:
+        Response: JSON z wynikiem każdego zamówienia (status 'udane'/'nieudane', przydzielone auto,
+        pracownik i wypożyczenie) oraz podsumowaniem partii.
+    """
+    started = time.perf_counter()
+    try:
+        rows = parse_bulk_orders()
+    except (ValueError, csv.Error) as e:
+        return jsonify({'blad': str(e)}), 400
+    if len(rows) > BULK_ORDER_MAX:
+        return jsonify({'blad': f'Partia może zawierać najwyżej {BULK_ORDER_MAX} zamówień.'}), 413
+
+    checked = [validate_bulk_order(row) for row in rows]
+    orders = [order for order, error in checked if order is not None]
+    connection = get_db()
+    try:
+        booked = iter(book_orders(connection, orders) if orders else [])
+        connection.commit()
+    except BookingError as e:
+        connection.rollback()
+        return jsonify({'blad': str(e)}), 409
+    except psycopg2.Error as e:
+        connection.rollback()
+        return jsonify({'blad': (e.pgerror or str(e)).strip()}), 409
+
+    results = []
+    for nr, (order, error) in enumerate(checked):
+        result = next(booked) if order is not None else {'status': None, 'blad': error}
+        result['nr'] = nr
+        results.append(result)
+        if fleet_index is not None and result['status'] == 'udane':
+            fleet_index.add_rental(result['id_wypozyczenia'], result['id_auto'],
+                                   date.fromisoformat(result['data_rozpoczecia']), date.fromisoformat(result['data_zakonczenia']))
+
+    return jsonify({
+        'zamowienia': results,
+        'udane': sum(1 for result in results if result['status'] == 'udane'),
+        'nieudane': sum(1 for result in results if result['status'] == 'nieudane'),
+        'bledy': sum(1 for result in results if result['status'] is None),
+        'czas_s': round(time.perf_counter() - started, 3),
+    })
+
+
+IMPORT_LABELS = {'cars': 'Auta', 'clients': 'Klienci', 'workers': 'Pracownicy'}
+
+
+@app.route('/import', methods=['GET', 'POST'])
+def import_data():
+    """
+    Importuje auta, klientów lub pracowników z pliku CSV (patrz moduł `csv_import`).
+
+    Formularz przesyła rodzaj importu (`kind`) i plik (`file`). Żądania z nagłówkiem
+    `Accept: application/json` otrzymują podsumowanie w formacie JSON zamiast strony HTML.
+
+    Returns:
+        str: Renderowany szablon HTML z formularzem, wynikiem importu i historią importów.
+    """
+    result = None
+    if request.method == 'POST':
+        kind = request.form.get('kind')
+        upload = request.files.get('file')
+        wants_json = request.accept_mimetypes.best == 'application/json'
+        if kind not in IMPORTS or upload is None or not upload.filename:
+            message = "Wybierz rodzaj importu i plik CSV."
+            if wants_json:
+                return jsonify({'blad': message}), 400
+            flash(message, "error")
+            return redirect(url_for('import_data'))
+
+        connection = get_db()
+        try:
+            stream = io.TextIOWrapper(upload.stream, encoding='utf-8-sig', newline='')
+            result = import_csv(connection, kind, stream, upload.filename)
+            connection.commit()
+        except (CsvImportError, UnicodeDecodeError) as e:
+            connection.rollback()
+            message = str(e) if isinstance(e, CsvImportError) else "Plik musi być zapisany w kodowaniu UTF-8."
+            if wants_json:
+                return jsonify({'blad': message}), 400
+            flash(message, "error")
+            return redirect(url_for('import_data'))
+
+        if kind == 'cars' and fleet_index is not None:
+            fleet_index.mark_stale()
+        if result['odrzucone']:
+            result['raport'] = url_for('import_report', id=result['id_importu'])
+        if wants_json:
+            return jsonify(result)
+        flash(f"Zaimportowano {result['dodane']} rekordów, odrzucono {result['odrzucone']}.",
+              "error" if result['odrzucone'] else "success")
+
+    cursor = get_db().cursor()
+    cursor.execute("""
+        SELECT id_importu, rodzaj, plik, data_importu, dodane, odrzucone, czas_s
+        FROM wypozyczalnia.importy ORDER BY id_importu DESC LIMIT 20;""")
+    history = cursor.fetchall()
+    cursor.close()
+    return render_template('import.html', title="Import CSV", kinds=IMPORT_LABELS, imports=IMPORTS,
+                           result=result, history=history)
+
+
+@app.route('/import/<int:id>/raport')
+def import_report(id):
+    """
+    Zwraca raport odrzuconych wierszy importu jako plik CSV do pobrania.
+
+    Args:
+        id (int): Identyfikator importu.
+
+    Returns:
+        Response: Plik CSV z numerem wiersza, danymi i przyczyną odrzucenia lub przekierowanie, gdy raport nie istnieje.
+    """
+    cursor = get_db().cursor()
+    cursor.execute("SELECT rodzaj, raport FROM wypozyczalnia.importy WHERE id_importu = %s;", (id,))
+    row = cursor.fetchone()
+    cursor.close()
+    if row is None or row[1] is None:
+        flash("Nie ma raportu dla podanego importu.", "error")
+        return redirect(url_for('import_data'))
+    return Response(row[1], mimetype='text/csv',
+                    headers={'Content-Disposition': f'attachment; filename=import_{id}_{row[0]}_odrzucone.csv'})
+
+
 @app.route('/pricelist/add', methods=['POST'])
 def add_pricelist():
     """
@@ -1022,6 +2624,7 @@ def add_pricelist():
         )
         db.session.add(new_price_list)
         db.session.commit()
+        reference_cache.invalidate('cennik')
         
         flash(f"Zamówienie zostało pomyślnie dodane", "success")
         return redirect('/pricelist')
@@ -1071,6 +2674,8 @@ def delete_car(id):
         Response: Przekierowanie na listę samochodów z odpowiednim komunikatem.
     """
     if delete_record(Car, id, 'id_auto'):
+        if fleet_index is not None:
+            fleet_index.mark_stale()
         flash(f"Auto {id} zostało pomyślnie usunięte.", "success")  
     return redirect('/cars')
 
@@ -1086,6 +2691,9 @@ def delete_model(id):
         Response: Przekierowanie na listę modeli z odpowiednim komunikatem.
     """
     if delete_record(Model, id, 'id_model'):
+        reference_cache.invalidate('modele')
+        if fleet_index is not None:
+            fleet_index.mark_stale()
         flash(f"Model {id} został pomyślnie usunięty.", "success")
     else:
         flash(f"Wystąpił nieoczekiwany błąd podczas usuwania rekordu", "error")   
@@ -1103,6 +2711,9 @@ def delete_brand(id):
         Response: Przekierowanie na listę marek z odpowiednim komunikatem.
     """
     if delete_record(Brand, id, 'id_marka'):
+        reference_cache.invalidate('marki')
+        if fleet_index is not None:
+            fleet_index.mark_stale()
         flash(f"Marka {id} została pomyślnie usunięta.", "success")
     else:
         flash(f"Wystąpił nieoczekiwany błąd podczas usuwania rekordu", "error")   
@@ -1120,6 +2731,9 @@ def delete_class(id):
         Response: Przekierowanie na listę klas z odpowiednim komunikatem.
     """
     if delete_record(CarClass, id, 'id_klasa'):
+        reference_cache.invalidate('klasa')
+        if fleet_index is not None:
+            fleet_index.mark_stale()
         flash(f"Klasa {id} została pomyślnie usunięta.", "success")
     else:
         flash(f"Wystąpił nieoczekiwany błąd podczas usuwania rekordu", "error")   
@@ -1154,6 +2768,7 @@ def delete_job(id):
         Response: Przekierowanie na listę stanowisk z odpowiednim komunikatem.
     """
     if delete_record(Job, id, 'id_rola'):
+        reference_cache.invalidate('role')
         flash(f"Stanowisko {id} zostało pomyślnie usunięte.", "success")
     else:
         flash(f"Wystąpił nieoczekiwany błąd podczas usuwania rekordu", "error")   
@@ -1188,6 +2803,7 @@ def delete_pricelist(id):
         Response: Przekierowanie na listę cenników z odpowiednim komunikatem.
     """
     if delete_record(PriceList, id, 'id_cennik'):
+        reference_cache.invalidate('cennik')
         flash(f"Rekord {id} został pomyślnie usunięty.", "success")
     else:
         flash(f"Wystąpił nieoczekiwany błąd podczas usuwania rekordu", "error")   
@@ -1222,11 +2838,78 @@ def delete_rental(id):
         Response: Przekierowanie na listę wypożyczeń z odpowiednim komunikatem.
     """
     if delete_record(Rental, id, 'id_wypozyczenia'):
+        if fleet_index is not None:
+            fleet_index.remove_rental(id)
         flash(f"Zamówienie {id} zostało pomyślnie usunięte.", "success")
     else:
         flash(f"Wystąpił nieoczekiwany błąd podczas usuwania rekordu", "error")   
     return redirect('/rentals')
 
+@app.route('/workers/load')
+def workers_load():
+    """
+    Wyświetla bieżące obciążenie pracowników.
+
+    Liczba wypożyczeń pracownika jest utrzymywana przez wyzwalacz w tabeli `obciazenie_pracownikow`
+    i na jej podstawie `wybierz_pracownika` przydziela nowe wypożyczenia.
+
+    Returns:
+        str: Renderowany szablon HTML z raportem obciążenia pracowników.
+    """
+    cursor = get_db().cursor()
+    cursor.execute("""
+        SELECT id_pracownik, pracownik, stanowisko,
+               CASE WHEN przydzielany_do_wypozyczen THEN 'Tak' ELSE 'Nie' END, liczba_wypozyczen
+        FROM wypozyczalnia.raport_obciazenia_pracownikow
+        ORDER BY przydzielany_do_wypozyczen DESC, liczba_wypozyczen, id_pracownik;""")
+    load = cursor.fetchall()
+    cursor.close()
+    return render_template('workers_load.html', title="Obciążenie pracowników",
+                           labels=['ID', 'Pracownik', 'Stanowisko', 'Przydzielany do wypożyczeń', 'Liczba wypożyczeń'], data=load)
+
+@app.route('/cache/stats')
+def cache_stats():
+    """
+    Zwraca statystyki pamięci podręcznej danych słownikowych.
+
+    Returns:
+        Response: JSON z liczbą wpisów, limitami, trafieniami, chybieniami i unieważnieniami
+            oraz stanem nasłuchu powiadomień o zmianach, pamięci wyników wykorzystania floty
+            i scalania zmian przychodów.
+    """
+    stats = reference_cache.stats()
+    stats['wykorzystanie_floty'] = utilization_cache.stats()
+    stats['nasluch_zmian'] = change_listener.stats() if change_listener is not None else None
+    stats['scalanie_przychodow'] = revenue_merger.stats() if revenue_merger is not None else None
+    return jsonify(stats)
+
+@app.route('/pool/stats')
+def pool_stats():
+    """
+    Zwraca statystyki puli połączeń bieżącego procesu.
+
+    Returns:
+        Response: JSON z rozmiarem puli, liczbą połączeń w użyciu i czasami oczekiwania oraz
+            (gdy skonfigurowano REPLICA_URLS) stanem i pulami replik.
+    """
+    stats = db.engine.pool.stats()
+    if replicas is not None:
+        stats['odczyt'] = replicas.stats()
+    return jsonify(stats)
+
+@app.route('/metrics')
+def prometheus_metrics():
+    """
+    Zwraca statystyki tras w formacie tekstowym Prometheusa.
+
+    Dla każdego widoku: liczbę żądań wg metody i kodu odpowiedzi, histogram czasu obsługi, histogram liczby
+    zapytań SQL na żądanie oraz łączny czas zapytań i liczbę odczytanych wierszy.
+
+    Returns:
+        Response: Tekst w formacie Prometheusa (text/plain; version=0.0.4).
+    """
+    return Response(route_metrics.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
 def display_error(error_message):
     """
     Obsługuje błędy bazy danych, wyświetlając odpowiednie komunikaty użytkownikowi.
@@ -0,0 +1,154 @@
+"""
+Asynchroniczna ścieżka odczytu dla wyszukiwania dostępnych aut, najpopularniejszych modeli i raportu finansowego.
+
+Aplikacja ASGI (Quart + asyncpg) obsługuje te same adresy i szablony co odpowiadające im widoki w `app.py`,
+ale oczekiwanie na bazę nie blokuje wątku: jeden proces obsługuje wiele równoczesnych żądań, a ich liczbę
+ogranicza wyłącznie pula połączeń asyncpg (`ASYNC_DB_POOL_SIZE`). Niezależne zapytania jednego żądania
+wykonywane są równolegle na osobnych połączeniach z puli.
+
+Uruchamiana jako osobny proces obok aplikacji Flask, np. za serwerem proxy kierującym do niej wyłącznie
+te adresy:
+
+    hypercorn async_app:app --bind 127.0.0.1:5001
+"""
+import asyncio
+import os
+import re
+from datetime import date
+
+import asyncpg
+from dotenv import load_dotenv
+from quart import Quart, abort, render_template, request
+
+load_dotenv()
+DB_URL = os.getenv('DATABASE_URL')
+app = Quart(__name__)
+app.secret_key = os.urandom(24)
+
+
+@app.before_serving
+async def open_pool():
+    """
+    Tworzy pulę połączeń asyncpg przy starcie serwera.
+    """
+    # asyncpg przyjmuje adres bez nazwy sterownika SQLAlchemy (np. postgresql+psycopg2://).
+    app.db_pool = await asyncpg.create_pool(
+        re.sub(r'^postgres(ql)?\+\w+://', 'postgresql://', DB_URL),
+        min_size=int(os.getenv('ASYNC_DB_POOL_MIN_SIZE', 2)),
+        max_size=int(os.getenv('ASYNC_DB_POOL_SIZE', 20)),
+        command_timeout=float(os.getenv('ASYNC_DB_COMMAND_TIMEOUT', 30)),
+    )
+
+
+@app.after_serving
+async def close_pool():
+    await app.db_pool.close()
+
+
+async def fetch(query, *args):
+    """
+    Wykonuje zapytanie na połączeniu pobranym z puli na czas tego jednego zapytania.
+
+    Dzięki temu zapytania uruchamiane przez `asyncio.gather` trafiają na osobne połączenia i wykonują się równolegle.
+
+    Returns:
+        list[Record]: Wiersze wyniku.
+    """
+    async with app.db_pool.acquire() as connection:
+        return await connection.fetch(query, *args)
+
+
+def parse_date(value):
+    try:
+        return date.fromisoformat(value)
+    except (TypeError, ValueError):
+        abort(400)
+
+
+@app.route('/available_cars/search', methods=['GET', 'POST'])
+async def available_cars_search():
+    """
+    Przeszukuje dostępne samochody w podanym przedziale czasowym (odpowiednik widoku z `app.py`).
+
+    Lista aut i podsumowania wg marek i modeli pochodzą z jednego zapytania
+    (`podsumuj_auta_dostepne_w_danym_terminie` liczy je z jednego zbioru wolnych aut).
+
+    Returns:
+        str: Renderowany szablon HTML z wynikami wyszukiwania, liczbą dostępnych aut, modeli i marek.
+    """
+    form = await request.form
+    data_rozpoczecia = parse_date(form.get("search_start_date"))
+    data_zakonczenia = parse_date(form.get("search_end_date"))
+    rows = await fetch("SELECT * FROM wypozyczalnia.podsumuj_auta_dostepne_w_danym_terminie($1, $2);",
+                       data_rozpoczecia, data_zakonczenia)
+    cars, amount, models_amount, brands_amount = [], None, [], []
+    for poziom, id_auto, nazwa_modelu, nazwa_marki, numer_rejestracyjny, nazwa_klasy, ilosc in rows:
+        if poziom == 'auto':
+            cars.append((id_auto, nazwa_modelu, nazwa_marki, numer_rejestracyjny, nazwa_klasy))
+        elif poziom == 'model':
+            brands_amount.append((nazwa_marki, nazwa_modelu, ilosc))
+        elif poziom == 'marka':
+            models_amount.append((nazwa_marki, ilosc))
+        else:
+            amount = (ilosc,)
+    labels = ["ID", "Model", "Marka", "Numer rejestracyjny", "Klasa"]
+    labels2 = ['Marka', 'Ilość']
+    labels3 = ['Marka', 'Model', 'Ilość']
+    return await render_template('available_cars.html', title = "Dostępność aut", labels=labels, data=cars, amount=amount, models=models_amount, labels2=labels2, brands=brands_amount, labels3=labels3)
+
+
+@app.route("/popular_cars/search", methods=['GET', 'POST'])
+async def popular_cars_search():
+    """
+    Wyszukuje najpopularniejsze modele samochodów (odpowiednik widoku z `app.py`).
+
+    Returns:
+        str: Renderowany szablon HTML z listą najpopularniejszych modeli samochodów.
+    """
+    form = await request.form
+    try:
+        rental_amount = int(form.get("rental_amount", 0))
+    except ValueError:
+        abort(400)
+    cars = await fetch("SELECT * FROM wypozyczalnia.najpopularniejsze_modele($1);", rental_amount)
+    return await render_template('popular_cars.html', title = "Dostępność aut", labels=['Model', 'Marka', 'Liczba wypożyczeń'], data=cars)
+
+
+@app.route('/incomes/all')
+async def get_raport():
+    """
+    Wyświetla raport finansowy (odpowiednik widoku z `app.py`).
+
+    Podsumowanie przychodów i przychody na klasy aut pobierane są równolegle.
+
+    Returns:
+        str: Renderowany szablon HTML z raportem finansowym.
+    """
+    monthly = request.args.get('podzial') == 'miesiace'
+    if monthly:
+        report, class_report = await asyncio.gather(
+            fetch("SELECT * FROM wypozyczalnia.raport_finansowy_miesieczny();"),
+            fetch("SELECT * FROM wypozyczalnia.przychody_na_klasy_aut_miesiecznie();"))
+        labels = ['Miesiąc', 'Klasa', 'Liczba wypożyczeń', 'Całkowity przychód']
+        labels2 = ['Miesiąc', 'Całkowity przychód', 'Średni przychód']
+    else:
+        report, class_report = await asyncio.gather(
+            fetch("SELECT * FROM wypozyczalnia.raport_finansowy;"),
+            fetch("SELECT * FROM wypozyczalnia.przychody_na_klasy_aut();"))
+        labels = ['Klasa', 'Liczba wypożyczeń', 'Całkowity przychód']
+        labels2 = ['Całkowity przychód', 'Średni przychód']
+    return await render_template('incomes.html', title = "Podsumowanie finansowe", labels=labels, labels2=labels2, data=class_report, report=report, monthly=monthly)
+
+
+@app.route('/async/pool/stats')
+async def pool_stats():
+    """
+    Zwraca stan puli połączeń asyncpg bieżącego procesu.
+    """
+    pool = app.db_pool
+    return {
+        'rozmiar': pool.get_size(),
+        'limit': pool.get_max_size(),
+        'wolne': pool.get_idle_size(),
+        'w_uzyciu': pool.get_size() - pool.get_idle_size(),
+    }
@@ -321,6 +321,19 @@ end;
 
 alter table wypozyczalnia.modele alter column id_klasa set not null;
 --------------------------------------------------------------------------------------------------------------------------------------
+alter table wypozyczalnia.wypozyczenia add column okres daterange
+	generated always as (daterange(data_wypozyczenia, data_oddania, '[]')) stored;
+
+create index idx_wypozyczenia_okres on wypozyczalnia.wypozyczenia using gist (okres);
+
+create extension if not exists btree_gist;
+
+alter table wypozyczalnia.wypozyczenia add constraint wyklucz_nakladajace_sie_wypozyczenia
+	exclude using gist (id_auto with =, okres with &&);
+create index idx_wypozyczenia_id_auto on wypozyczalnia.wypozyczenia (id_auto);
+create index idx_wypozyczenia_id_klient on wypozyczalnia.wypozyczenia (id_klient);
+create index idx_wypozyczenia_id_pracownik on wypozyczalnia.wypozyczenia (id_pracownik);
+--------------------------------------------------------------------------------------------------------------------------------------
 --------------------------------------------------------------------------------------------------------------------------------------
 create or replace view wypozyczalnia.modele_marki_klasy as
 select mo.id_model, mo.nazwa_modelu, ma.id_marka, ma.nazwa_marki, k.id_klasa, k.nazwa
@@ -349,8 +362,8 @@ begin
 	return query
 	select sa.id_auto, sa.nazwa_modelu, sa.nazwa_marki, sa.numer_rejestracyjny, sa.nazwa_klasy
 	from wypozyczalnia.szczegoly_aut sa
-	where sa.id_auto not in (select w.id_auto from wypozyczalnia.wypozyczenia w 
-	where (w.data_wypozyczenia <= data_zakonczenia and w.data_oddania >= data_rozpoczecia));
+	where not exists (select 1 from wypozyczalnia.wypozyczenia w
+	where w.id_auto = sa.id_auto and w.okres && daterange(data_rozpoczecia, data_zakonczenia, '[]'));
 end;
 $$ language plpgsql;
 --------------------------------------------------------------------------------------------------------------------------------------
@@ -397,6 +410,40 @@ begin
 end;
 $$ language plpgsql;
 --------------------------------------------------------------------------------------------------------------------------------------
+create or replace function wypozyczalnia.podsumuj_auta_dostepne_w_danym_terminie(data_rozpoczecia date, data_zakonczenia date)
+returns table (
+	poziom text,
+	id_auto int,
+	nazwa_modelu varchar(64),
+	nazwa_marki varchar(64),
+	numer_rejestracyjny varchar(50),
+	nazwa_klasy varchar(32),
+	ilosc bigint
+)
+as $$
+begin
+	return query
+	with wolne as materialized (
+		select * from wypozyczalnia.dostepne_auta_w_danym_terminie(data_rozpoczecia, data_zakonczenia)
+	)
+	select case
+			when grouping(w.id_auto) = 0 then 'auto'
+			when grouping(w.nazwa_modelu) = 0 then 'model'
+			when grouping(w.nazwa_marki) = 0 then 'marka'
+			else 'suma'
+		end as poziom,
+		w.id_auto, w.nazwa_modelu, w.nazwa_marki, w.numer_rejestracyjny, w.nazwa_klasy, count(*) as ilosc
+	from wolne w
+	group by grouping sets (
+		(w.id_auto, w.nazwa_modelu, w.nazwa_marki, w.numer_rejestracyjny, w.nazwa_klasy),
+		(w.nazwa_marki, w.nazwa_modelu),
+		(w.nazwa_marki),
+		()
+	)
+	order by 1, w.nazwa_marki, w.nazwa_modelu, w.id_auto;
+end;
+$$ language plpgsql;
+--------------------------------------------------------------------------------------------------------------------------------------
 create or replace function wypozyczalnia.wyszukaj_modele(marka_id int)
 	returns table(
 	id_model int,
@@ -425,10 +472,20 @@ begin
 end;
 $$ language plpgsql;
 --------------------------------------------------------------------------------------------------------------------------------------
+create or replace function wypozyczalnia.poprawny_numer_rejestracyjny(numer text)
+returns boolean as $$
+    select numer ~ '^[A-Z]{2,3}[0-9]{2,3}[A-Z0-9 ]{2,5}$';
+$$ language sql immutable;
+
+create or replace function wypozyczalnia.poprawny_numer_telefonu(telefon text)
+returns boolean as $$
+    select telefon ~ '^\d{9}$';
+$$ language sql immutable;
+--------------------------------------------------------------------------------------------------------------------------------------
 create or replace function wypozyczalnia.sprawdz_numer_rejestracyjny()
 returns trigger as $$
 begin
-    if new.numer_rejestracyjny !~ '^[A-Z]{2,3}[0-9]{2,3}[A-Z0-9 ]{2,5}$' then
+    if not wypozyczalnia.poprawny_numer_rejestracyjny(new.numer_rejestracyjny) then
         raise exception 'Niepoprawny numer rejestracyjny %s', new.numer_rejestracyjny;
 		return null;
     end if;
@@ -444,7 +501,7 @@ execute function wypozyczalnia.sprawdz_numer_rejestracyjny();
 create or replace function wypozyczalnia.sprawdz_numer_telefonu()
 returns trigger as $$
 begin 
-	if new.telefon !~ '^\d{9}$' then
+	if not wypozyczalnia.poprawny_numer_telefonu(new.telefon) then
 		raise exception 'Niepoprawny numer telefonu';
 		return null;
 	end if;
@@ -462,17 +519,89 @@ before insert or update on wypozyczalnia.pracownicy
 for each row 
 execute function wypozyczalnia.sprawdz_numer_telefonu();
 --------------------------------------------------------------------------------------------------------------------------------------
+create table wypozyczalnia.obciazenie_pracownikow(
+id_pracownik 			int 			primary key,
+liczba_wypozyczen 		int 			not null default 0 check (liczba_wypozyczen >= 0),
+
+constraint fk_obciazenie_pracownikow_id_pracownik foreign key (id_pracownik) references wypozyczalnia.pracownicy(id_pracownik) on delete cascade
+);
+
+create index idx_obciazenie_pracownikow_liczba on wypozyczalnia.obciazenie_pracownikow (liczba_wypozyczen, id_pracownik);
+
+insert into wypozyczalnia.obciazenie_pracownikow (id_pracownik, liczba_wypozyczen)
+select p.id_pracownik, count(w.id_wypozyczenia)
+from wypozyczalnia.pracownicy p
+left join wypozyczalnia.wypozyczenia w on p.id_pracownik = w.id_pracownik
+group by p.id_pracownik;
+--------------------------------------------------------------------------------------------------------------------------------------
+create or replace function wypozyczalnia.dodaj_obciazenie_pracownika()
+returns trigger as $$
+begin
+    insert into wypozyczalnia.obciazenie_pracownikow (id_pracownik) values (new.id_pracownik);
+    return new;
+end;
+$$ language plpgsql;
+
+create trigger trigger_dodaj_obciazenie_pracownika
+after insert on wypozyczalnia.pracownicy
+for each row
+execute function wypozyczalnia.dodaj_obciazenie_pracownika();
+--------------------------------------------------------------------------------------------------------------------------------------
+create or replace function wypozyczalnia.aktualizuj_obciazenie_pracownika()
+returns trigger as $$
+begin
+    if tg_op in ('UPDATE', 'DELETE') then
+        update wypozyczalnia.obciazenie_pracownikow
+        set liczba_wypozyczen = liczba_wypozyczen - 1
+        where id_pracownik = old.id_pracownik;
+    end if;
+    if tg_op in ('INSERT', 'UPDATE') then
+        update wypozyczalnia.obciazenie_pracownikow
+        set liczba_wypozyczen = liczba_wypozyczen + 1
+        where id_pracownik = new.id_pracownik;
+    end if;
+    return null;
+end;
+$$ language plpgsql;
+
+create trigger trigger_aktualizuj_obciazenie_pracownika
+after insert or delete or update of id_pracownik on wypozyczalnia.wypozyczenia
+for each row
+execute function wypozyczalnia.aktualizuj_obciazenie_pracownika();
+--------------------------------------------------------------------------------------------------------------------------------------
+create or replace view wypozyczalnia.raport_obciazenia_pracownikow as
+select p.id_pracownik, CONCAT(p.imie, ' ', p.nazwisko) as pracownik, r.nazwa as stanowisko,
+(r.czy_moze_wynajmowac and r.id_rola != 1) as przydzielany_do_wypozyczen, o.liczba_wypozyczen
+from wypozyczalnia.obciazenie_pracownikow o
+join wypozyczalnia.pracownicy p on p.id_pracownik = o.id_pracownik
+join wypozyczalnia.role r on r.id_rola = p.id_rola;
+--------------------------------------------------------------------------------------------------------------------------------------
 create or replace function wypozyczalnia.wybierz_pracownika()
 returns int as $$
 declare
     id_pracownik int;
 begin
-    select p.id_pracownik into id_pracownik from wypozyczalnia.pracownicy p
-    left join wypozyczalnia.wypozyczenia w on p.id_pracownik = w.id_pracownik
-	join wypozyczalnia.role r on r.id_rola = p.id_rola
-	where czy_moze_wynajmowac = True and r.id_rola != 1
-    group by p.id_pracownik order by count(w.id_wypozyczenia) asc
-    limit 1;
+    -- Obciążenie pracowników jest utrzymywane przez wyzwalacz na wypożyczeniach, więc wybór to odczyt
+    -- indeksu idx_obciazenie_pracownikow_liczba zamiast liczenia wszystkich wypożyczeń.
+    -- Wiersz wybranego pracownika jest blokowany; równoległe zamówienia pomijają zablokowanych
+    -- pracowników (skip locked) i czekają dopiero wtedy, gdy zablokowani są wszyscy.
+    select o.id_pracownik into id_pracownik from wypozyczalnia.obciazenie_pracownikow o
+    join wypozyczalnia.pracownicy p on p.id_pracownik = o.id_pracownik
+    join wypozyczalnia.role r on r.id_rola = p.id_rola
+    where czy_moze_wynajmowac = True and r.id_rola != 1
+    order by o.liczba_wypozyczen, o.id_pracownik
+    limit 1
+    for update of o skip locked;
+
+    if id_pracownik is null then
+        select o.id_pracownik into id_pracownik from wypozyczalnia.obciazenie_pracownikow o
+        join wypozyczalnia.pracownicy p on p.id_pracownik = o.id_pracownik
+        join wypozyczalnia.role r on r.id_rola = p.id_rola
+        where czy_moze_wynajmowac = True and r.id_rola != 1
+        order by o.liczba_wypozyczen, o.id_pracownik
+        limit 1
+        for update of o;
+    end if;
 
     if id_pracownik is null then
         raise exception 'brak dostępnych pracowników';
@@ -485,58 +614,244 @@ create or replace function wypozyczalnia.zloz_zamowienie()
 returns trigger as $$
 declare 
     id_auto int;
-    numer_rejestracyjny varchar(50);
     id_pracownik int;
+    termin daterange := daterange(new.data_rozpoczecia, new.data_zakonczenia, '[]');
+    proba int := 0;
+    max_prob constant int := 10;
 begin
-    select a.id_auto, a.numer_rejestracyjny
-    into id_auto, numer_rejestracyjny
-    from wypozyczalnia.auta a
-    where a.id_model = new.id_model and not exists (select 1 from wypozyczalnia.wypozyczenia w 
-	where w.id_auto = a.id_auto and (w.data_wypozyczenia <= new.data_zakonczenia and w.data_oddania >= new.data_rozpoczecia))
-    limit 1;
-
-    if id_auto is not null then
-        id_pracownik := wypozyczalnia.wybierz_pracownika();
-        insert into wypozyczalnia.wypozyczenia (data_wypozyczenia, data_oddania, id_klient, id_auto, id_pracownik)
-        values (new.data_rozpoczecia, new.data_zakonczenia, new.id_klient, id_auto, id_pracownik);
-        new.status := 'udane';
-    else
-        new.status := 'nieudane';
-    end if;
-    return new;
+    -- Wolne auto jest blokowane (for no key update), więc równoległe zamówienia na ten sam model wybierają różne auta.
+    -- Blokada nie koliduje z for key share, którą sprawdzenie klucza obcego wypozyczenia.id_auto zakłada na auto,
+    -- więc nie wstrzymuje wstawiania wypożyczeń tego auta ani nie czeka na nie.
+    -- Pierwsza próba pomija auta zablokowane przez inne transakcje (skip locked) i nie czeka na nie;
+    -- jeśli wszystkie wolne auta są zablokowane, kolejna próba czeka na zwolnienie blokady.
+    -- Ostatecznie podwójną rezerwację wyklucza ograniczenie wyklucz_nakladajace_sie_wypozyczenia,
+    -- a jego naruszenie (auto zarezerwowane równolegle) powoduje ponowienie wyboru auta.
+    loop
+        proba := proba + 1;
+        if proba = 1 then
+            select a.id_auto into id_auto
+            from wypozyczalnia.auta a
+            where a.id_model = new.id_model and not exists (select 1 from wypozyczalnia.wypozyczenia w 
+            where w.id_auto = a.id_auto and w.okres && termin)
+            limit 1
+            for no key update of a skip locked;
+        else
+            select a.id_auto into id_auto
+            from wypozyczalnia.auta a
+            where a.id_model = new.id_model and not exists (select 1 from wypozyczalnia.wypozyczenia w 
+            where w.id_auto = a.id_auto and w.okres && termin)
+            limit 1
+            for no key update of a;
+        end if;
+
+        if id_auto is null then
+            if proba = 1 then
+                continue;
+            end if;
+            new.status := 'nieudane';
+            return new;
+        end if;
+
+        begin
+            id_pracownik := wypozyczalnia.wybierz_pracownika();
+            insert into wypozyczalnia.wypozyczenia (data_wypozyczenia, data_oddania, id_klient, id_auto, id_pracownik)
+            values (new.data_rozpoczecia, new.data_zakonczenia, new.id_klient, id_auto, id_pracownik);
+            new.status := 'udane';
+            return new;
+        exception when exclusion_violation then
+            if proba >= max_prob then
+                new.status := 'nieudane';
+                return new;
+            end if;
+        end;
+    end loop;
 end; 
 $$ language plpgsql;
 
 create trigger trigger_zloz_zamowienie
 before insert on wypozyczalnia.zamowienia
 for each row
+when (new.status = 'oczekujące')
 execute function wypozyczalnia.zloz_zamowienie();
 ---------------------------------------------------------------------------------------------------------------------------------------
 create or replace function wypozyczalnia.dodaj_platnosc()
 returns trigger as $$
-declare
-    kwota numeric(10,2);
-    stawka_za_dzien numeric(10,2);
-    czas_wypozyczenia int;
 begin
-    select c.stawka_za_dzien into stawka_za_dzien from wypozyczalnia.cennik c
-    join wypozyczalnia.modele m on m.id_klasa = c.id_klasa
-    join wypozyczalnia.auta a on a.id_model = m.id_model
-    where a.id_auto = new.id_auto;
-
-    czas_wypozyczenia := new.data_oddania - new.data_wypozyczenia;
-    kwota := czas_wypozyczenia * stawka_za_dzien;
-
-    insert into wypozyczalnia.platnosci (id_wypozyczenia, kwota) values (new.id_wypozyczenia, kwota);
-    return new;
+    -- Wyzwalacz na poziomie instrukcji: płatności dla wszystkich wstawionych wypożyczeń
+    -- (także zbiorczo) są dodawane jednym zapytaniem.
+    insert into wypozyczalnia.platnosci (id_wypozyczenia, kwota)
+    select w.id_wypozyczenia, (w.data_oddania - w.data_wypozyczenia) * c.stawka_za_dzien
+    from nowe_wypozyczenia w
+    join wypozyczalnia.auta a on a.id_auto = w.id_auto
+    join wypozyczalnia.modele m on m.id_model = a.id_model
+    left join wypozyczalnia.cennik c on c.id_klasa = m.id_klasa
+    order by w.id_wypozyczenia;
+    return null;
 end;
 $$ language plpgsql;
 
 create trigger trigger_dodaj_platnosc
 after insert on wypozyczalnia.wypozyczenia
-for each row
+referencing new table as nowe_wypozyczenia
+for each statement
 execute function wypozyczalnia.dodaj_platnosc();
 ---------------------------------------------------------------------------------------------------------------------------------------
+create table wypozyczalnia.przychody_klas(
+id_klasa 				int 			primary key,
+liczba_wypozyczen 		bigint 			not null default 0,
+liczba_kwot 			bigint 			not null default 0,
+calkowity_przychod 		numeric(14,2) 	not null default 0,
+
+constraint fk_przychody_klas_id_klasa foreign key (id_klasa) references wypozyczalnia.klasa(id_klasa) on delete cascade
+);
+
+create table wypozyczalnia.przychody_klas_miesiecznie(
+miesiac 				date 			not null,
+id_klasa 				int 			not null,
+liczba_wypozyczen 		bigint 			not null default 0,
+liczba_kwot 			bigint 			not null default 0,
+calkowity_przychod 		numeric(14,2) 	not null default 0,
+
+primary key (miesiac, id_klasa),
+constraint fk_przychody_klas_miesiecznie_id_klasa foreign key (id_klasa) references wypozyczalnia.klasa(id_klasa) on delete cascade
+);
+
+-- Zmiany podsumowań dopisywane przez wyzwalacz płatności. Tabela nie ma klucza, więc równoległe płatności
+-- w tej samej klasie i miesiącu nie czekają na siebie (jak przy aktualizacji jednego wiersza podsumowania);
+-- scal_przychody() okresowo przenosi je do przychody_klas i przychody_klas_miesiecznie.
+create table wypozyczalnia.przychody_klas_zmiany(
+miesiac 				date 			not null,
+id_klasa 				int 			not null,
+liczba_wypozyczen 		bigint 			not null,
+liczba_kwot 			bigint 			not null,
+calkowity_przychod 		numeric(14,2) 	not null,
+
+constraint fk_przychody_klas_zmiany_id_klasa foreign key (id_klasa) references wypozyczalnia.klasa(id_klasa) on delete cascade
+);
+
+-- Bieżące podsumowania: scalone wartości i jeszcze nie scalone zmiany.
+create or replace view wypozyczalnia.przychody_klas_miesiecznie_biezace as
+select miesiac, id_klasa, sum(liczba_wypozyczen)::bigint as liczba_wypozyczen, sum(liczba_kwot)::bigint as liczba_kwot,
+sum(calkowity_przychod)::numeric(14,2) as calkowity_przychod
+from (
+    select miesiac, id_klasa, liczba_wypozyczen, liczba_kwot, calkowity_przychod from wypozyczalnia.przychody_klas_miesiecznie
+    union all
+    select miesiac, id_klasa, liczba_wypozyczen, liczba_kwot, calkowity_przychod from wypozyczalnia.przychody_klas_zmiany
+) s
+group by miesiac, id_klasa;
+
+create or replace view wypozyczalnia.przychody_klas_biezace as
+select id_klasa, sum(liczba_wypozyczen)::bigint as liczba_wypozyczen, sum(liczba_kwot)::bigint as liczba_kwot,
+sum(calkowity_przychod)::numeric(14,2) as calkowity_przychod
+from (
+    select id_klasa, liczba_wypozyczen, liczba_kwot, calkowity_przychod from wypozyczalnia.przychody_klas
+    union all
+    select id_klasa, liczba_wypozyczen, liczba_kwot, calkowity_przychod from wypozyczalnia.przychody_klas_zmiany
+) s
+group by id_klasa;
+--------------------------------------------------------------------------------------------------------------------------------------
+create or replace function wypozyczalnia.zmien_przychody(id_wypozyczenia_platnosci int, znak int, kwota numeric)
+returns void as $$
+declare
+    id_klasa_auta int;
+    miesiac_wypozyczenia date;
+begin
+    select m.id_klasa, date_trunc('month', w.data_wypozyczenia)::date into id_klasa_auta, miesiac_wypozyczenia
+    from wypozyczalnia.wypozyczenia w
+    join wypozyczalnia.auta a on a.id_auto = w.id_auto
+    join wypozyczalnia.modele m on m.id_model = a.id_model
+    where w.id_wypozyczenia = id_wypozyczenia_platnosci;
+
+    if id_klasa_auta is null then
+        return;
+    end if;
+
+    insert into wypozyczalnia.przychody_klas_zmiany (miesiac, id_klasa, liczba_wypozyczen, liczba_kwot, calkowity_przychod)
+    values (miesiac_wypozyczenia, id_klasa_auta, znak, case when kwota is null then 0 else znak end, znak * coalesce(kwota, 0));
+end;
+$$ language plpgsql;
+--------------------------------------------------------------------------------------------------------------------------------------
+create or replace function wypozyczalnia.aktualizuj_przychody()
+returns trigger as $$
+begin
+    if tg_op in ('UPDATE', 'DELETE') then
+        perform wypozyczalnia.zmien_przychody(old.id_wypozyczenia, -1, old.kwota);
+    end if;
+    if tg_op in ('INSERT', 'UPDATE') then
+        perform wypozyczalnia.zmien_przychody(new.id_wypozyczenia, 1, new.kwota);
+    end if;
+    return null;
+end;
+$$ language plpgsql;
+
+create trigger trigger_aktualizuj_przychody
+after insert or delete or update of id_wypozyczenia, kwota on wypozyczalnia.platnosci
+for each row
+execute function wypozyczalnia.aktualizuj_przychody();
+--------------------------------------------------------------------------------------------------------------------------------------
+create or replace function wypozyczalnia.scal_przychody()
+returns bigint as $$
+declare
+    scalone bigint;
+begin
+    -- Przenosi zatwierdzone zmiany do podsumowań (aplikacja wywołuje ją co REVENUE_MERGE_INTERVAL sekund).
+    -- Zmiany niezatwierdzonych płatności zostają w tabeli do kolejnego scalenia. Gdy scalanie trwa już
+    -- w innej sesji (np. w innym procesie aplikacji), funkcja nie czeka na nie i zwraca 0.
+    if not pg_try_advisory_xact_lock('wypozyczalnia.przychody_klas_zmiany'::regclass::oid::bigint) then
+        return 0;
+    end if;
+    with zmiany as (
+        delete from wypozyczalnia.przychody_klas_zmiany
+        returning miesiac, id_klasa, liczba_wypozyczen, liczba_kwot, calkowity_przychod
+    ), miesiace as (
+        insert into wypozyczalnia.przychody_klas_miesiecznie as pkm (miesiac, id_klasa, liczba_wypozyczen, liczba_kwot, calkowity_przychod)
+        select miesiac, id_klasa, sum(liczba_wypozyczen), sum(liczba_kwot), sum(calkowity_przychod)
+        from zmiany
+        group by miesiac, id_klasa
+        on conflict (miesiac, id_klasa) do update
+        set liczba_wypozyczen = pkm.liczba_wypozyczen + excluded.liczba_wypozyczen,
+            liczba_kwot = pkm.liczba_kwot + excluded.liczba_kwot,
+            calkowity_przychod = pkm.calkowity_przychod + excluded.calkowity_przychod
+    ), klasy as (
+        insert into wypozyczalnia.przychody_klas as pk (id_klasa, liczba_wypozyczen, liczba_kwot, calkowity_przychod)
+        select id_klasa, sum(liczba_wypozyczen), sum(liczba_kwot), sum(calkowity_przychod)
+        from zmiany
+        group by id_klasa
+        on conflict (id_klasa) do update
+        set liczba_wypozyczen = pk.liczba_wypozyczen + excluded.liczba_wypozyczen,
+            liczba_kwot = pk.liczba_kwot + excluded.liczba_kwot,
+            calkowity_przychod = pk.calkowity_przychod + excluded.calkowity_przychod
+    )
+    select count(*) into scalone from zmiany;
+    return scalone;
+end;
+$$ language plpgsql;
+--------------------------------------------------------------------------------------------------------------------------------------
+create or replace function wypozyczalnia.przelicz_przychody()
+returns void as $$
+begin
+    -- Odtwarza podsumowania od zera, np. po zmianie klasy modelu, której wyzwalacze nie śledzą.
+    lock table wypozyczalnia.platnosci in share mode;
+    perform pg_advisory_xact_lock('wypozyczalnia.przychody_klas_zmiany'::regclass::oid::bigint);
+    delete from wypozyczalnia.przychody_klas_zmiany;
+    delete from wypozyczalnia.przychody_klas;
+    delete from wypozyczalnia.przychody_klas_miesiecznie;
+
+    insert into wypozyczalnia.przychody_klas_miesiecznie (miesiac, id_klasa, liczba_wypozyczen, liczba_kwot, calkowity_przychod)
+    select date_trunc('month', w.data_wypozyczenia)::date, m.id_klasa, count(*), count(p.kwota), coalesce(sum(p.kwota), 0)
+    from wypozyczalnia.platnosci p
+    join wypozyczalnia.wypozyczenia w on w.id_wypozyczenia = p.id_wypozyczenia
+    join wypozyczalnia.auta a on a.id_auto = w.id_auto
+    join wypozyczalnia.modele m on m.id_model = a.id_model
+    group by 1, 2;
+
+    insert into wypozyczalnia.przychody_klas (id_klasa, liczba_wypozyczen, liczba_kwot, calkowity_przychod)
+    select id_klasa, sum(liczba_wypozyczen), sum(liczba_kwot), sum(calkowity_przychod)
+    from wypozyczalnia.przychody_klas_miesiecznie
+    group by id_klasa;
+end;
+$$ language plpgsql;
+--------------------------------------------------------------------------------------------------------------------------------------
 insert into wypozyczalnia.wypozyczenia (data_wypozyczenia, data_oddania, id_klient, id_auto, id_pracownik) values
 ('2024-11-15', '2025-03-15', 1, 4, 4), 
 ('2025-01-10', '2025-04-10', 13, 6, 5), 
@@ -581,9 +896,27 @@ insert into wypozyczalnia.wypozyczenia (data_wypozyczenia, data_oddania, id_klie
 ('2025-01-10', '2025-01-15', 5, 104, 11); 
 --------------------------------------------------------------------------------------------------------------------------------------
 create or replace view wypozyczalnia.raport_finansowy as
-select sum(p.kwota)::numeric(10,2) as całkowity_przychód, 
-avg(p.kwota)::numeric(10,2) as średni_przychód_na_wypożyczenie
-from wypozyczalnia.platnosci p;
+select (sum(pk.calkowity_przychod) filter (where pk.liczba_kwot > 0))::numeric(14,2) as całkowity_przychód,
+(sum(pk.calkowity_przychod) / nullif(sum(pk.liczba_kwot), 0))::numeric(10,2) as średni_przychód_na_wypożyczenie
+from wypozyczalnia.przychody_klas_biezace pk;
+--------------------------------------------------------------------------------------------------------------------------------------
+create or replace function wypozyczalnia.raport_finansowy_miesieczny()
+returns table(
+    miesiac text,
+    calkowity_przychod numeric(14,2),
+    sredni_przychod numeric(10,2)
+) as $$
+begin
+    return query
+    select to_char(pkm.miesiac, 'YYYY-MM'),
+    (sum(pkm.calkowity_przychod) filter (where pkm.liczba_kwot > 0))::numeric(14,2),
+    (sum(pkm.calkowity_przychod) / nullif(sum(pkm.liczba_kwot), 0))::numeric(10,2)
+    from wypozyczalnia.przychody_klas_miesiecznie_biezace pkm
+    where pkm.liczba_wypozyczen > 0
+    group by pkm.miesiac
+    order by pkm.miesiac;
+end;
+$$ language plpgsql;
 --------------------------------------------------------------------------------------------------------------------------------------
 create or replace view wypozyczalnia.szczegoly_wypozyczenia as
 select w.id_wypozyczenia, k.id_klient, CONCAT(k.imie, ' ', k.nazwisko) as klient, sa.nazwa_marki, sa.nazwa_modelu, sa.numer_rejestracyjny, w.data_wypozyczenia, w.data_oddania, w.id_pracownik, CONCAT(p.imie, ' ', p.nazwisko) as pracownik, sa.id_klasa
@@ -620,20 +953,36 @@ create or replace function wypozyczalnia.przychody_na_klasy_aut()
 returns table(
     nazwa_klasy varchar(32),
     liczba_wypozyczen bigint,
-    calkowity_przychod numeric(10,2)
+    calkowity_przychod numeric(14,2)
 ) as $$
 begin
     return query
-    select c.nazwa, count(w.id_wypozyczenia) as liczba_wypozyczen, sum(p.kwota) as calkowity_przychod
-    from wypozyczalnia.wypozyczenia w
-    join wypozyczalnia.platnosci p on w.id_wypozyczenia = p.id_wypozyczenia
-    join wypozyczalnia.szczegoly_aut sa on w.id_auto = sa.id_auto
-    join wypozyczalnia.klasa c on sa.id_klasa = c.id_klasa
-    group by c.nazwa
+    select c.nazwa, pk.liczba_wypozyczen, (case when pk.liczba_kwot > 0 then pk.calkowity_przychod end)::numeric(14,2)
+    from wypozyczalnia.przychody_klas_biezace pk
+    join wypozyczalnia.klasa c on pk.id_klasa = c.id_klasa
+    where pk.liczba_wypozyczen > 0
     order by c.nazwa;
 end;
 $$ language plpgsql;
 --------------------------------------------------------------------------------------------------------------------------------------
+create or replace function wypozyczalnia.przychody_na_klasy_aut_miesiecznie()
+returns table(
+    miesiac text,
+    nazwa_klasy varchar(32),
+    liczba_wypozyczen bigint,
+    calkowity_przychod numeric(14,2)
+) as $$
+begin
+    return query
+    select to_char(pkm.miesiac, 'YYYY-MM'), c.nazwa, pkm.liczba_wypozyczen,
+    (case when pkm.liczba_kwot > 0 then pkm.calkowity_przychod end)::numeric(14,2)
+    from wypozyczalnia.przychody_klas_miesiecznie_biezace pkm
+    join wypozyczalnia.klasa c on pkm.id_klasa = c.id_klasa
+    where pkm.liczba_wypozyczen > 0
+    order by pkm.miesiac, c.nazwa;
+end;
+$$ language plpgsql;
+--------------------------------------------------------------------------------------------------------------------------------------
 create or replace function wypozyczalnia.usun_powiazane_platnosci()
 returns trigger as $$
 begin
@@ -644,6 +993,128 @@ end;
 $$ language plpgsql;
 
 create trigger trigger_usun_powiazane_platnosci
-after delete on wypozyczalnia.wypozyczenia
+before delete on wypozyczalnia.wypozyczenia
 for each row
-execute function wypozyczalnia.usun_powiazane_platnosci();
\ No newline at end of file
+execute function wypozyczalnia.usun_powiazane_platnosci();
+--------------------------------------------------------------------------------------------------------------------------------------
+create index idx_wypozyczenia_data_wypozyczenia on wypozyczalnia.wypozyczenia (data_wypozyczenia, id_wypozyczenia);
+create index idx_zamowienia_data_rozpoczecia on wypozyczalnia.zamowienia (data_rozpoczecia, id_zamowienia);
+
+-- Podpowiedzi klientów w formularzach (/clients/search) wyszukują po początku nazwiska i imienia (w obu kolejnościach)
+-- lub numeru telefonu. Indeksy zwracają dopasowania już posortowane, więc zapytanie kończy się po odczytaniu
+-- kilku pierwszych wpisów niezależnie od liczby klientów i liczby pasujących rekordów.
+create index idx_klienci_nazwisko_imie_prefiks on wypozyczalnia.klienci ((lower(nazwisko || ' ' || imie) collate "C"));
+create index idx_klienci_imie_nazwisko_prefiks on wypozyczalnia.klienci ((lower(imie || ' ' || nazwisko) collate "C"));
+create index idx_klienci_telefon_prefiks on wypozyczalnia.klienci ((telefon collate "C"));
+--------------------------------------------------------------------------------------------------------------------------------------
+create table wypozyczalnia.importy(
+id_importu 				serial 			primary key,
+rodzaj 					varchar(32) 	not null,
+plik 					varchar(255),
+data_importu 			timestamp 		not null default now(),
+dodane 					int 			not null,
+odrzucone 				int 			not null,
+czas_s 					numeric(10,3) 	not null,
+raport 					text
+);
+--------------------------------------------------------------------------------------------------------------------------------------
+create or replace function wypozyczalnia.powiadom_o_zmianie()
+returns trigger as $$
+begin
+    -- Informuje procesy aplikacji (LISTEN wypozyczalnia_zmiany), że dane tabeli słownikowej lub floty
+    -- uległy zmianie. Powiadomienie jest dostarczane dopiero po zatwierdzeniu transakcji,
+    -- a identyczne powiadomienia z jednej transakcji są łączone w jedno.
+    perform pg_notify('wypozyczalnia_zmiany', json_build_object('tabela', tg_table_name, 'operacja', tg_op)::text);
+    return null;
+end;
+$$ language plpgsql;
+
+create trigger trigger_powiadom_o_zmianie
+after insert or update or delete or truncate on wypozyczalnia.marki
+for each statement
+execute function wypozyczalnia.powiadom_o_zmianie();
+
+create trigger trigger_powiadom_o_zmianie
+after insert or update or delete or truncate on wypozyczalnia.modele
+for each statement
+execute function wypozyczalnia.powiadom_o_zmianie();
+
+create trigger trigger_powiadom_o_zmianie
+after insert or update or delete or truncate on wypozyczalnia.klasa
+for each statement
+execute function wypozyczalnia.powiadom_o_zmianie();
+
+create trigger trigger_powiadom_o_zmianie
+after insert or update or delete or truncate on wypozyczalnia.cennik
+for each statement
+execute function wypozyczalnia.powiadom_o_zmianie();
+
+create trigger trigger_powiadom_o_zmianie
+after insert or update or delete or truncate on wypozyczalnia.role
+for each statement
+execute function wypozyczalnia.powiadom_o_zmianie();
+
+create trigger trigger_powiadom_o_zmianie
+after insert or update or delete or truncate on wypozyczalnia.auta
+for each statement
+execute function wypozyczalnia.powiadom_o_zmianie();
+--------------------------------------------------------------------------------------------------------------------------------------
+create or replace function wypozyczalnia.powiadom_o_zmianie_wypozyczen()
+returns trigger as $$
+declare
+    dodane json;
+    usuniete json;
+begin
+    -- Zmienione wypożyczenia są przekazywane w powiadomieniu, aby indeksy floty w procesach aplikacji
+    -- mogły je uwzględnić przyrostowo. Przy dużych zmianach (np. import) wysyłana jest tylko nazwa tabeli,
+    -- co oznacza konieczność przebudowy indeksu; limit treści powiadomienia to 8000 bajtów.
+    if tg_op in ('INSERT', 'UPDATE') then
+        select coalesce(json_agg(json_build_array(n.id_wypozyczenia, n.id_auto, n.data_wypozyczenia, n.data_oddania)), '[]')
+        into dodane
+        from (select * from nowe_wypozyczenia limit 101) n
+        having count(*) <= 100;
+    end if;
+    if tg_op in ('DELETE', 'UPDATE') then
+        select coalesce(json_agg(s.id_wypozyczenia), '[]')
+        into usuniete
+        from (select * from stare_wypozyczenia limit 101) s
+        having count(*) <= 100;
+    end if;
+
+    if (tg_op <> 'DELETE' and dodane is null) or (tg_op <> 'INSERT' and usuniete is null) then
+        perform pg_notify('wypozyczalnia_zmiany', json_build_object('tabela', tg_table_name)::text);
+    else
+        perform pg_notify('wypozyczalnia_zmiany', json_build_object(
+            'tabela', tg_table_name,
+            'dodane', coalesce(dodane, '[]'::json),
+            'usuniete', coalesce(usuniete, '[]'::json))::text);
+    end if;
+    return null;
+end;
+$$ language plpgsql;
+
+create trigger trigger_powiadom_o_dodaniu_wypozyczen
+after insert on wypozyczalnia.wypozyczenia
+referencing new table as nowe_wypozyczenia
+for each statement
+execute function wypozyczalnia.powiadom_o_zmianie_wypozyczen();
+
+create trigger trigger_powiadom_o_zmianie_wypozyczen
+after update on wypozyczalnia.wypozyczenia
+referencing old table as stare_wypozyczenia new table as nowe_wypozyczenia
+for each statement
+execute function wypozyczalnia.powiadom_o_zmianie_wypozyczen();
+
+create trigger trigger_powiadom_o_usunieciu_wypozyczen
+after delete on wypozyczalnia.wypozyczenia
+referencing old table as stare_wypozyczenia
+for each statement
+execute function wypozyczalnia.powiadom_o_zmianie_wypozyczen();
+
+create trigger trigger_powiadom_o_wyczyszczeniu_wypozyczen
+after truncate on wypozyczalnia.wypozyczenia
+for each statement
+execute function wypozyczalnia.powiadom_o_zmianie();
+--------------------------------------------------------------------------------------------------------------------------------------
+-- Zmiany przychodów z płatności danych początkowych trafiają od razu do podsumowań.
+select wypozyczalnia.scal_przychody();
@@ -0,0 +1,260 @@
+"""
+Mikrobenchmarki funkcji i wyzwalaczy PL/pgSQL z porównaniem planów zapytań.
+
+Dla każdej skali danych (`--scales`, liczba dodatkowych wypożyczeń; 0 oznacza bieżącą zawartość bazy)
+skrypt w jednej transakcji generuje dane (`benchmarks.generate_data`), a następnie dla funkcji
+`dostepne_auta_w_danym_terminie`, `najpopularniejsze_modele`, `przychody_na_klasy_aut`, `wybierz_pracownika`
+oraz wyzwalaczy `zloz_zamowienie` i `dodaj_platnosc` zapisuje medianę czasu wywołania i plany wszystkich
+wykonanych instrukcji (także zagnieżdżonych) z rzeczywistymi liczbami wierszy i buforami - odpowiednik
+`EXPLAIN (ANALYZE, BUFFERS)` zbierany przez `auto_explain`, bo EXPLAIN wywołania funkcji pokazuje tylko
+węzeł `Function Scan`. Po pomiarach transakcja jest wycofywana.
+
+Z `--baseline` kształty planów porównywane są z zapisanymi (różnice wypisywane są jak w `diff`), a skrypt kończy
+się błędem, gdy pojawi się nowy skan sekwencyjny odczytujący co najmniej `--estimate-min-rows` wierszy, nowy węzeł
+o szacunku liczby wierszy chybionym ponad `--estimate-factor` razy lub gdy mediana czasu wzrośnie o więcej niż
+`--threshold` i zarazem o co najmniej `--min-ms` milisekund.
+
+Uruchomienie:
+    python -m benchmarks.functions --scales 0,100000,1000000 --save benchmarks/baselines/functions.json
+    python -m benchmarks.functions --scales 0,100000,1000000 --baseline benchmarks/baselines/functions.json
+"""
+import argparse
+import difflib
+import json
+import os
+import re
+import sys
+from datetime import date, datetime, timedelta
+
+from benchmarks.generate_data import generate
+from benchmarks.overlap_plans import run_check
+from benchmarks.plans import connect, plan_nodes
+
+# Rok terminów zamówień i wypożyczeń dodawanych przez sprawdzane wyzwalacze (wolny od danych).
+TRIGGER_YEAR = 2100
+
+
+def scale_args(rentals, seed):
+    """
+    Liczności generowanych tabel proporcjonalne do liczby wypożyczeń (jak w `benchmarks.generate_data`).
+    """
+    return argparse.Namespace(cars=max(rentals // 100, 50), clients=max(rentals // 10, 100), employees=50,
+                              rentals=rentals, orders=rentals, failed_share=0.1, since=date(2000, 1, 1),
+                              until=date(2025, 12, 31), seed=seed)
+
+
+def checks(cursor, days):
+    """
+    Zwraca listę sprawdzanych wywołań: (nazwa, zapytanie, parametry).
+
+    Termin wyszukiwania dostępnych aut wypada w środku zakresu dat wypożyczeń, a próg popularności
+    w połowie średniej liczby wypożyczeń modelu.
+    """
+    cursor.execute("select min(data_wypozyczenia), max(data_oddania), count(*) from wypozyczalnia.wypozyczenia")
+    first_day, last_day, rentals = cursor.fetchone()
+    middle = (first_day or date.today()) + ((last_day or date.today()) - (first_day or date.today())) / 2
+    cursor.execute("select count(*) from wypozyczalnia.modele")
+    min_rentals = max(rentals // (2 * max(cursor.fetchone()[0], 1)), 1)
+    cursor.execute("""
+        select a.id_model, min(a.id_auto) from wypozyczalnia.auta a
+        group by a.id_model order by count(*) desc, a.id_model limit 1""")
+    id_model, id_auto = cursor.fetchone()
+    cursor.execute("select min(id_klient) from wypozyczalnia.klienci")
+    id_klient = cursor.fetchone()[0]
+    cursor.execute("select wypozyczalnia.wybierz_pracownika()")
+    id_pracownik = cursor.fetchone()[0]
+
+    window = (middle, middle + timedelta(days=days))
+    trigger_window = (date(TRIGGER_YEAR, 1, 1), date(TRIGGER_YEAR, 1, 1) + timedelta(days=days))
+    return [
+        ('dostepne_auta_w_danym_terminie',
+         "select * from wypozyczalnia.dostepne_auta_w_danym_terminie(%s, %s)", window),
+        ('najpopularniejsze_modele',
+         "select * from wypozyczalnia.najpopularniejsze_modele(%s)", (min_rentals,)),
+        ('przychody_na_klasy_aut',
+         "select * from wypozyczalnia.przychody_na_klasy_aut()", None),
+        ('wybierz_pracownika',
+         "select wypozyczalnia.wybierz_pracownika()", None),
+        ('zloz_zamowienie',
+         "insert into wypozyczalnia.zamowienia (id_klient, id_model, data_rozpoczecia, data_zakonczenia, status) "
+         "values (%s, %s, %s, %s, 'oczekujące')", (id_klient, id_model) + trigger_window),
+        ('dodaj_platnosc',
+         "insert into wypozyczalnia.wypozyczenia (data_wypozyczenia, data_oddania, id_klient, id_auto, id_pracownik) "
+         "values (%s, %s, %s, %s, %s)", trigger_window + (id_klient, id_auto, id_pracownik)),
+    ]
+
+
+def node_label(node):
+    target = node.get('Index Name') or node.get('Relation Name') or node.get('Function Name')
+    return f"{node['Node Type']}({target})" if target else node['Node Type']
+
+
+def plan_shape(plans):
+    """
+    Zamienia plany na wiersze tekstu opisujące ich kształt (instrukcja, węzły z wcięciem), bez czasów i liczb wierszy.
+    """
+    lines = []
+    for plan in plans:
+        query = re.sub(r'\s+', ' ', plan.get('Query Text', '')).strip()
+        lines.append(f"-- {query[:150]}")
+
+        def walk(node, depth):
+            lines.append(f"{'  ' * depth}{node_label(node)}")
+            for child in node.get('Plans', []):
+                walk(child, depth + 1)
+        walk(plan['Plan'], 1)
+    return lines
+
+
+def seq_scan_labels(plans, min_rows):
+    """
+    Zwraca skany sekwencyjne, które odczytały łącznie (we wszystkich pętlach, z odrzuconymi przez filtr)
+    co najmniej `min_rows` wierszy.
+
+    Skany małych tabel (np. `pracownicy`, `klasa`) pojawiają się i znikają wraz ze statystykami
+    odświeżanymi przez autovacuum i nie są regresją.
+    """
+    scanned = {}
+    for plan in plans:
+        for node in plan_nodes(plan):
+            if node['Node Type'] != 'Seq Scan':
+                continue
+            rows = (node.get('Actual Rows', 0) + node.get('Rows Removed by Filter', 0)) * node.get('Actual Loops', 0)
+            label = node_label(node)
+            scanned[label] = scanned.get(label, 0) + rows
+    return sorted(label for label, rows in scanned.items() if rows >= min_rows)
+
+
+def estimate_blowups(plans, factor, min_rows):
+    """
+    Zwraca węzły, w których liczba wierszy szacowana przez planistę i rzeczywista różnią się ponad `factor` razy.
+
+    Węzły o mniej niż `min_rows` wierszach (w obu wartościach) są pomijane - tam błąd szacunku nie zmienia planu.
+    """
+    blowups = {}
+    for plan in plans:
+        for node in plan_nodes(plan):
+            # Dla funkcji zwracających zbiór planista zawsze przyjmuje stałą liczbę wierszy (ROWS, domyślnie 1000).
+            if 'Actual Rows' not in node or not node.get('Actual Loops') or node['Node Type'] == 'Function Scan':
+                continue
+            estimated, actual = node['Plan Rows'], node['Actual Rows']
+            if max(estimated, actual) < min_rows:
+                continue
+            ratio = max(estimated, actual) / max(min(estimated, actual), 1)
+            if ratio > factor:
+                label = node_label(node)
+                blowups[label] = max(blowups.get(label, 0), round(ratio, 1))
+    return blowups
+
+
+def compare(name, current, previous, threshold, min_ms):
+    """
+    Porównuje wynik funkcji z wynikiem bazowym.
+
+    Wzrost mediany czasu jest regresją, gdy przekracza `threshold` i zarazem `min_ms` milisekund:
+    przy krótkich wywołaniach względne wahania są szumem pomiaru.
+
+    Returns:
+        list[str]: Opisy regresji.
+    """
+    problems = []
+    for label in sorted(set(current['skany_sekwencyjne']) - set(previous['skany_sekwencyjne'])):
+        problems.append(f"{name}: nowy skan sekwencyjny {label}")
+    for label, ratio in sorted(current['bledne_szacunki'].items()):
+        if label not in previous['bledne_szacunki']:
+            problems.append(f"{name}: szacunek liczby wierszy w {label} chybiony {ratio} razy")
+    if (current['czas_ms'] > previous['czas_ms'] * (1 + threshold)
+            and current['czas_ms'] - previous['czas_ms'] >= min_ms):
+        problems.append(f"{name}: {current['czas_ms']} ms, bazowo {previous['czas_ms']} ms")
+    return problems
+
+
+def measure_scale(connection, scale, args):
+    """
+    Generuje dane danej skali i mierzy wszystkie funkcje; transakcja jest wycofywana.
+
+    Każda skala mierzona jest na osobnym połączeniu, bo PL/pgSQL przechowuje plany zapytań funkcji w sesji
+    i plany z poprzedniej skali zafałszowałyby pomiar.
+
+    Returns:
+        dict: Wyniki funkcji (czas, kształt planu, skany sekwencyjne, chybione szacunki).
+    """
+    results = {}
+    try:
+        with connection.cursor() as cursor:
+            if scale:
+                generate(connection, scale_args(scale, args.seed))
+            calls = checks(cursor, args.days)
+        for name, query, params in calls:
+            median, plans = run_check(connection, name, query, params, args.repeat)
+            results[name] = {
+                'czas_ms': round(1000 * median, 3),
+                'plany': plan_shape(plans),
+                'skany_sekwencyjne': seq_scan_labels(plans, args.estimate_min_rows),
+                'bledne_szacunki': estimate_blowups(plans, args.estimate_factor, args.estimate_min_rows),
+            }
+    finally:
+        connection.rollback()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scales', default='0,100000,1000000',
+                        help='liczby generowanych wypożyczeń oddzielone przecinkami (0 - bieżące dane)')
+    parser.add_argument('--days', type=int, default=14, help='długość sprawdzanego terminu w dniach')
+    parser.add_argument('--repeat', type=int, default=5, help='liczba powtórzeń pomiaru czasu')
+    parser.add_argument('--seed', type=int, default=1, help='ziarno generatora danych')
+    parser.add_argument('--estimate-factor', type=float, default=100, help='krotność chybienia szacunku liczby wierszy uznawana za błąd')
+    parser.add_argument('--estimate-min-rows', type=int, default=1000,
+                        help='pomijaj węzły o mniejszej liczbie wierszy (szacunki) i skany sekwencyjne o mniejszej liczbie odczytanych wierszy')
+    parser.add_argument('--save', help='zapisz wyniki do pliku JSON (np. jako nowe wyniki bazowe)')
+    parser.add_argument('--baseline', help='plik JSON z wynikami bazowymi do porównania')
+    parser.add_argument('--threshold', type=float, default=0.5, help='dopuszczalny wzrost mediany czasu (0.5 = 50%%)')
+    parser.add_argument('--min-ms', type=float, default=5, help='pomijaj wzrost mediany czasu mniejszy niż tyle milisekund')
+    parser.add_argument('--dsn', help='adres bazy (domyślnie DATABASE_URL)')
+    args = parser.parse_args()
+    scales = [int(scale) for scale in args.scales.split(',') if scale.strip()]
+
+    baseline = {}
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as file:
+            baseline = json.load(file).get('skale', {})
+
+    report = {}
+    problems = []
+    for scale in scales:
+        print(f"Skala: {scale or 'bieżące dane'}", flush=True)
+        connection = connect(args.dsn)
+        try:
+            results = measure_scale(connection, scale, args)
+        finally:
+            connection.close()
+        report[str(scale)] = results
+        previous_scale = baseline.get(str(scale), {})
+        for name, current in results.items():
+            previous = previous_scale.get(name)
+            reference = f"bazowo {previous['czas_ms']:10.2f} ms" if previous else ''
+            print(f"  {name:35} {current['czas_ms']:10.2f} ms  {reference}  "
+                  f"skany sekwencyjne: {', '.join(current['skany_sekwencyjne']) or '-'}")
+            if previous is None:
+                continue
+            if current['plany'] != previous['plany']:
+                print(f"  {name}: plan zmienił się względem wyników bazowych:")
+                for line in difflib.unified_diff(previous['plany'], current['plany'], 'bazowy', 'bieżący', lineterm='', n=1):
+                    print(f"    {line}")
+            problems += compare(f"{scale}/{name}", current, previous, args.threshold, args.min_ms)
+
+    if args.save:
+        os.makedirs(os.path.dirname(args.save) or '.', exist_ok=True)
+        with open(args.save, 'w', encoding='utf-8') as file:
+            json.dump({'utworzono': datetime.now().isoformat(timespec='seconds'), 'skale': report},
+                      file, ensure_ascii=False, indent=2)
+        print(f"Zapisano wyniki w {args.save}")
+    for problem in problems:
+        print(f"  REGRESJA {problem}")
+    sys.exit(1 if problems else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,446 @@
+"""
+Generator danych syntetycznych w rozmiarze produkcyjnym dla schematu `wypozyczalnia`.
+
+Dopisuje do bazy (zwykle świeżo załadowanej z `baza.sql`) auta, klientów, pracowników, wypożyczenia,
+płatności i zamówienia w podanych ilościach. Dane są deterministyczne: ten sam `--seed` na tej samej
+bazie początkowej daje identyczne wiersze. Auta, klienci, pracownicy, wypożyczenia i nieudane zamówienia
+ładowane są przez COPY ze strumienia generowanego w locie (bez plików pośrednich); płatności i udane
+zamówienia powstają z wypożyczeń jednym zapytaniem, tak jak w wyzwalaczach `dodaj_platnosc`
+i `zloz_zamowienie`.
+
+Na czas ładowania wyzwalacze i klucze obce są wyłączone (`session_replication_role = replica`; wymaga
+superużytkownika lub, od PostgreSQL 15, `GRANT SET ON PARAMETER session_replication_role TO <rola>`), więc:
+- numery rejestracyjne i telefonów są generowane w formatach sprawdzanych przez wyzwalacze, a po załadowaniu
+  sprawdzane funkcjami `poprawny_numer_rejestracyjny` i `poprawny_numer_telefonu`,
+- wypożyczenia każdego auta następują po sobie bez nakładania się (ograniczenie
+  `wyklucz_nakladajace_sie_wypozyczenia` działa także w tym trybie),
+- płatności liczone są ze stawek `cennik`, a `obciazenie_pracownikow` i podsumowania przychodów
+  (`przelicz_przychody`) są odtwarzane po załadowaniu.
+Nowe wypożyczenia dotyczą wyłącznie nowych aut, więc nie kolidują z danymi z `baza.sql`. Liczba wypożyczeń
+auta zależy od jego losowej popularności, a udane zamówienia są próbką wypożyczeń wszystkich aut.
+
+Uruchomienie:
+    python -m benchmarks.generate_data --cars 50000 --clients 5000000 --rentals 50000000 --orders 50000000
+    python -m benchmarks.generate_data --cars 2000 --clients 50000 --rentals 200000 --orders 200000 --seed 7
+"""
+import argparse
+import math
+import random
+import time
+from datetime import date, timedelta
+from itertools import islice
+
+import psycopg2
+
+from benchmarks.plans import connect
+
+FIRST_NAMES = (
+    'Adam', 'Agnieszka', 'Aleksandra', 'Andrzej', 'Anna', 'Barbara', 'Bartosz', 'Dariusz', 'Dorota', 'Ewa',
+    'Grzegorz', 'Hanna', 'Jakub', 'Jan', 'Joanna', 'Julia', 'Kamil', 'Katarzyna', 'Krzysztof', 'Magdalena',
+    'Małgorzata', 'Marcin', 'Maria', 'Mateusz', 'Michał', 'Monika', 'Natalia', 'Paweł', 'Piotr', 'Tomasz',
+    'Wojciech', 'Zofia',
+)
+LAST_NAMES = (
+    'Nowak', 'Kowalski', 'Wiśniewski', 'Wójcik', 'Kowalczyk', 'Kamiński', 'Lewandowski', 'Zieliński',
+    'Szymański', 'Woźniak', 'Dąbrowski', 'Kozłowski', 'Jankowski', 'Mazur', 'Kwiatkowski', 'Krawczyk',
+    'Piotrowski', 'Grabowski', 'Nowakowski', 'Pawłowski', 'Michalski', 'Nowicki', 'Adamczyk', 'Dudek',
+    'Zając', 'Wieczorek', 'Jabłoński', 'Król', 'Majewski', 'Olszewski', 'Jaworski', 'Wróbel', 'Malinowski',
+    'Pawlak', 'Witkowski', 'Walczak', 'Stępień', 'Górski', 'Rutkowski', 'Michalak',
+)
+# Wyróżniki powiatów (2-3 litery), od których zaczynają się numery rejestracyjne.
+PLATE_PREFIXES = (
+    'WA', 'WB', 'WE', 'WI', 'WW', 'KR', 'KK', 'KRA', 'PO', 'PZ', 'PGN', 'GD', 'GA', 'GS', 'DW', 'DL',
+    'DJ', 'LU', 'LB', 'BI', 'BIA', 'ZS', 'ZK', 'RZ', 'RKR', 'TK', 'OP', 'ON', 'EL', 'ED', 'CB', 'CT',
+    'NO', 'NE', 'SK', 'SC', 'SB', 'FZ', 'FG', 'WPI',
+)
+PLATE_SUFFIX_CHARS = '0123456789ABCDEFGHJKLMNPRSTUVWXYZ'
+# Długości wypożyczeń w dniach i ich względna częstość (weekendy i tygodnie przeważają).
+RENTAL_LENGTHS = (1, 2, 3, 4, 5, 7, 10, 14, 21, 30, 60, 90)
+RENTAL_WEIGHTS = (10, 18, 14, 9, 7, 16, 7, 8, 4, 4, 2, 1)
+COPY_CHUNK = 1 << 20
+
+
+class CopyStream:
+    """
+    Obiekt plikopodobny dla `copy_expert`, który pobiera kolejne wiersze w formacie tekstowym COPY z generatora.
+    """
+
+    def __init__(self, lines):
+        self._lines = iter(lines)
+        self._buffer = b''
+        self.rows = 0
+
+    def read(self, size=-1):
+        chunks, length = [self._buffer], len(self._buffer)
+        while size is None or size < 0 or length < size:
+            lines = list(islice(self._lines, 5000))
+            if not lines:
+                break
+            self.rows += len(lines)
+            chunk = ''.join(lines).encode()
+            chunks.append(chunk)
+            length += len(chunk)
+        data = b''.join(chunks)
+        if size is None or size < 0:
+            self._buffer = b''
+            return data
+        self._buffer = data[size:]
+        return data[:size]
+
+
+def copy_rows(cursor, table, columns, lines):
+    """
+    Ładuje wiersze do tabeli przez COPY.
+
+    Returns:
+        int: Liczba załadowanych wierszy.
+    """
+    stream = CopyStream(lines)
+    cursor.copy_expert(f"copy wypozyczalnia.{table} ({', '.join(columns)}) from stdin", stream, COPY_CHUNK)
+    return stream.rows
+
+
+def next_id(cursor, table, column):
+    cursor.execute(f"select coalesce(max({column}), 0) + 1 from wypozyczalnia.{table}")
+    return cursor.fetchone()[0]
+
+
+def existing_values(cursor, table, column):
+    cursor.execute(f"select {column} from wypozyczalnia.{table}")
+    return {row[0] for row in cursor.fetchall()}
+
+
+def unique_numbers(rng, count, span, taken):
+    """
+    Zwraca `count` różnych liczb z przedziału [0, span) w pseudolosowej kolejności, z pominięciem `taken`.
+
+    Kolejne indeksy są odwzorowywane przekształceniem i -> (a * i + b) mod span, które przy a względnie
+    pierwszym ze `span` jest permutacją, więc nie trzeba pamiętać wylosowanych wartości.
+    """
+    multiplier = rng.randrange(span // 3, span) | 1
+    while any(multiplier % p == 0 for p in (3, 5, 7, 11, 13)):
+        multiplier += 2
+    offset = rng.randrange(span)
+    produced, index = 0, 0
+    while produced < count:
+        if index >= span:
+            raise ValueError(f"Za mało wolnych wartości ({span}) dla {count} wierszy.")
+        value = (multiplier * index + offset) % span
+        index += 1
+        if value in taken:
+            continue
+        produced += 1
+        yield value
+
+
+def phones(rng, count, taken):
+    """
+    Unikalne numery telefonów komórkowych (9 cyfr, zaczynające się od 5-8), różne od `taken`.
+    """
+    taken_numbers = {int(phone) - 500_000_000 for phone in taken if phone.isdigit()}
+    for number in unique_numbers(rng, count, 400_000_000, taken_numbers):
+        yield str(500_000_000 + number)
+
+
+def plates(rng, count, taken):
+    """
+    Unikalne numery rejestracyjne: wyróżnik powiatu, 3 cyfry i 4 znaki (`^[A-Z]{2,3}[0-9]{2,3}[A-Z0-9 ]{2,5}$`).
+    """
+    base = len(PLATE_SUFFIX_CHARS)
+    span = 1000 * base ** 4
+    generated = 0
+    for number in unique_numbers(rng, 2 * count, span, set()):
+        digits, rest = divmod(number, base ** 4)
+        suffix = ''
+        for _ in range(4):
+            rest, position = divmod(rest, base)
+            suffix += PLATE_SUFFIX_CHARS[position]
+        # Wyróżnik zależy od numeru, więc para (cyfry, znaki) wyznacza cały numer i numery się nie powtarzają.
+        plate = f"{PLATE_PREFIXES[number % len(PLATE_PREFIXES)]}{digits:03d}{suffix}"
+        if plate in taken:
+            continue
+        yield plate
+        generated += 1
+        if generated == count:
+            return
+
+
+def person_rows(rng, first_id, count, taken_phones, extra=lambda: ()):
+    for person_id, phone in enumerate(phones(rng, count, taken_phones), first_id):
+        fields = (person_id, rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES), phone) + tuple(extra())
+        yield '\t'.join(map(str, fields)) + '\n'
+
+
+def car_rows(rng, first_id, count, models, taken_plates):
+    for car_id, plate in enumerate(plates(rng, count, taken_plates), first_id):
+        yield f"{car_id}\t{rng.choice(models)}\t{plate}\t{rng.randint(2008, 2025)}\n"
+
+
+def car_rental_counts(rng, cars, rentals, capacity):
+    """
+    Dzieli `rentals` wypożyczeń między `cars` aut proporcjonalnie do losowej popularności auta
+    (rozkład logarytmicznie normalny), tak aby żadne auto nie dostało więcej niż `capacity`.
+    """
+    weights = [rng.lognormvariate(0, 0.6) for _ in range(cars)]
+    counts = [0] * cars
+    left = rentals
+    while left:
+        room = [index for index in range(cars) if counts[index] < capacity]
+        total = sum(weights[index] for index in room)
+        added = 0
+        for index in room:
+            extra = min(capacity - counts[index], int(left * weights[index] / total))
+            counts[index] += extra
+            added += extra
+        if not added:
+            # Reszta z zaokrągleń: po jednym wypożyczeniu dla najpopularniejszych aut z wolnym miejscem.
+            for index in sorted(room, key=lambda index: -weights[index])[:left]:
+                counts[index] += 1
+                added += 1
+        left -= added
+    return counts
+
+
+def fit_lengths(lengths, span):
+    """
+    Skraca najdłuższe wypożyczenia auta, gdy razem z dniami oddania nie mieszczą się w `span` dniach.
+
+    Wyznacza największy limit długości, przy którym się mieszczą; krótsze wypożyczenia pozostają bez zmian.
+    """
+    if sum(lengths) + len(lengths) <= span:
+        return lengths
+    low, high = 1, max(lengths)
+    while low < high:
+        limit = (low + high + 1) // 2
+        if sum(min(length, limit) for length in lengths) + len(lengths) <= span:
+            low = limit
+        else:
+            high = limit - 1
+    return [min(length, low) for length in lengths]
+
+
+def rental_rows(rng, first_id, cars, rentals, start, end, clients, employees):
+    """
+    Wypożyczenia aut; terminy każdego auta następują po sobie w przedziale [start, end].
+
+    Liczba wypożyczeń auta pochodzi z `car_rental_counts`, a długości z `RENTAL_LENGTHS`. Tylko auto, którego
+    wypożyczenia nie mieszczą się w przedziale, ma skrócone najdłuższe z nich (`fit_lengths`). Pozostałe dni
+    są losowo dzielone na przerwy przed kolejnymi wypożyczeniami. Przedział jest zamknięty z obu stron
+    (`okres` to daterange '[]'), więc kolejne wypożyczenie auta zaczyna się najwcześniej dzień po oddaniu
+    poprzedniego.
+    """
+    span = (end - start).days + 1
+    rental_id = first_id
+    for car_id, count in zip(cars, car_rental_counts(rng, len(cars), rentals, span // 2)):
+        lengths = fit_lengths(rng.choices(RENTAL_LENGTHS, RENTAL_WEIGHTS, k=count), span)
+        free = span - sum(lengths) - count
+        cuts = sorted(rng.randrange(free + 1) for _ in range(count))
+        cursor, previous_cut = start, 0
+        for length, cut in zip(lengths, cuts):
+            begin = cursor + timedelta(days=cut - previous_cut)
+            finish = begin + timedelta(days=length)
+            yield (f"{rental_id}\t{begin}\t{finish}\t{rng.randint(*clients)}\t{car_id}\t"
+                   f"{employees[rental_id % len(employees)]}\n")
+            cursor, previous_cut = finish + timedelta(days=1), cut
+            rental_id += 1
+
+
+def failed_order_rows(rng, first_id, count, clients, models, start, end):
+    days = (end - start).days
+    for order_id in range(first_id, first_id + count):
+        begin = start + timedelta(days=rng.randrange(days))
+        finish = begin + timedelta(days=rng.choices(RENTAL_LENGTHS, RENTAL_WEIGHTS)[0])
+        yield f"{order_id}\t{rng.randint(*clients)}\t{rng.choice(models)}\t{begin}\t{finish}\tnieudane\n"
+
+
+def timed(label, function, *args):
+    started = time.perf_counter()
+    result = function(*args)
+    print(f"{label:45} {result:>12} wierszy  {time.perf_counter() - started:8.1f} s", flush=True)
+    return result
+
+
+def generate(connection, args):
+    """
+    Generuje i ładuje wszystkie tabele w jednej transakcji.
+    """
+    start, end = args.since, args.until
+    with connection.cursor() as cursor:
+        cursor.execute("select id_model from wypozyczalnia.modele order by id_model")
+        models = [row[0] for row in cursor.fetchall()]
+        cursor.execute("select id_rola from wypozyczalnia.role where czy_moze_wynajmowac and id_rola != 1 order by id_rola")
+        renting_roles = [row[0] for row in cursor.fetchall()]
+        cursor.execute("select id_rola from wypozyczalnia.role order by id_rola")
+        roles = [row[0] for row in cursor.fetchall()]
+        if not models or not renting_roles:
+            raise SystemExit("Baza nie zawiera modeli lub ról uprawnionych do wynajmu - najpierw załaduj baza.sql.")
+
+        try:
+            cursor.execute("SET session_replication_role = replica")
+        except psycopg2.errors.InsufficientPrivilege as e:
+            raise SystemExit(f"{e.pgerror.strip()}\nWyłączenie wyzwalaczy wymaga superużytkownika lub (PostgreSQL 15+) "
+                             f"uprawnienia: GRANT SET ON PARAMETER session_replication_role TO <rola>.") from e
+        first_car = next_id(cursor, 'auta', 'id_auto')
+        first_client = next_id(cursor, 'klienci', 'id_klient')
+        first_employee = next_id(cursor, 'pracownicy', 'id_pracownik')
+        first_rental = next_id(cursor, 'wypozyczenia', 'id_wypozyczenia')
+        first_payment = next_id(cursor, 'platnosci', 'id_platnosc')
+        first_order = next_id(cursor, 'zamowienia', 'id_zamowienia')
+
+        # Każda tabela ma własny generator liczb losowych, więc zmiana liczności jednej nie zmienia pozostałych.
+        seed = args.seed
+        timed('auta', copy_rows, cursor, 'auta', ('id_auto', 'id_model', 'numer_rejestracyjny', 'rok'),
+              car_rows(random.Random(f"{seed}-auta"), first_car, args.cars, models,
+                       existing_values(cursor, 'auta', 'numer_rejestracyjny')))
+        timed('klienci', copy_rows, cursor, 'klienci', ('id_klient', 'imie', 'nazwisko', 'telefon'),
+              person_rows(random.Random(f"{seed}-klienci"), first_client, args.clients,
+                          existing_values(cursor, 'klienci', 'telefon')))
+        employee_rng = random.Random(f"{seed}-pracownicy")
+        timed('pracownicy', copy_rows, cursor, 'pracownicy', ('id_pracownik', 'imie', 'nazwisko', 'telefon', 'id_rola'),
+              person_rows(employee_rng, first_employee, args.employees,
+                          existing_values(cursor, 'pracownicy', 'telefon'),
+                          lambda: (employee_rng.choice(roles),)))
+
+        cursor.execute("""
+            select p.id_pracownik from wypozyczalnia.pracownicy p
+            join wypozyczalnia.role r on r.id_rola = p.id_rola
+            where r.czy_moze_wynajmowac and r.id_rola != 1
+            order by p.id_pracownik
+        """)
+        employees = [row[0] for row in cursor.fetchall()]
+        cars = range(first_car, first_car + args.cars)
+        clients = (first_client, first_client + args.clients - 1)
+        timed('wypozyczenia', copy_rows, cursor, 'wypozyczenia',
+              ('id_wypozyczenia', 'data_wypozyczenia', 'data_oddania', 'id_klient', 'id_auto', 'id_pracownik'),
+              rental_rows(random.Random(f"{seed}-wypozyczenia"), first_rental, cars, args.rentals, start, end,
+                          clients, employees) if args.cars else ())
+
+        # Kwota jak w wyzwalaczu dodaj_platnosc: liczba dni razy stawka klasy modelu z cennika.
+        cursor.execute("""
+            insert into wypozyczalnia.platnosci (id_platnosc, id_wypozyczenia, kwota)
+            select %(first_payment)s + w.id_wypozyczenia - %(first_rental)s, w.id_wypozyczenia,
+                   (w.data_oddania - w.data_wypozyczenia) * c.stawka_za_dzien
+            from wypozyczalnia.wypozyczenia w
+            join wypozyczalnia.auta a on a.id_auto = w.id_auto
+            join wypozyczalnia.modele m on m.id_model = a.id_model
+            left join wypozyczalnia.cennik c on c.id_klasa = m.id_klasa
+            where w.id_wypozyczenia >= %(first_rental)s
+        """, {'first_payment': first_payment, 'first_rental': first_rental})
+        print(f"{'platnosci':45} {cursor.rowcount:>12} wierszy", flush=True)
+
+        # Udane zamówienie to zamówienie, z którego zloz_zamowienie utworzyło wypożyczenie (ten sam klient, model i termin).
+        # Wypożyczenia auta mają kolejne ID, więc próbka wybierana jest permutacją i -> (a * i + b) mod n
+        # numerów wypożyczeń: pozycje < liczby udanych zamówień rozkładają się równo na wszystkie auta
+        # i są zarazem kolejnymi numerami zamówień.
+        failed_orders = round(args.orders * args.failed_share)
+        successful_orders = min(args.orders - failed_orders, args.rentals)
+        order_rng = random.Random(f"{seed}-zamowienia-udane")
+        multiplier = order_rng.randrange(1, max(args.rentals, 2)) | 1
+        while math.gcd(multiplier, max(args.rentals, 1)) != 1:
+            multiplier += 2
+        cursor.execute("""
+            insert into wypozyczalnia.zamowienia (id_zamowienia, id_klient, id_model, data_rozpoczecia, data_zakonczenia, status)
+            select %(first_order)s + s.pozycja, w.id_klient, a.id_model, w.data_wypozyczenia, w.data_oddania, 'udane'
+            from wypozyczalnia.wypozyczenia w
+            cross join lateral (select (%(multiplier)s * (w.id_wypozyczenia - %(first_rental)s) + %(offset)s)
+                                       %% %(rentals)s as pozycja) s
+            join wypozyczalnia.auta a on a.id_auto = w.id_auto
+            where w.id_wypozyczenia >= %(first_rental)s and s.pozycja < %(count)s
+        """, {'first_order': first_order, 'first_rental': first_rental, 'count': successful_orders,
+              'multiplier': multiplier, 'offset': order_rng.randrange(max(args.rentals, 1)),
+              'rentals': max(args.rentals, 1)})
+        print(f"{'zamowienia (udane)':45} {cursor.rowcount:>12} wierszy", flush=True)
+        timed('zamowienia (nieudane)', copy_rows, cursor, 'zamowienia',
+              ('id_zamowienia', 'id_klient', 'id_model', 'data_rozpoczecia', 'data_zakonczenia', 'status'),
+              failed_order_rows(random.Random(f"{seed}-zamowienia"), first_order + cursor.rowcount, failed_orders,
+                                clients, models, start, end))
+        cursor.execute("SET session_replication_role = origin")
+
+        finalize(cursor, first_car, first_client, first_employee)
+
+
+def finalize(cursor, first_car, first_client, first_employee):
+    """
+    Odtwarza dane utrzymywane przez wyłączone wyzwalacze, ustawia sekwencje, sprawdza formaty i aktualizuje statystyki.
+
+    Formaty sprawdzane są tylko w wygenerowanych wierszach (część numerów z `baza.sql` wstawiono przed
+    utworzeniem wyzwalaczy).
+    """
+    started = time.perf_counter()
+    cursor.execute("""
+        insert into wypozyczalnia.obciazenie_pracownikow (id_pracownik, liczba_wypozyczen)
+        select p.id_pracownik, count(w.id_wypozyczenia)
+        from wypozyczalnia.pracownicy p
+        left join wypozyczalnia.wypozyczenia w on w.id_pracownik = p.id_pracownik
+        group by p.id_pracownik
+        on conflict (id_pracownik) do update set liczba_wypozyczen = excluded.liczba_wypozyczen
+    """)
+    cursor.execute("select wypozyczalnia.przelicz_przychody()")
+    for table, column in (('auta', 'id_auto'), ('klienci', 'id_klient'), ('pracownicy', 'id_pracownik'),
+                          ('wypozyczenia', 'id_wypozyczenia'), ('platnosci', 'id_platnosc'),
+                          ('zamowienia', 'id_zamowienia')):
+        cursor.execute(f"""
+            select setval(pg_get_serial_sequence('wypozyczalnia.{table}', '{column}'),
+                          (select coalesce(max({column}), 1) from wypozyczalnia.{table}))
+        """)
+
+    cursor.execute("""
+        select (select count(*) from wypozyczalnia.auta
+                where id_auto >= %s and not wypozyczalnia.poprawny_numer_rejestracyjny(numer_rejestracyjny)),
+               (select count(*) from wypozyczalnia.klienci
+                where id_klient >= %s and not wypozyczalnia.poprawny_numer_telefonu(telefon)),
+               (select count(*) from wypozyczalnia.pracownicy
+                where id_pracownik >= %s and not wypozyczalnia.poprawny_numer_telefonu(telefon))
+    """, (first_car, first_client, first_employee))
+    invalid_plates, invalid_clients, invalid_employees = cursor.fetchone()
+    if invalid_plates or invalid_clients or invalid_employees:
+        raise RuntimeError(f"Niepoprawne dane: numery rejestracyjne {invalid_plates}, telefony klientów "
+                           f"{invalid_clients}, telefony pracowników {invalid_employees}.")
+
+    for table in ('auta', 'klienci', 'pracownicy', 'wypozyczenia', 'platnosci', 'zamowienia', 'obciazenie_pracownikow'):
+        cursor.execute(f"ANALYZE wypozyczalnia.{table}")
+    print(f"{'obciążenie, przychody, sekwencje, ANALYZE':45} {'':>20}  {time.perf_counter() - started:8.1f} s", flush=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--cars', type=int, default=50_000, help='liczba generowanych aut')
+    parser.add_argument('--clients', type=int, default=5_000_000, help='liczba generowanych klientów')
+    parser.add_argument('--employees', type=int, default=500, help='liczba generowanych pracowników')
+    parser.add_argument('--rentals', type=int, default=50_000_000, help='liczba generowanych wypożyczeń')
+    parser.add_argument('--orders', type=int, default=50_000_000, help='liczba generowanych zamówień')
+    parser.add_argument('--failed-share', type=float, default=0.1, help='udział zamówień nieudanych (bez wypożyczenia)')
+    parser.add_argument('--since', type=date.fromisoformat, default=date(2000, 1, 1), help='najwcześniejsza data wypożyczenia')
+    parser.add_argument('--until', type=date.fromisoformat, default=date(2025, 12, 31), help='najpóźniejsza data oddania')
+    parser.add_argument('--seed', type=int, default=1, help='ziarno generatora liczb losowych')
+    parser.add_argument('--dsn', help='adres bazy (domyślnie DATABASE_URL)')
+    args = parser.parse_args()
+
+    if args.rentals and not args.cars:
+        parser.error('wypożyczenia wymagają co najmniej jednego generowanego auta (--cars)')
+    if args.rentals and not args.clients:
+        parser.error('wypożyczenia wymagają co najmniej jednego generowanego klienta (--clients)')
+    if args.orders and not args.clients:
+        parser.error('zamówienia wymagają co najmniej jednego generowanego klienta (--clients)')
+    # Każde wypożyczenie zajmuje co najmniej dwa dni kalendarza (oddanie następuje najwcześniej następnego dnia).
+    capacity = ((args.until - args.since).days + 1) // 2
+    if args.rentals > capacity * args.cars:
+        parser.error(f"{args.rentals} wypożyczeń nie mieści się na {args.cars} autach w przedziale {args.since} - "
+                     f"{args.until} (najwyżej {capacity} na auto); "
+                     f"zwiększ --cars lub poszerz przedział dat")
+
+    connection = connect(args.dsn)
+    started = time.perf_counter()
+    try:
+        generate(connection, args)
+        connection.commit()
+    except BaseException:
+        connection.rollback()
+        raise
+    finally:
+        connection.close()
+    print(f"Zakończono w {time.perf_counter() - started:.1f} s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,180 @@
+"""
+Test obciążeniowy równoległego składania zamówień przez `/rentals/add`.
+
+Wysyła wiele zamówień jednocześnie do uruchomionej aplikacji, a następnie sprawdza w bazie,
+czy żadne auto nie zostało zarezerwowane dwukrotnie w nakładających się terminach.
+Zamówienia dotyczą terminów w roku `--year` (domyślnie 2100), aby nie mieszać się z prawdziwymi danymi;
+opcja `--cleanup` usuwa je po teście.
+
+Z opcją `--bulk N` zamówienia są wysyłane partiami po N do `/rentals/add/bulk`, co pozwala porównać
+przepustowość obu ścieżek na tych samych danych.
+
+Uruchomienie (aplikacja musi działać, np. `gunicorn -w 8 --threads 4 app:app`):
+    python -m benchmarks.order_stress --url http://127.0.0.1:8000 --orders 2000 --concurrency 64
+    python -m benchmarks.order_stress --url http://127.0.0.1:8000 --orders 2000 --concurrency 4 --bulk 500
+"""
+import argparse
+import http.client
+import json
+import math
+import random
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+from urllib.parse import urlencode, urlsplit
+
+from benchmarks.plans import connect
+
+
+def percentile(values, fraction):
+    """
+    Zwraca percentyl posortowanej listy metodą najbliższej rangi.
+    """
+    return values[max(math.ceil(fraction * len(values)) - 1, 0)]
+
+
+def make_orders(cursor, count, models, year, seed):
+    """
+    Losuje zamówienia (klient, model, początek, koniec) o krótkich terminach w jednym miesiącu,
+    tak aby wiele z nich konkurowało o te same auta.
+    """
+    rng = random.Random(seed)
+    cursor.execute("select id_klient from wypozyczalnia.klienci")
+    clients = [row[0] for row in cursor.fetchall()]
+    cursor.execute("""
+        select id_model from wypozyczalnia.auta group by id_model order by count(*) desc limit %s""", (models,))
+    model_ids = [row[0] for row in cursor.fetchall()]
+    first_day = date(year, 1, 1)
+    orders = []
+    for _ in range(count):
+        start = first_day + timedelta(days=rng.randrange(30))
+        orders.append((rng.choice(clients), rng.choice(model_ids), start, start + timedelta(days=rng.randint(1, 5))))
+    return orders
+
+
+def send_order(url, order):
+    """
+    Wysyła jedno zamówienie i zwraca (kod odpowiedzi HTTP, czas w sekundach).
+    """
+    id_klient, id_model, start, end = order
+    parts = urlsplit(url)
+    body = urlencode({'client_id': id_klient, 'rental_model_id': id_model,
+                      'start_rental_date': start.isoformat(), 'end_rental_date': end.isoformat()})
+    started = time.perf_counter()
+    connection = http.client.HTTPConnection(parts.hostname, parts.port or 80, timeout=60)
+    try:
+        connection.request('POST', '/rentals/add', body, {'Content-Type': 'application/x-www-form-urlencoded'})
+        status = connection.getresponse().status
+    except OSError:
+        status = 0
+    finally:
+        connection.close()
+    return status, time.perf_counter() - started
+
+
+def send_bulk(url, orders):
+    """
+    Wysyła partię zamówień do `/rentals/add/bulk` i zwraca (kod odpowiedzi HTTP, czas w sekundach).
+    """
+    parts = urlsplit(url)
+    body = json.dumps([{'id_klient': id_klient, 'id_model': id_model,
+                        'data_rozpoczecia': start.isoformat(), 'data_zakonczenia': end.isoformat()}
+                       for id_klient, id_model, start, end in orders])
+    started = time.perf_counter()
+    connection = http.client.HTTPConnection(parts.hostname, parts.port or 80, timeout=300)
+    try:
+        connection.request('POST', '/rentals/add/bulk', body, {'Content-Type': 'application/json'})
+        response = connection.getresponse()
+        response.read()
+        status = response.status
+    except OSError:
+        status = 0
+    finally:
+        connection.close()
+    return status, time.perf_counter() - started
+
+
+def double_bookings(cursor, year):
+    """
+    Zwraca pary wypożyczeń tego samego auta o nakładających się terminach (sprawdzenie niezależne od ograniczeń).
+    """
+    cursor.execute("""
+        select w1.id_auto, w1.id_wypozyczenia, w2.id_wypozyczenia
+        from wypozyczalnia.wypozyczenia w1
+        join wypozyczalnia.wypozyczenia w2 on w1.id_auto = w2.id_auto and w1.id_wypozyczenia < w2.id_wypozyczenia
+        where w1.data_wypozyczenia <= w2.data_oddania and w1.data_oddania >= w2.data_wypozyczenia
+          and w1.data_oddania >= %s and w1.data_wypozyczenia < %s""", (date(year, 1, 1), date(year + 1, 1, 1)))
+    return cursor.fetchall()
+
+
+def cleanup(cursor, year):
+    """
+    Usuwa zamówienia, wypożyczenia i płatności utworzone przez test i scala zmiany przychodów.
+    """
+    window = (date(year, 1, 1), date(year + 1, 1, 1))
+    cursor.execute("""
+        delete from wypozyczalnia.zamowienia where data_rozpoczecia >= %s and data_rozpoczecia < %s""", window)
+    cursor.execute("""
+        delete from wypozyczalnia.platnosci p using wypozyczalnia.wypozyczenia w
+        where p.id_wypozyczenia = w.id_wypozyczenia and w.data_wypozyczenia >= %s and w.data_wypozyczenia < %s""", window)
+    cursor.execute("""
+        delete from wypozyczalnia.wypozyczenia where data_wypozyczenia >= %s and data_wypozyczenia < %s""", window)
+    # Zmiany przychodów z utworzonych i usuniętych płatności znoszą się; scalenie usuwa je z raportów.
+    cursor.execute("select wypozyczalnia.scal_przychody()")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--url', default='http://127.0.0.1:5000', help='adres działającej aplikacji')
+    parser.add_argument('--orders', type=int, default=2000, help='liczba zamówień')
+    parser.add_argument('--concurrency', type=int, default=64, help='liczba równoległych klientów')
+    parser.add_argument('--bulk', type=int, default=0, help='wysyłaj zamówienia partiami tej wielkości do /rentals/add/bulk')
+    parser.add_argument('--models', type=int, default=5, help='liczba modeli, o które konkurują zamówienia')
+    parser.add_argument('--year', type=int, default=2100, help='rok terminów testowych zamówień')
+    parser.add_argument('--seed', type=int, default=1, help='ziarno generatora zamówień')
+    parser.add_argument('--min-throughput', type=float, default=0.0, help='minimalna akceptowalna liczba zamówień na sekundę')
+    parser.add_argument('--cleanup', action='store_true', help='usuń dane testowe po zakończeniu')
+    parser.add_argument('--dsn', help='adres bazy (domyślnie DATABASE_URL)')
+    args = parser.parse_args()
+
+    connection = connect(args.dsn)
+    connection.autocommit = True
+    cursor = connection.cursor()
+    orders = make_orders(cursor, args.orders, args.models, args.year, args.seed)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+        if args.bulk:
+            batches = [orders[i:i + args.bulk] for i in range(0, len(orders), args.bulk)]
+            results = list(executor.map(lambda batch: send_bulk(args.url, batch), batches))
+        else:
+            results = list(executor.map(lambda order: send_order(args.url, order), orders))
+    elapsed = time.perf_counter() - started
+
+    latencies = sorted(latency for _, latency in results)
+    errors = sum(1 for status, _ in results if status not in (200, 302))
+    cursor.execute("""
+        select status, count(*) from wypozyczalnia.zamowienia
+        where data_rozpoczecia >= %s and data_rozpoczecia < %s group by status""",
+                   (date(args.year, 1, 1), date(args.year + 1, 1, 1)))
+    statuses = dict(cursor.fetchall())
+    conflicts = double_bookings(cursor, args.year)
+    throughput = len(orders) / elapsed
+
+    print(f"Zamówienia: {len(orders)}, równolegle: {args.concurrency}, czas: {elapsed:.2f} s, przepustowość: {throughput:.1f}/s")
+    print(f"Opóźnienie żądań: p50 {1000 * percentile(latencies, 0.5):.1f} ms, "
+          f"p95 {1000 * percentile(latencies, 0.95):.1f} ms, p99 {1000 * percentile(latencies, 0.99):.1f} ms")
+    print(f"Statusy: {statuses}, błędy HTTP: {errors}, podwójne rezerwacje: {len(conflicts)}")
+    for id_auto, first, second in conflicts[:10]:
+        print(f"  auto {id_auto}: wypożyczenia {first} i {second} nakładają się")
+
+    if args.cleanup:
+        cleanup(cursor, args.year)
+    connection.close()
+    failed = bool(conflicts) or errors > 0 or throughput < args.min_throughput
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,153 @@
+"""
+Benchmark zapytań o nakładające się okresy wypożyczeń.
+
+Ładuje w jednej transakcji syntetyczną flotę i historię wypożyczeń (domyślnie 10 mln), po czym dla każdej
+funkcji sprawdzającej dostępność aut zapisuje czas wykonania oraz plany zagnieżdżonych zapytań.
+Skrypt kończy się błędem, jeśli zapytanie o nakładanie się okresów (`okres && ...`) skanuje
+sekwencyjnie tabelę `wypozyczenia`.
+Domyślnie transakcja jest wycofywana, więc baza pozostaje nietknięta.
+
+Uruchomienie:
+    python -m benchmarks.overlap_plans --rentals 10000000 --cars 50000
+"""
+import argparse
+import statistics
+import sys
+import time
+from datetime import date, timedelta
+
+from benchmarks.plans import connect, enable_auto_explain, disable_auto_explain, capture_plans, plan_nodes, seq_scans
+
+START_DATE = date(2000, 1, 1)
+RENTAL_SPACING = 20
+
+
+def load_data(cursor, cars, rentals):
+    """
+    Dodaje auta i nienakładające się wypożyczenia (kolejne wypożyczenia auta co `RENTAL_SPACING` dni).
+
+    Wyzwalacze i klucze obce są wyłączone na czas ładowania (`session_replication_role = replica`).
+
+    Returns:
+        date: Środek wygenerowanego zakresu dat, używany jako termin zapytań.
+    """
+    per_car = max(rentals // cars, 1)
+    cursor.execute("SET session_replication_role = replica")
+    cursor.execute("""
+        insert into wypozyczalnia.auta (id_model, numer_rejestracyjny, rok)
+        select 1 + g %% (select count(*) from wypozyczalnia.modele),
+               'BN' || lpad((g / 100000)::text, 3, '0') || lpad((g %% 100000)::text, 5, '0'),
+               2010 + g %% 15
+        from generate_series(1, %s) g
+        returning id_auto
+    """, (cars,))
+    first_car = min(row[0] for row in cursor.fetchall())
+    cursor.execute("""
+        insert into wypozyczalnia.wypozyczenia (data_wypozyczenia, data_oddania, id_klient, id_auto, id_pracownik)
+        select %(start)s::date + k * %(spacing)s + a %% 5,
+               %(start)s::date + k * %(spacing)s + a %% 5 + 1 + (k * 7 + a) %% 14,
+               1, a, 4
+        from generate_series(%(first)s, %(first)s + %(cars)s - 1) a
+        cross join generate_series(0, %(per_car)s - 1) k
+    """, {'start': START_DATE, 'spacing': RENTAL_SPACING, 'first': first_car, 'cars': cars, 'per_car': per_car})
+    cursor.execute("SET session_replication_role = origin")
+    cursor.execute("ANALYZE wypozyczalnia.auta")
+    cursor.execute("ANALYZE wypozyczalnia.wypozyczenia")
+    return START_DATE + timedelta(days=per_car * RENTAL_SPACING // 2)
+
+
+def checks(window_start, window_end):
+    """
+    Zwraca listę sprawdzanych wywołań: (nazwa, zapytanie, parametry).
+    """
+    window = (window_start, window_end)
+    return [
+        ('dostepne_auta_w_danym_terminie',
+         "select * from wypozyczalnia.dostepne_auta_w_danym_terminie(%s, %s)", window),
+        ('policz_auta_dostepne_w_danym_terminie',
+         "select * from wypozyczalnia.policz_auta_dostepne_w_danym_terminie(%s, %s)", window),
+        ('podsumuj_auta_dostepne_w_danym_terminie',
+         "select * from wypozyczalnia.podsumuj_auta_dostepne_w_danym_terminie(%s, %s)", window),
+        ('zloz_zamowienie',
+         "insert into wypozyczalnia.zamowienia (id_klient, id_model, data_rozpoczecia, data_zakonczenia, status) "
+         "values (1, 1, %s, %s, 'oczekujące')", window),
+    ]
+
+
+def run_check(connection, name, query, params, repeat):
+    """
+    Mierzy czas wywołania (mediana z `repeat` powtórzeń) i zbiera jego plany.
+
+    Każde wywołanie wykonywane jest w punkcie zapisu wycofywanym po pomiarze.
+    """
+    with connection.cursor() as cursor:
+        enable_auto_explain(cursor)
+        cursor.execute("SAVEPOINT pomiar")
+        plans = capture_plans(connection, query, params)
+        cursor.execute("ROLLBACK TO SAVEPOINT pomiar")
+
+        disable_auto_explain(cursor)
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            cursor.execute(query, params)
+            if cursor.description:
+                cursor.fetchall()
+            timings.append(time.perf_counter() - start)
+            cursor.execute("ROLLBACK TO SAVEPOINT pomiar")
+    return statistics.median(timings), plans
+
+
+def describe_scans(plans):
+    """
+    Zwraca opis węzłów planu odczytujących tabelę `wypozyczenia`, np. "Bitmap Index Scan(idx_wypozyczenia_okres)".
+    """
+    scans = []
+    for plan in plans:
+        for node in plan_nodes(plan):
+            if node.get('Relation Name') == 'wypozyczenia' or node.get('Index Name', '').startswith(('idx_wypozyczenia', 'wypozyczenia')):
+                scans.append(f"{node['Node Type']}({node.get('Index Name', node.get('Relation Name'))})")
+    return sorted(set(scans))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rentals', type=int, default=10_000_000, help='liczba generowanych wypożyczeń')
+    parser.add_argument('--cars', type=int, default=50_000, help='liczba generowanych aut')
+    parser.add_argument('--days', type=int, default=14, help='długość sprawdzanego terminu w dniach')
+    parser.add_argument('--repeat', type=int, default=5, help='liczba powtórzeń pomiaru czasu')
+    parser.add_argument('--keep', action='store_true', help='zatwierdź wygenerowane dane zamiast je wycofać')
+    parser.add_argument('--dsn', help='adres bazy (domyślnie DATABASE_URL)')
+    args = parser.parse_args()
+
+    connection = connect(args.dsn)
+    failed = False
+    try:
+        with connection.cursor() as cursor:
+            start = time.perf_counter()
+            window_start = load_data(cursor, args.cars, args.rentals)
+            cursor.execute("select count(*) from wypozyczalnia.wypozyczenia")
+            print(f"Załadowano dane w {time.perf_counter() - start:.1f} s, wypożyczeń: {cursor.fetchone()[0]}")
+        window_end = window_start + timedelta(days=args.days)
+
+        for name, query, params in checks(window_start, window_end):
+            median, plans = run_check(connection, name, query, params, args.repeat)
+            overlap_plans = [plan for plan in plans if 'okres' in plan.get('Query Text', '')]
+            regressions = seq_scans(overlap_plans, {'wypozyczenia'})
+            failed = failed or bool(regressions) or not overlap_plans
+            status = 'SEQ SCAN' if regressions else 'OK' if overlap_plans else 'BRAK'
+            print(f"{name:45} {1000 * median:10.2f} ms  {status:8}  {', '.join(describe_scans(overlap_plans))}")
+            other = seq_scans([plan for plan in plans if plan not in overlap_plans], {'wypozyczenia'})
+            if other:
+                print(f"{'':45} uwaga: skan sekwencyjny wypozyczenia poza zapytaniem o nakładanie się okresów")
+    finally:
+        if args.keep and not failed:
+            connection.commit()
+        else:
+            connection.rollback()
+        connection.close()
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,111 @@
+"""
+Narzędzia do przechwytywania planów zapytań wykonywanych wewnątrz funkcji i wyzwalaczy PL/pgSQL.
+
+EXPLAIN pokazuje dla wywołania funkcji PL/pgSQL jedynie węzeł `Function Scan`, dlatego plany zapytań
+zagnieżdżonych zbierane są przez moduł `auto_explain`, którego komunikaty kierowane są do klienta
+jako NOTICE. Wymaga uprawnień do `LOAD 'auto_explain'` (superużytkownik lub `session_preload_libraries`).
+"""
+import json
+import os
+
+import psycopg2
+from dotenv import load_dotenv
+
+
+def connect(dsn=None):
+    """
+    Otwiera połączenie z bazą wskazaną w argumencie lub w zmiennej środowiskowej DATABASE_URL.
+
+    Args:
+        dsn (str): Adres bazy danych. Domyślnie DATABASE_URL z pliku .env.
+
+    Returns:
+        connection: Połączenie psycopg2 z listą komunikatów `notices` bez limitu długości.
+    """
+    load_dotenv()
+    connection = psycopg2.connect(dsn or os.getenv('DATABASE_URL'))
+    connection.notices = []
+    return connection
+
+
+def enable_auto_explain(cursor, analyze=True):
+    """
+    Włącza w bieżącej sesji zapisywanie planów wszystkich zapytań, także zagnieżdżonych w funkcjach.
+
+    Args:
+        cursor (cursor): Kursor sesji.
+        analyze (bool): Czy plany mają zawierać rzeczywiste czasy, liczby wierszy i bufory (EXPLAIN ANALYZE, BUFFERS).
+    """
+    cursor.execute("LOAD 'auto_explain'")
+    cursor.execute("SET auto_explain.log_min_duration = 0")
+    cursor.execute("SET auto_explain.log_nested_statements = on")
+    cursor.execute("SET auto_explain.log_analyze = %s", ('on' if analyze else 'off',))
+    cursor.execute("SET auto_explain.log_buffers = %s", ('on' if analyze else 'off',))
+    cursor.execute("SET auto_explain.log_format = 'json'")
+    cursor.execute("SET auto_explain.log_level = 'notice'")
+    cursor.execute("SET client_min_messages = 'notice'")
+
+
+def disable_auto_explain(cursor):
+    """
+    Wyłącza zapisywanie planów w bieżącej sesji (np. na czas pomiarów czasu wykonania).
+    """
+    cursor.execute("SET auto_explain.log_min_duration = -1")
+
+
+def capture_plans(connection, query, params=None):
+    """
+    Wykonuje zapytanie i zwraca plany wszystkich wykonanych przy tym instrukcji.
+
+    Args:
+        connection (connection): Połączenie z włączonym `enable_auto_explain`.
+        query (str): Zapytanie SQL.
+        params (tuple): Parametry zapytania.
+
+    Returns:
+        list[dict]: Plany w formacie JSON EXPLAIN, w kolejności zakończenia instrukcji
+            (najpierw zagnieżdżone, na końcu zapytanie zewnętrzne).
+    """
+    del connection.notices[:]
+    with connection.cursor() as cursor:
+        cursor.execute(query, params)
+        if cursor.description:
+            cursor.fetchall()
+    plans = []
+    for notice in connection.notices:
+        if 'plan:' not in notice:
+            continue
+        plans.append(json.loads(notice.split('plan:', 1)[1]))
+    del connection.notices[:]
+    return plans
+
+
+def plan_nodes(plan):
+    """
+    Przechodzi rekurencyjnie po wszystkich węzłach planu.
+
+    Args:
+        plan (dict): Plan zwrócony przez `capture_plans` lub jego węzeł.
+
+    Yields:
+        dict: Kolejne węzły planu.
+    """
+    node = plan.get('Plan', plan)
+    yield node
+    for child in node.get('Plans', []):
+        yield from plan_nodes(child)
+
+
+def seq_scans(plans, relations):
+    """
+    Zwraca skany sekwencyjne wskazanych tabel występujące w planach.
+
+    Args:
+        plans (list[dict]): Plany zwrócone przez `capture_plans`.
+        relations (set[str]): Nazwy tabel, dla których skan sekwencyjny jest regresją.
+
+    Returns:
+        list[str]: Nazwy tabel skanowanych sekwencyjnie.
+    """
+    return [node['Relation Name'] for plan in plans for node in plan_nodes(plan)
+            if node['Node Type'] == 'Seq Scan' and node.get('Relation Name') in relations]
@@ -0,0 +1,367 @@
+"""
+Benchmark tras aplikacji z progami regresji.
+
+Wysyła równolegle żądania do tras `/cars`, `/rentals`, `/available_cars/search`, `/popular_cars/search`,
+`/incomes/all` i `/rentals/add` w proporcjach podanych w `--mix` i dla każdej trasy raportuje przepustowość,
+opóźnienia p50/p95/p99 oraz średnią liczbę zapytań SQL na żądanie (z różnicy statystyk `/metrics`
+przed i po pomiarze). Parametry żądań (terminy, klienci, modele) losowane są z danych w bazie, np.
+wygenerowanych przez `benchmarks.generate_data`.
+
+Bez `--url` aplikacja uruchamiana jest w tym procesie na serwerze wielowątkowym Werkzeug, więc `/metrics`
+obejmuje wszystkie żądania. Przy zewnętrznym serwerze z wieloma procesami liczba zapytań pochodzi tylko
+z procesu, który obsłużył odczyt `/metrics`, i może być niedokładna.
+
+Wyniki zapisywane są jako plik JSON (`--save`); z `--baseline` wyniki porównywane są z wcześniej zapisanymi
+i skrypt kończy się błędem, gdy któraś trasa pogorszyła się o więcej niż `--threshold`
+(p95 opóźnienia lub liczba zapytań wzrosły, przepustowość spadła). Zamówienia z `/rentals/add` dotyczą
+terminów w roku `--year` i są usuwane po pomiarze. `/rentals/add` przekierowuje (302) także po błędzie,
+dlatego jego błędy to żądania, po których nie powstało zamówienie (liczone w bazie przed usunięciem);
+raportowany jest też udział zamówień nieudanych (bez wolnego auta).
+
+Uruchomienie:
+    python -m benchmarks.routes --duration 30 --concurrency 16 --save benchmarks/baselines/routes.json
+    python -m benchmarks.routes --duration 30 --concurrency 16 --baseline benchmarks/baselines/routes.json
+    python -m benchmarks.routes --url http://127.0.0.1:8000 --mix cars=1,rentals=1,available=3
+"""
+import argparse
+import http.client
+import json
+import logging
+import os
+import random
+import re
+import sys
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta
+from urllib.parse import urlencode, urlsplit
+
+from benchmarks.order_stress import cleanup, percentile
+from benchmarks.plans import connect
+
+DEFAULT_MIX = 'cars=20,rentals=20,available=20,popular=10,incomes=15,add=15'
+METRIC_LINE = re.compile(r'^wypozyczalnia_sql_statements_per_request_(sum|count)\{endpoint="([^"]*)"\} (\S+)$')
+
+
+def load_parameters(cursor, year):
+    """
+    Pobiera z bazy wartości, z których losowane są parametry żądań.
+
+    Returns:
+        dict: Identyfikatory klientów i modeli, zakres dat wypożyczeń i rok terminów zamówień testowych.
+    """
+    cursor.execute("select min(id_klient), max(id_klient) from wypozyczalnia.klienci")
+    clients = cursor.fetchone()
+    cursor.execute("select distinct id_model from wypozyczalnia.auta order by id_model")
+    models = [row[0] for row in cursor.fetchall()]
+    cursor.execute("select min(data_wypozyczenia), max(data_oddania) from wypozyczalnia.wypozyczenia")
+    first_day, last_day = cursor.fetchone()
+    cursor.execute("select count(*) from wypozyczalnia.wypozyczenia")
+    rentals = cursor.fetchone()[0]
+    return {'clients': clients, 'models': models, 'first_day': first_day or date.today(),
+            'last_day': last_day or date.today(), 'rentals': rentals, 'year': year}
+
+
+def random_period(rng, first_day, last_day, max_days=14):
+    start = first_day + timedelta(days=rng.randrange(max((last_day - first_day).days, 1)))
+    return start, start + timedelta(days=rng.randint(1, max_days))
+
+
+def cars_request(rng, params):
+    query = {'sort': rng.choice(('id', 'numer_rejestracyjny')), 'dir': rng.choice(('asc', 'desc'))}
+    return 'GET', '/cars?' + urlencode(query), None
+
+
+def rentals_request(rng, params):
+    query = {'sort': rng.choice(('id', 'poczatek')), 'dir': rng.choice(('asc', 'desc'))}
+    return 'GET', '/rentals?' + urlencode(query), None
+
+
+def available_request(rng, params):
+    start, end = random_period(rng, params['first_day'], params['last_day'])
+    return 'POST', '/available_cars/search', {'search_start_date': start.isoformat(), 'search_end_date': end.isoformat()}
+
+
+def popular_request(rng, params):
+    # Próg rzędu średniej liczby wypożyczeń modelu, aby wynik nie był ani pusty, ani pełną listą.
+    average = params['rentals'] // max(len(params['models']), 1)
+    return 'POST', '/popular_cars/search', {'rental_amount': rng.randint(0, max(average, 1))}
+
+
+def incomes_request(rng, params):
+    return 'GET', '/incomes/all' + rng.choice(('', '?podzial=miesiace')), None
+
+
+def add_request(rng, params):
+    first_day = date(params['year'], 1, 1)
+    start, end = random_period(rng, first_day, first_day + timedelta(days=330), max_days=5)
+    return 'POST', '/rentals/add', {'client_id': rng.randint(*params['clients']), 'rental_model_id': rng.choice(params['models']),
+                                    'start_rental_date': start.isoformat(), 'end_rental_date': end.isoformat()}
+
+
+# Nazwa trasy w --mix: (nazwa widoku Flask w /metrics, funkcja losująca żądanie).
+ROUTES = {
+    'cars': ('car_details', cars_request),
+    'rentals': ('rentals_details', rentals_request),
+    'available': ('available_cars_search', available_request),
+    'popular': ('popular_cars_search', popular_request),
+    'incomes': ('get_raport', incomes_request),
+    'add': ('add_rental', add_request),
+}
+
+
+def parse_mix(value):
+    """
+    Zamienia opis w postaci 'cars=20,add=5' na słownik wag tras.
+
+    Raises:
+        argparse.ArgumentTypeError: Gdy trasa jest nieznana lub waga nie jest nieujemną liczbą całkowitą.
+    """
+    mix = {}
+    for part in filter(None, value.split(',')):
+        name, _, weight = part.partition('=')
+        if name not in ROUTES or not weight.isdigit():
+            raise argparse.ArgumentTypeError(f"niepoprawny element '{part}', dostępne trasy: {', '.join(ROUTES)}")
+        mix[name] = int(weight)
+    if not any(mix.values()):
+        raise argparse.ArgumentTypeError('co najmniej jedna trasa musi mieć dodatnią wagę')
+    return {name: weight for name, weight in mix.items() if weight}
+
+
+def send(parts, method, path, form):
+    """
+    Wysyła jedno żądanie i zwraca (kod odpowiedzi HTTP, czas w sekundach).
+
+    Przekierowania nie są śledzone: `/rentals/add` odpowiada 302, a czas obejmuje tylko złożenie zamówienia.
+    Kod 302 nie oznacza sukcesu zamówienia - ten sprawdza `order_outcomes`.
+    """
+    body = urlencode(form) if form is not None else None
+    headers = {'Content-Type': 'application/x-www-form-urlencoded'} if form is not None else {}
+    started = time.perf_counter()
+    connection = http.client.HTTPConnection(parts.hostname, parts.port or 80, timeout=120)
+    try:
+        connection.request(method, path, body, headers)
+        response = connection.getresponse()
+        response.read()
+        status = response.status
+    except OSError:
+        status = 0
+    finally:
+        connection.close()
+    return status, time.perf_counter() - started
+
+
+def statements_per_endpoint(parts):
+    """
+    Odczytuje z `/metrics` sumę i liczbę obserwacji histogramu zapytań SQL na żądanie dla każdego widoku.
+    """
+    connection = http.client.HTTPConnection(parts.hostname, parts.port or 80, timeout=30)
+    try:
+        connection.request('GET', '/metrics')
+        text = connection.getresponse().read().decode()
+    finally:
+        connection.close()
+    totals = defaultdict(lambda: [0.0, 0.0])
+    for line in text.splitlines():
+        match = METRIC_LINE.match(line)
+        if match:
+            kind, endpoint, value = match.groups()
+            totals[endpoint][kind == 'count'] = float(value)
+    return totals
+
+
+def order_outcomes(cursor, year):
+    """
+    Zlicza zamówienia z terminami w roku `year` wg statusu ('udane', 'nieudane', 'oczekujące').
+    """
+    cursor.execute("""
+        select status::text, count(*) from wypozyczalnia.zamowienia
+        where data_rozpoczecia >= %s and data_rozpoczecia < %s
+        group by status""", (date(year, 1, 1), date(year + 1, 1, 1)))
+    return defaultdict(int, cursor.fetchall())
+
+
+def run(parts, mix, params, concurrency, duration, seed):
+    """
+    Wysyła żądania z `concurrency` wątków przez `duration` sekund.
+
+    Returns:
+        tuple[dict, float]: Listy (kod, czas) dla każdej trasy i rzeczywisty czas pomiaru w sekundach.
+    """
+    names, weights = list(mix), list(mix.values())
+    results = defaultdict(list)
+    lock = threading.Lock()
+    deadline = time.perf_counter() + duration
+
+    def worker(number):
+        rng = random.Random(f"{seed}-{number}")
+        local = defaultdict(list)
+        while time.perf_counter() < deadline:
+            name = rng.choices(names, weights)[0]
+            local[name].append(send(parts, *ROUTES[name][1](rng, params)))
+        with lock:
+            for name, samples in local.items():
+                results[name].extend(samples)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(worker, range(concurrency)))
+    return results, time.perf_counter() - started
+
+
+def summarize(results, elapsed, before, after, orders_before=None, orders_after=None):
+    """
+    Zwraca statystyki tras w postaci zapisywanej do pliku JSON.
+
+    Dla `/rentals/add` błędem jest każde żądanie, po którym nie powstało zamówienie (różnica liczby zamówień
+    `orders_after` - `orders_before` wg statusu), niezależnie od kodu odpowiedzi.
+    """
+    routes = {}
+    for name, samples in sorted(results.items()):
+        endpoint = ROUTES[name][0]
+        latencies = sorted(latency for _, latency in samples)
+        statements = after[endpoint][0] - before[endpoint][0]
+        requests = after[endpoint][1] - before[endpoint][1]
+        routes[name] = {
+            'zadania': len(samples),
+            'bledy': sum(1 for status, _ in samples if status not in (200, 302)),
+            'przepustowosc': round(len(samples) / elapsed, 2),
+            'p50_ms': round(1000 * percentile(latencies, 0.5), 2),
+            'p95_ms': round(1000 * percentile(latencies, 0.95), 2),
+            'p99_ms': round(1000 * percentile(latencies, 0.99), 2),
+            'zapytania_na_zadanie': round(statements / requests, 2) if requests else None,
+        }
+        if name == 'add' and orders_before is not None:
+            created = {status: orders_after[status] - orders_before[status] for status in ('udane', 'nieudane', 'oczekujące')}
+            total = sum(created.values())
+            routes[name]['bledy'] = max(len(samples) - total, 0)
+            routes[name]['zamowienia_udane'] = created['udane']
+            routes[name]['zamowienia_nieudane'] = created['nieudane']
+            routes[name]['udzial_nieudanych'] = round(created['nieudane'] / total, 3) if total else None
+    return routes
+
+
+def regressions(routes, baseline, threshold):
+    """
+    Porównuje wyniki z plikiem bazowym.
+
+    Returns:
+        list[str]: Opisy tras, które pogorszyły się o więcej niż `threshold` (np. 0.2 = 20%).
+    """
+    problems = []
+    for name, current in routes.items():
+        previous = baseline.get('trasy', {}).get(name)
+        if previous is None:
+            continue
+        if current['p95_ms'] > previous['p95_ms'] * (1 + threshold):
+            problems.append(f"{name}: p95 {current['p95_ms']} ms, bazowo {previous['p95_ms']} ms")
+        if current['przepustowosc'] < previous['przepustowosc'] * (1 - threshold):
+            problems.append(f"{name}: przepustowość {current['przepustowosc']}/s, bazowo {previous['przepustowosc']}/s")
+        if (current['zapytania_na_zadanie'] is not None and previous.get('zapytania_na_zadanie') is not None
+                and current['zapytania_na_zadanie'] > previous['zapytania_na_zadanie'] * (1 + threshold)):
+            problems.append(f"{name}: {current['zapytania_na_zadanie']} zapytań na żądanie, "
+                            f"bazowo {previous['zapytania_na_zadanie']}")
+    return problems
+
+
+def start_local_server():
+    """
+    Uruchamia aplikację z `app.py` w wątku tła na wolnym porcie.
+
+    Returns:
+        tuple[str, BaseWSGIServer]: Adres serwera i serwer (do zatrzymania przez `shutdown`).
+    """
+    from werkzeug.serving import make_server
+
+    from app import app
+
+    # Dziennik każdego żądania spowalniałby pomiar i zasłaniał wyniki.
+    logging.getLogger('werkzeug').setLevel(logging.WARNING)
+    server = make_server('127.0.0.1', 0, app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f"http://127.0.0.1:{server.server_port}", server
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--url', help='adres działającej aplikacji (domyślnie aplikacja uruchamiana w tym procesie)')
+    parser.add_argument('--mix', type=parse_mix, default=parse_mix(DEFAULT_MIX), help=f'wagi tras (domyślnie {DEFAULT_MIX})')
+    parser.add_argument('--concurrency', type=int, default=16, help='liczba równoległych klientów')
+    parser.add_argument('--duration', type=float, default=30, help='czas pomiaru w sekundach')
+    parser.add_argument('--warmup', type=float, default=3, help='czas rozgrzewki (bez zapisu wyników) w sekundach')
+    parser.add_argument('--year', type=int, default=2100, help='rok terminów zamówień wysyłanych do /rentals/add')
+    parser.add_argument('--seed', type=int, default=1, help='ziarno generatora żądań')
+    parser.add_argument('--save', help='zapisz wyniki do pliku JSON (np. jako nowe wyniki bazowe)')
+    parser.add_argument('--baseline', help='plik JSON z wynikami bazowymi do porównania')
+    parser.add_argument('--threshold', type=float, default=0.2, help='dopuszczalne pogorszenie względem wyników bazowych (0.2 = 20%%)')
+    parser.add_argument('--dsn', help='adres bazy (domyślnie DATABASE_URL)')
+    args = parser.parse_args()
+
+    connection = connect(args.dsn)
+    connection.autocommit = True
+    cursor = connection.cursor()
+    params = load_parameters(cursor, args.year)
+
+    server = None
+    url = args.url
+    if url is None:
+        url, server = start_local_server()
+    parts = urlsplit(url)
+    orders_before = orders_after = None
+    try:
+        if args.warmup:
+            run(parts, args.mix, params, args.concurrency, args.warmup, f"{args.seed}-rozgrzewka")
+        if 'add' in args.mix:
+            orders_before = order_outcomes(cursor, args.year)
+        before = statements_per_endpoint(parts)
+        results, elapsed = run(parts, args.mix, params, args.concurrency, args.duration, args.seed)
+        after = statements_per_endpoint(parts)
+        if 'add' in args.mix:
+            orders_after = order_outcomes(cursor, args.year)
+    finally:
+        if server is not None:
+            server.shutdown()
+        if 'add' in args.mix:
+            cleanup(cursor, args.year)
+
+    routes = summarize(results, elapsed, before, after, orders_before, orders_after)
+    total = sum(route['zadania'] for route in routes.values())
+    print(f"Żądania: {total}, równolegle: {args.concurrency}, czas: {elapsed:.1f} s, przepustowość: {total / elapsed:.1f}/s")
+    print(f"{'trasa':12} {'żądania':>8} {'błędy':>6} {'żądań/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'zapytań':>8}")
+    for name, route in routes.items():
+        statements = '-' if route['zapytania_na_zadanie'] is None else route['zapytania_na_zadanie']
+        print(f"{name:12} {route['zadania']:>8} {route['bledy']:>6} {route['przepustowosc']:>9} {route['p50_ms']:>9} "
+              f"{route['p95_ms']:>9} {route['p99_ms']:>9} {statements:>8}")
+    if 'udzial_nieudanych' in routes.get('add', {}):
+        add = routes['add']
+        print(f"Zamówienia z /rentals/add: udane {add['zamowienia_udane']}, nieudane (brak wolnego auta) "
+              f"{add['zamowienia_nieudane']}, bez zamówienia (błędy) {add['bledy']}")
+
+    report = {
+        'utworzono': datetime.now().isoformat(timespec='seconds'),
+        'konfiguracja': {'mix': args.mix, 'concurrency': args.concurrency, 'duration': args.duration,
+                         'seed': args.seed, 'wypozyczenia': params['rentals']},
+        'trasy': routes,
+    }
+    if args.save:
+        os.makedirs(os.path.dirname(args.save) or '.', exist_ok=True)
+        with open(args.save, 'w', encoding='utf-8') as file:
+            json.dump(report, file, ensure_ascii=False, indent=2)
+        print(f"Zapisano wyniki w {args.save}")
+
+    failed = any(route['bledy'] for route in routes.values())
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as file:
+            baseline = json.load(file)
+        problems = regressions(routes, baseline, args.threshold)
+        for problem in problems:
+            print(f"  REGRESJA {problem}")
+        failed = failed or bool(problems)
+    connection.close()
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
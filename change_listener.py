@@ -0,0 +1,115 @@
+"""
+Odbiór powiadomień o zmianach danych (LISTEN/NOTIFY) w każdym procesie aplikacji.
+
+Wyzwalacze w bazie publikują na kanale `wypozyczalnia_zmiany` obiekt JSON z nazwą zmienionej tabeli
+(a dla wypożyczeń także zmienione wiersze). Wątek w tle utrzymuje osobne połączenie, odbiera powiadomienia
+i przekazuje je funkcji `on_change`, która usuwa zależne wpisy pamięci podręcznej. Powiadomienia wysłane
+w czasie, gdy połączenie było zerwane, przepadają, dlatego po każdym (ponownym) nawiązaniu nasłuchu
+wywoływana jest funkcja `on_reconnect`, która powinna unieważnić całą pamięć procesu.
+"""
+import json
+import os
+import select
+import threading
+import time
+
+CHANNEL = 'wypozyczalnia_zmiany'
+
+
+class ChangeListener:
+    """
+    Wątek nasłuchujący powiadomień o zmianach na osobnym połączeniu psycopg2.
+
+    Attributes:
+        channel (str): Nazwa kanału LISTEN.
+        poll_interval (float): Co ile sekund bezczynności sprawdzane jest, czy połączenie nadal działa.
+        retry_delay (float): Przerwa przed ponownym połączeniem po błędzie.
+        pid (int): Proces, w którym uruchomiono wątek (po `fork` wątek nie istnieje w procesie potomnym).
+        received (int): Liczba odebranych powiadomień.
+        errors (int): Liczba błędów połączenia i obsługi powiadomień.
+        connections (int): Liczba nawiązanych połączeń nasłuchujących.
+    """
+
+    def __init__(self, connect, on_change, on_reconnect=None, channel=CHANNEL, poll_interval=30, retry_delay=5):
+        self.connect = connect
+        self.on_change = on_change
+        self.on_reconnect = on_reconnect
+        self.channel = channel
+        self.poll_interval = poll_interval
+        self.retry_delay = retry_delay
+        self.pid = None
+        self.received = 0
+        self.errors = 0
+        self.connections = 0
+        self.connected = False
+        self.last_notification = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """
+        Uruchamia wątek nasłuchujący w bieżącym procesie.
+        """
+        self.pid = os.getpid()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='change-listener', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def running(self):
+        """
+        Sprawdza, czy wątek działa w bieżącym procesie.
+        """
+        return self.pid == os.getpid() and self._thread is not None and self._thread.is_alive()
+
+    def _run(self):
+        while not self._stop.is_set():
+            connection = None
+            try:
+                connection = self.connect()
+                connection.autocommit = True
+                cursor = connection.cursor()
+                cursor.execute(f"listen {self.channel}")
+                self.connections += 1
+                self.connected = True
+                if self.on_reconnect is not None:
+                    self.on_reconnect()
+                self._listen(connection, cursor)
+            except Exception:
+                self.errors += 1
+            finally:
+                self.connected = False
+                if connection is not None:
+                    try:
+                        connection.close()
+                    except Exception:
+                        pass
+            self._stop.wait(self.retry_delay)
+
+    def _listen(self, connection, cursor):
+        while not self._stop.is_set():
+            if select.select([connection], [], [], self.poll_interval) == ([], [], []):
+                # Brak ruchu: zapytanie ujawnia zerwane połączenie, którego select nie zgłasza.
+                cursor.execute("select 1")
+                continue
+            connection.poll()
+            while connection.notifies:
+                notify = connection.notifies.pop(0)
+                self.received += 1
+                self.last_notification = time.time()
+                try:
+                    self.on_change(json.loads(notify.payload))
+                except Exception:
+                    self.errors += 1
+
+    def stats(self):
+        return {
+            'kanal': self.channel,
+            'polaczony': self.connected and self.running(),
+            'polaczenia': self.connections,
+            'odebrane': self.received,
+            'bledy': self.errors,
+            'ostatnie_powiadomienie': self.last_notification,
+        }
@@ -0,0 +1,160 @@
+"""
+Zbiorczy import aut, klientów i pracowników z plików CSV.
+
+Plik jest przesyłany strumieniowo do tymczasowej tabeli poleceniem `COPY` (wszystkie kolumny jako tekst,
+więc błędne wartości nie przerywają ładowania). Walidacja odbywa się jednym zapytaniem dla całego pliku,
+poprawne wiersze są dołączane do tabeli docelowej jednym `INSERT ... SELECT`, a odrzucone trafiają do
+raportu CSV z numerem wiersza i przyczyną odrzucenia. Cały import wykonywany jest w jednej transakcji.
+"""
+import csv
+import io
+import time
+
+# Dla każdego rodzaju importu: tabela docelowa, kolumny pliku, kolumna unikalna oraz zapytanie
+# walidujące. Zapytanie czyta oczyszczone wiersze pliku ({dane}) i wyznacza kolumnę `blad` (NULL dla poprawnych).
+# Rzutowania tekstu na liczby są chronione wyrażeniem `case`: Postgres nie gwarantuje kolejności warunków
+# połączonych `and`, a w złączeniu haszującym klucz złączenia liczony jest dla każdego wiersza.
+IMPORTS = {
+    'cars': {
+        'tabela': 'wypozyczalnia.auta',
+        'kolumny': ('numer_rejestracyjny', 'rok', 'id_model'),
+        'typy': ('numer_rejestracyjny', 'rok::int', 'id_model::int'),
+        'unikalna': 'numer_rejestracyjny',
+        'walidacja': """
+            select s.*,
+                case
+                    when s.numer_rejestracyjny is null or s.rok is null or s.id_model is null then 'Brak wymaganych danych'
+                    when not wypozyczalnia.poprawny_numer_rejestracyjny(s.numer_rejestracyjny) then 'Niepoprawny numer rejestracyjny'
+                    when s.rok !~ '^\\d{4}$' then 'Niepoprawny rok'
+                    when s.rok::int not between 1900 and extract(year from current_date)::int + 1 then 'Rok spoza zakresu 1900 - przyszły rok'
+                    when m.id_model is null then 'Nie ma modelu o podanym ID'
+                    when a.id_auto is not null then 'Numer rejestracyjny już istnieje'
+                    when row_number() over (partition by s.numer_rejestracyjny order by s.nr) > 1 then 'Numer rejestracyjny powtórzony w pliku'
+                end as blad
+            from {dane} s
+            left join wypozyczalnia.modele m on m.id_model = case when s.id_model ~ '^\\d{1,9}$' then s.id_model::int end
+            left join wypozyczalnia.auta a on a.numer_rejestracyjny = s.numer_rejestracyjny""",
+    },
+    'clients': {
+        'tabela': 'wypozyczalnia.klienci',
+        'kolumny': ('imie', 'nazwisko', 'telefon'),
+        'typy': ('imie', 'nazwisko', 'telefon'),
+        'unikalna': 'telefon',
+        'walidacja': """
+            select s.*,
+                case
+                    when s.imie is null or s.nazwisko is null or s.telefon is null then 'Brak wymaganych danych'
+                    when length(s.imie) > 64 or length(s.nazwisko) > 64 then 'Imię lub nazwisko dłuższe niż 64 znaki'
+                    when not wypozyczalnia.poprawny_numer_telefonu(s.telefon) then 'Niepoprawny numer telefonu'
+                    when k.id_klient is not null then 'Numer telefonu już istnieje'
+                    when row_number() over (partition by s.telefon order by s.nr) > 1 then 'Numer telefonu powtórzony w pliku'
+                end as blad
+            from {dane} s
+            left join wypozyczalnia.klienci k on k.telefon = s.telefon""",
+    },
+    'workers': {
+        'tabela': 'wypozyczalnia.pracownicy',
+        'kolumny': ('imie', 'nazwisko', 'telefon', 'id_rola'),
+        'typy': ('imie', 'nazwisko', 'telefon', 'id_rola::int'),
+        'unikalna': 'telefon',
+        'walidacja': """
+            select s.*,
+                case
+                    when s.imie is null or s.nazwisko is null or s.telefon is null or s.id_rola is null then 'Brak wymaganych danych'
+                    when length(s.imie) > 64 or length(s.nazwisko) > 64 then 'Imię lub nazwisko dłuższe niż 64 znaki'
+                    when not wypozyczalnia.poprawny_numer_telefonu(s.telefon) then 'Niepoprawny numer telefonu'
+                    when r.id_rola is null then 'Nie ma stanowiska o podanym ID'
+                    when p.id_pracownik is not null then 'Numer telefonu już istnieje'
+                    when row_number() over (partition by s.telefon order by s.nr) > 1 then 'Numer telefonu powtórzony w pliku'
+                end as blad
+            from {dane} s
+            left join wypozyczalnia.role r on r.id_rola = case when s.id_rola ~ '^\\d{1,9}$' then s.id_rola::int end
+            left join wypozyczalnia.pracownicy p on p.telefon = s.telefon""",
+    },
+}
+
+
+class CsvImportError(ValueError):
+    """
+    Błąd uniemożliwiający import całego pliku (np. brakujące kolumny lub niepoprawny CSV).
+    """
+
+
+def read_header(stream, columns):
+    """
+    Odczytuje nagłówek pliku i sprawdza, czy zawiera dokładnie oczekiwane kolumny (w dowolnej kolejności).
+
+    Returns:
+        list[str]: Nazwy kolumn w kolejności występowania w pliku.
+
+    Raises:
+        CsvImportError: Gdy brakuje kolumn lub plik zawiera nieznane kolumny.
+    """
+    line = stream.readline()
+    header = [name.strip().lower() for name in next(csv.reader([line]), [])]
+    missing = [name for name in columns if name not in header]
+    unknown = [name for name in header if name not in columns]
+    if missing or unknown or len(set(header)) != len(header):
+        raise CsvImportError(f"Nagłówek pliku musi zawierać kolumny: {', '.join(columns)}.")
+    return header
+
+
+def import_csv(connection, kind, stream, filename=None):
+    """
+    Importuje plik CSV do tabeli wskazanej przez `kind` ('cars', 'clients' lub 'workers').
+
+    Args:
+        connection (connection): Połączenie psycopg2; transakcja jest zatwierdzana przez wywołującego.
+        kind (str): Rodzaj importu, klucz słownika `IMPORTS`.
+        stream (io.TextIOBase): Plik CSV w trybie tekstowym, z nagłówkiem w pierwszym wierszu.
+        filename (str): Nazwa przesłanego pliku zapisywana w historii importów.
+
+    Returns:
+        dict: Podsumowanie importu: id_importu, dodane, odrzucone i czas_s.
+
+    Raises:
+        CsvImportError: Gdy nagłówek lub format pliku są niepoprawne.
+    """
+    spec = IMPORTS[kind]
+    started = time.perf_counter()
+    header = read_header(stream, spec['kolumny'])
+    columns = ', '.join(spec['kolumny'])
+    cursor = connection.cursor()
+    cursor.execute(f"""
+        create temp table import_dane (nr bigint generated always as identity, {', '.join(f'{c} text' for c in spec['kolumny'])})
+        on commit drop""")
+    try:
+        cursor.copy_expert(f"copy import_dane ({', '.join(header)}) from stdin with (format csv)", stream)
+    except Exception as e:
+        raise CsvImportError(f"Niepoprawny format pliku CSV: {(getattr(e, 'pgerror', None) or str(e)).strip()}") from e
+    trimmed = ', '.join(f"nullif(btrim({c}), '') as {c}" for c in spec['kolumny'])
+    validation = spec['walidacja'].replace('{dane}', f"(select nr, {trimmed} from import_dane)")
+    cursor.execute(f"create temp table import_sprawdzone on commit drop as {validation}")
+
+    unique = spec['unikalna']
+    cursor.execute(f"""
+        with dodane as (
+            insert into {spec['tabela']} ({columns})
+            select {', '.join(spec['typy'])} from import_sprawdzone where blad is null order by nr
+            on conflict ({unique}) do nothing
+            returning {unique}
+        )
+        update import_sprawdzone s set blad = 'Rekord dodany równolegle przez innego użytkownika'
+        where s.blad is null and not exists (select 1 from dodane d where d.{unique} = s.{unique})""")
+    cursor.execute("select count(*) filter (where blad is null), count(*) filter (where blad is not null) from import_sprawdzone")
+    added, rejected = cursor.fetchone()
+
+    report = None
+    if rejected:
+        buffer = io.StringIO()
+        cursor.copy_expert(f"""
+            copy (select nr + 1 as wiersz, {columns}, blad from import_sprawdzone where blad is not null order by nr)
+            to stdout with (format csv, header)""", buffer)
+        report = buffer.getvalue()
+    elapsed = time.perf_counter() - started
+    cursor.execute("""
+        insert into wypozyczalnia.importy (rodzaj, plik, dodane, odrzucone, czas_s, raport)
+        values (%s, %s, %s, %s, %s, %s) returning id_importu""", (kind, filename, added, rejected, round(elapsed, 3), report))
+    id_importu = cursor.fetchone()[0]
+    cursor.close()
+    return {'id_importu': id_importu, 'dodane': added, 'odrzucone': rejected, 'czas_s': round(elapsed, 3)}
@@ -0,0 +1,226 @@
+"""
+Indeks dostępności floty przechowywany w pamięci procesu aplikacji.
+
+Odpowiada na to samo pytanie co funkcja `wypozyczalnia.dostepne_auta_w_danym_terminie`, ale bez zapytań
+do bazy: dla każdego auta przechowuje posortowane okresy wypożyczeń, więc sprawdzenie auta to jedno
+wyszukiwanie binarne. Indeks aktualizowany jest przyrostowo przy dodawaniu i usuwaniu wypożyczeń,
+a w całości przebudowywany na żądanie. Gdy migawka jest nieaktualna, aplikacja korzysta z funkcji SQL.
+"""
+import threading
+import time
+from bisect import bisect_right
+from collections import Counter
+from datetime import date, timedelta
+
+
+class CarIntervals:
+    """
+    Okresy wypożyczeń jednego auta posortowane po dacie rozpoczęcia.
+
+    Attributes:
+        starts (list[int]): Daty rozpoczęcia (numery dni, `date.toordinal`).
+        ends (list[int]): Daty zakończenia w kolejności `starts`.
+        max_ends (list[int]): Maksimum `ends` na prefiksie listy; pozwala sprawdzić nakładanie się
+            w czasie O(log n) także wtedy, gdy okresy auta nakładają się na siebie.
+        ids (list[int]): Identyfikatory wypożyczeń w kolejności `starts`.
+    """
+    __slots__ = ('starts', 'ends', 'max_ends', 'ids')
+
+    def __init__(self):
+        self.starts = []
+        self.ends = []
+        self.max_ends = []
+        self.ids = []
+
+    def add(self, id_wypozyczenia, start, end):
+        position = bisect_right(self.starts, start)
+        self.starts.insert(position, start)
+        self.ends.insert(position, end)
+        self.ids.insert(position, id_wypozyczenia)
+        self.max_ends.insert(position, end)
+        self._refresh_max_ends(position)
+
+    def remove(self, id_wypozyczenia):
+        position = self.ids.index(id_wypozyczenia)
+        for values in (self.starts, self.ends, self.ids, self.max_ends):
+            del values[position]
+        self._refresh_max_ends(position)
+
+    def _refresh_max_ends(self, position):
+        current = self.max_ends[position - 1] if position > 0 else None
+        for i in range(position, len(self.ends)):
+            current = self.ends[i] if current is None else max(current, self.ends[i])
+            self.max_ends[i] = current
+
+    def overlaps(self, start, end):
+        """
+        Sprawdza, czy któryś okres [s, e] spełnia s <= end oraz e >= start (jak `okres && daterange(start, end, '[]')`).
+        """
+        count = bisect_right(self.starts, end)
+        return count > 0 and self.max_ends[count - 1] >= start
+
+
+class FleetIndex:
+    """
+    Migawka floty i wypożyczeń pozwalająca wyszukiwać dostępne auta bez odpytywania bazy.
+
+    Migawka jest aktualna, jeśli została zbudowana, nie oznaczono jej jako nieaktualnej
+    i nie jest starsza niż `max_age` sekund. Wypożyczenia kończące się przed `horizon`
+    nie są ładowane, więc zapytania o terminy sprzed horyzontu obsługuje baza.
+
+    Attributes:
+        max_age (int): Maksymalny wiek migawki w sekundach.
+        history_days (int): Liczba dni wstecz od dzisiaj, dla których przechowywane są wypożyczenia.
+        horizon (date): Najwcześniejsza data, o którą można pytać indeks.
+        built_at (float): Znacznik czasu ostatniej przebudowy lub None.
+        build_time (float): Czas trwania ostatniej przebudowy w sekundach.
+    """
+
+    def __init__(self, max_age=300, history_days=30):
+        self.max_age = max_age
+        self.history_days = history_days
+        self.horizon = None
+        self.built_at = None
+        self.build_time = None
+        self._stale = True
+        self._lock = threading.RLock()
+        self._rebuilding = False
+        self._pending = []
+        self._cars = {}
+        self._intervals = {}
+        self._rentals = {}
+
+    def is_fresh(self):
+        with self._lock:
+            return (self.built_at is not None and not self._stale
+                    and time.time() - self.built_at < self.max_age)
+
+    def can_answer(self, start, end):
+        """
+        Sprawdza, czy indeks może odpowiedzieć na zapytanie o dany termin.
+        """
+        return self.is_fresh() and start <= end and start >= self.horizon
+
+    @property
+    def rebuilding(self):
+        return self._rebuilding
+
+    def mark_stale(self):
+        """
+        Oznacza migawkę jako nieaktualną, np. po zmianie aut, modeli, marek lub klas.
+        """
+        with self._lock:
+            self._stale = True
+
+    def rebuild(self, connection):
+        """
+        Wczytuje auta i wypożyczenia z bazy i atomowo podmienia migawkę.
+
+        Zmiany zgłoszone przez `add_rental`/`remove_rental` w trakcie przebudowy są stosowane
+        ponownie po podmianie, więc nie giną.
+
+        Args:
+            connection (connection): Połączenie psycopg2.
+        """
+        with self._lock:
+            if self._rebuilding:
+                return
+            self._rebuilding = True
+            self._pending = []
+        try:
+            started = time.perf_counter()
+            horizon = date.today() - timedelta(days=self.history_days)
+            cursor = connection.cursor()
+            cursor.execute("""
+                select id_auto, nazwa_modelu, nazwa_marki, numer_rejestracyjny, nazwa_klasy
+                from wypozyczalnia.szczegoly_aut""")
+            cars = {row[0]: row for row in cursor.fetchall()}
+            cursor.execute("""
+                select id_wypozyczenia, id_auto, data_wypozyczenia, data_oddania
+                from wypozyczalnia.wypozyczenia
+                where data_oddania >= %s""", (horizon,))
+            intervals = {id_auto: CarIntervals() for id_auto in cars}
+            rentals = {}
+            for id_wypozyczenia, id_auto, start, end in cursor.fetchall():
+                rentals[id_wypozyczenia] = (id_auto, start.toordinal(), end.toordinal())
+            cursor.close()
+            for id_wypozyczenia, (id_auto, start, end) in sorted(rentals.items(), key=lambda item: item[1][1]):
+                intervals.setdefault(id_auto, CarIntervals()).add(id_wypozyczenia, start, end)
+
+            with self._lock:
+                self._cars, self._intervals, self._rentals = cars, intervals, rentals
+                self.horizon = horizon
+                self.built_at = time.time()
+                self.build_time = time.perf_counter() - started
+                self._stale = False
+                self._rebuilding = False
+                pending, self._pending = self._pending, []
+                for change in pending:
+                    change()
+        finally:
+            with self._lock:
+                self._rebuilding = False
+
+    def add_rental(self, id_wypozyczenia, id_auto, start, end):
+        """
+        Dodaje wypożyczenie do migawki. Ponowne dodanie tego samego wypożyczenia nie ma skutku.
+        """
+        with self._lock:
+            if self._rebuilding:
+                self._pending.append(lambda: self.add_rental(id_wypozyczenia, id_auto, start, end))
+            if id_wypozyczenia in self._rentals or (self.horizon and end < self.horizon):
+                return
+            if id_auto not in self._cars:
+                self._stale = True
+                return
+            self._rentals[id_wypozyczenia] = (id_auto, start.toordinal(), end.toordinal())
+            self._intervals.setdefault(id_auto, CarIntervals()).add(id_wypozyczenia, start.toordinal(), end.toordinal())
+
+    def remove_rental(self, id_wypozyczenia):
+        """
+        Usuwa wypożyczenie z migawki. Usunięcie nieznanego wypożyczenia nie ma skutku.
+        """
+        with self._lock:
+            if self._rebuilding:
+                self._pending.append(lambda: self.remove_rental(id_wypozyczenia))
+            rental = self._rentals.pop(id_wypozyczenia, None)
+            if rental is not None:
+                self._intervals[rental[0]].remove(id_wypozyczenia)
+
+    def available(self, start, end):
+        """
+        Zwraca auta wolne w całym terminie [start, end], posortowane po marce, modelu i ID.
+
+        Returns:
+            list[tuple]: Wiersze (id_auto, nazwa_modelu, nazwa_marki, numer_rejestracyjny, nazwa_klasy).
+        """
+        start, end = start.toordinal(), end.toordinal()
+        with self._lock:
+            cars = [car for id_auto, car in self._cars.items()
+                    if not self._intervals[id_auto].overlaps(start, end)]
+        return sorted(cars, key=lambda car: (car[2], car[1], car[0]))
+
+    def summary(self, start, end):
+        """
+        Zwraca te same dane co `wypozyczalnia.podsumuj_auta_dostepne_w_danym_terminie`.
+
+        Returns:
+            tuple: (lista aut, (liczba aut,), [(marka, ilość)], [(marka, model, ilość)]).
+        """
+        cars = self.available(start, end)
+        brands = Counter(car[2] for car in cars)
+        models = Counter((car[2], car[1]) for car in cars)
+        return (cars, (len(cars),), sorted(brands.items()),
+                [(marka, model, ilosc) for (marka, model), ilosc in sorted(models.items())])
+
+    def stats(self):
+        with self._lock:
+            return {
+                'aktualny': self.is_fresh(),
+                'zbudowany': time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(self.built_at)) if self.built_at else None,
+                'wiek_s': round(time.time() - self.built_at, 1) if self.built_at else None,
+                'czas_budowy_s': round(self.build_time, 3) if self.build_time is not None else None,
+                'horyzont': self.horizon.isoformat() if self.horizon else None,
+                'auta': len(self._cars),
+                'wypozyczenia': len(self._rentals),
+            }
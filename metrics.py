@@ -0,0 +1,232 @@
+"""
+Pomiary czasu obsługi żądań i zapytań SQL w podziale na trasy, eksportowane w formacie tekstowym Prometheusa.
+
+Zapytania mierzy `InstrumentedCursor` - klasa kursora psycopg2 ustawiana dla wszystkich połączeń silnika
+(`cursor_factory`), więc objęte są zarówno zapytania ORM, jak i kursory tworzone bezpośrednio na połączeniach
+z `get_db()`. Kursor dopisuje liczbę zapytań, ich czas i liczbę odczytanych wierszy do statystyk bieżącego
+żądania (`begin_request`/`end_request`); zapytania wykonywane poza żądaniem (wątki w tle) nie są liczone.
+
+Statystyki są przechowywane w pamięci procesu, więc przy wielu procesach każdy z nich należy odpytywać osobno
+(np. przez osobny port lub etykietę instancji w konfiguracji Prometheusa).
+"""
+import threading
+import time
+from bisect import bisect_left
+
+from psycopg2.extensions import cursor as _cursor
+
+# Granice przedziałów histogramów (w sekundach i w liczbie zapytań na żądanie).
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+STATEMENT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500)
+
+_current = threading.local()
+
+
+class RequestStats:
+    """
+    Zapytania SQL wykonane w ramach jednego żądania.
+
+    Attributes:
+        statements (int): Liczba wykonanych zapytań.
+        db_time (float): Łączny czas wykonywania zapytań i pobierania wierszy w sekundach.
+        rows (int): Liczba wierszy odczytanych z kursorów.
+    """
+    __slots__ = ('statements', 'db_time', 'rows')
+
+    def __init__(self):
+        self.statements = 0
+        self.db_time = 0.0
+        self.rows = 0
+
+
+def begin_request():
+    """
+    Rozpoczyna zbieranie statystyk zapytań w bieżącym wątku.
+    """
+    _current.stats = RequestStats()
+
+
+def end_request():
+    """
+    Kończy zbieranie statystyk zapytań w bieżącym wątku.
+
+    Returns:
+        RequestStats: Statystyki żądania lub None, jeśli zbieranie nie zostało rozpoczęte.
+    """
+    stats = getattr(_current, 'stats', None)
+    _current.stats = None
+    return stats
+
+
+class InstrumentedCursor(_cursor):
+    """
+    Kursor psycopg2 mierzący zapytania wykonywane w trakcie żądania.
+    """
+
+    def _timed(self, method, *args, statement=True):
+        stats = getattr(_current, 'stats', None)
+        if stats is None:
+            return method(*args)
+        started = time.perf_counter()
+        try:
+            return method(*args)
+        finally:
+            stats.db_time += time.perf_counter() - started
+            if statement:
+                stats.statements += 1
+
+    def execute(self, query, vars=None):
+        return self._timed(super().execute, query, vars)
+
+    def executemany(self, query, vars_list):
+        return self._timed(super().executemany, query, vars_list)
+
+    def callproc(self, procname, parameters=None):
+        return self._timed(super().callproc, procname, parameters)
+
+    def copy_expert(self, sql, file, size=8192):
+        return self._timed(super().copy_expert, sql, file, size)
+
+    def _count_rows(self, rows):
+        stats = getattr(_current, 'stats', None)
+        if stats is not None:
+            stats.rows += rows
+
+    # Pobieranie wierszy również jest mierzone: dla kursorów nazwanych to ono wykonuje właściwą pracę w bazie.
+    def fetchone(self):
+        row = self._timed(super().fetchone, statement=False)
+        self._count_rows(row is not None)
+        return row
+
+    def fetchmany(self, size=None):
+        rows = self._timed(super().fetchmany, self.arraysize if size is None else size, statement=False)
+        self._count_rows(len(rows))
+        return rows
+
+    def fetchall(self):
+        rows = self._timed(super().fetchall, statement=False)
+        self._count_rows(len(rows))
+        return rows
+
+    def __iter__(self):
+        while True:
+            rows = self.fetchmany(self.itersize if self.name else self.arraysize)
+            if not rows:
+                return
+            yield from rows
+
+
+def _labels(**labels):
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for value in labels.values())
+    return '{' + ','.join(f'{name}="{value}"' for name, value in zip(labels, escaped)) + '}'
+
+
+def _format_bound(bound):
+    return repr(float(bound)) if isinstance(bound, float) else str(bound)
+
+
+class Histogram:
+    """
+    Histogram w rozumieniu Prometheusa: liczności przedziałów, suma i liczba obserwacji.
+    """
+    __slots__ = ('buckets', 'counts', 'sum', 'count')
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def lines(self, name, **labels):
+        cumulative = 0
+        for bound, count in zip(self.buckets + ('+Inf',), self.counts):
+            cumulative += count
+            le = bound if bound == '+Inf' else _format_bound(bound)
+            yield f"{name}_bucket{_labels(**labels, le=le)} {cumulative}"
+        yield f"{name}_sum{_labels(**labels)} {self.sum}"
+        yield f"{name}_count{_labels(**labels)} {self.count}"
+
+
+class RouteMetrics:
+    """
+    Statystyki żądań w podziale na trasy (nazwy widoków Flask, nie adresy, aby liczba serii była ograniczona).
+    """
+
+    def __init__(self, latency_buckets=LATENCY_BUCKETS, statement_buckets=STATEMENT_BUCKETS):
+        self.latency_buckets = tuple(latency_buckets)
+        self.statement_buckets = tuple(statement_buckets)
+        self._requests = {}
+        self._latency = {}
+        self._statements = {}
+        self._db = {}
+        self._lock = threading.Lock()
+
+    def record(self, endpoint, method, status, duration, stats=None):
+        """
+        Zapisuje obsłużone żądanie.
+
+        Args:
+            endpoint (str): Nazwa widoku.
+            method (str): Metoda HTTP.
+            status (int): Kod odpowiedzi.
+            duration (float): Czas obsługi w sekundach.
+            stats (RequestStats): Zapytania SQL wykonane w trakcie żądania.
+        """
+        stats = stats or RequestStats()
+        with self._lock:
+            key = (endpoint, method, status)
+            self._requests[key] = self._requests.get(key, 0) + 1
+            if endpoint not in self._latency:
+                self._latency[endpoint] = Histogram(self.latency_buckets)
+                self._statements[endpoint] = Histogram(self.statement_buckets)
+                self._db[endpoint] = [0.0, 0]
+            self._latency[endpoint].observe(duration)
+            self._statements[endpoint].observe(stats.statements)
+            self._db[endpoint][0] += stats.db_time
+            self._db[endpoint][1] += stats.rows
+
+    def render(self, prefix='wypozyczalnia'):
+        """
+        Zwraca statystyki w formacie tekstowym Prometheusa (wersja 0.0.4).
+        """
+        with self._lock:
+            lines = [
+                f"# HELP {prefix}_http_requests_total Liczba obsłużonych żądań.",
+                f"# TYPE {prefix}_http_requests_total counter",
+            ]
+            for (endpoint, method, status), count in sorted(self._requests.items()):
+                lines.append(f"{prefix}_http_requests_total{_labels(endpoint=endpoint, method=method, status=status)} {count}")
+
+            lines += [
+                f"# HELP {prefix}_http_request_duration_seconds Czas obsługi żądania.",
+                f"# TYPE {prefix}_http_request_duration_seconds histogram",
+            ]
+            for endpoint, histogram in sorted(self._latency.items()):
+                lines.extend(histogram.lines(f"{prefix}_http_request_duration_seconds", endpoint=endpoint))
+
+            lines += [
+                f"# HELP {prefix}_sql_statements_per_request Liczba zapytań SQL wykonanych w trakcie jednego żądania.",
+                f"# TYPE {prefix}_sql_statements_per_request histogram",
+            ]
+            for endpoint, histogram in sorted(self._statements.items()):
+                lines.extend(histogram.lines(f"{prefix}_sql_statements_per_request", endpoint=endpoint))
+
+            lines += [
+                f"# HELP {prefix}_sql_duration_seconds_total Łączny czas zapytań SQL (wykonanie i pobieranie wierszy).",
+                f"# TYPE {prefix}_sql_duration_seconds_total counter",
+            ]
+            for endpoint, (db_time, _) in sorted(self._db.items()):
+                lines.append(f"{prefix}_sql_duration_seconds_total{_labels(endpoint=endpoint)} {db_time}")
+
+            lines += [
+                f"# HELP {prefix}_sql_rows_total Liczba wierszy odczytanych z bazy.",
+                f"# TYPE {prefix}_sql_rows_total counter",
+            ]
+            for endpoint, (_, rows) in sorted(self._db.items()):
+                lines.append(f"{prefix}_sql_rows_total{_labels(endpoint=endpoint)} {rows}")
+        return '\n'.join(lines) + '\n'
@@ -0,0 +1,170 @@
+"""
+Wykrywanie problemu N+1 zapytań w trybie deweloperskim i w testach.
+
+Dla każdego żądania (lub bloku `capture()`) liczone są zapytania SQL o identycznej treści wykonywane z różnymi
+parametrami oraz leniwe ładowania relacji ORM. Gdy to samo zapytanie powtórzy się `threshold` razy, audyt
+zapisuje ostrzeżenie ze stosem wywołań miejsca, które je wykonało (tryb 'warn'), albo zgłasza `QueryAuditError`
+(tryb 'raise'), co przerywa żądanie i oblewa test.
+
+Zapytania przechwytuje `AuditedCursor` (kursor psycopg2 ustawiany zawsze jako `cursor_factory`), więc objęte
+są zarówno zapytania ORM, jak i kursory tworzone na połączeniach z `get_db()`. W trybie 'off' żądania nie są
+audytowane, ale `capture()` nadal zlicza zapytania (bez ostrzeżeń i błędów).
+"""
+import logging
+import threading
+import traceback
+from collections import Counter
+from contextlib import contextmanager
+
+from sqlalchemy import event
+
+from metrics import InstrumentedCursor
+
+logger = logging.getLogger(__name__)
+
+MODES = ('off', 'warn', 'raise')
+# Zapytanie, którym pula (`pool_pre_ping`) sprawdza połączenie przy pobraniu; nie jest zapytaniem widoku.
+PING_STATEMENT = 'SELECT 1'
+
+
+class QueryAuditError(RuntimeError):
+    """
+    Zgłaszany w trybie 'raise', gdy to samo zapytanie powtórzy się zbyt wiele razy w jednym żądaniu.
+    """
+
+
+class QueryReport:
+    """
+    Zapytania wykonane w jednym żądaniu lub bloku `capture()`.
+
+    Attributes:
+        statements (Counter): Liczba wykonań każdej treści zapytania.
+        lazy_loads (Counter): Liczba leniwych ładowań w postaci 'Klasa -> Klasa docelowa'.
+        flagged (list[str]): Zapytania, które przekroczyły próg powtórzeń.
+    """
+
+    def __init__(self):
+        self.statements = Counter()
+        self.lazy_loads = Counter()
+        self.flagged = []
+
+    @property
+    def total(self):
+        return sum(self.statements.values())
+
+    @property
+    def repeated(self):
+        """
+        Zapytania wykonane więcej niż raz, od najczęstszych.
+        """
+        return [(statement, count) for statement, count in self.statements.most_common() if count > 1]
+
+
+class QueryAudit:
+    """
+    Licznik zapytań bieżącego wątku z progiem wykrywania powtórzeń.
+
+    Attributes:
+        mode (str): 'off', 'warn' lub 'raise'.
+        threshold (int): Liczba wykonań tego samego zapytania, od której zgłaszany jest problem N+1.
+    """
+
+    def __init__(self, mode='off', threshold=5):
+        self._current = threading.local()
+        self.configure(mode, threshold)
+
+    def configure(self, mode, threshold=5):
+        """
+        Ustawia tryb i próg audytu.
+
+        Raises:
+            ValueError: Gdy tryb jest nieznany.
+        """
+        if mode not in MODES:
+            raise ValueError(f"Nieznany tryb audytu zapytań: {mode}. Dostępne: {', '.join(MODES)}.")
+        self.mode = mode
+        self.threshold = threshold
+
+    @property
+    def enabled(self):
+        return self.mode != 'off'
+
+    def begin(self):
+        # Żądanie wykonywane wewnątrz bloku `capture()` (klient testowy) dopisuje zapytania do jego raportu.
+        if getattr(self._current, 'report', None) is None:
+            self._current.report = QueryReport()
+
+    def end(self):
+        report = getattr(self._current, 'report', None)
+        self._current.report = None
+        return report
+
+    @contextmanager
+    def capture(self):
+        """
+        Zlicza zapytania wykonane w bloku, np. aby w teście sprawdzić, że widok wykonuje stałą liczbę zapytań.
+
+        Yields:
+            QueryReport: Raport uzupełniany w trakcie wykonywania bloku.
+        """
+        previous = getattr(self._current, 'report', None)
+        report = self._current.report = QueryReport()
+        try:
+            yield report
+        finally:
+            self._current.report = previous
+
+    def statement(self, sql):
+        """
+        Rejestruje wykonanie zapytania; wywoływane przez `AuditedCursor`.
+        """
+        report = getattr(self._current, 'report', None)
+        if report is None:
+            return
+        text = sql.decode() if isinstance(sql, bytes) else str(sql)
+        if text == PING_STATEMENT:
+            return
+        report.statements[text] += 1
+        if self.mode != 'off' and report.statements[text] == self.threshold:
+            report.flagged.append(text)
+            message = (f"Możliwy problem N+1: zapytanie wykonane {self.threshold} razy w jednym żądaniu "
+                       f"z różnymi parametrami:\n{text.strip()}")
+            if self.mode == 'raise':
+                raise QueryAuditError(message)
+            logger.warning("%s\n%s", message, ''.join(traceback.format_stack(limit=25)[:-2]))
+
+    def lazy_load(self, orm_execute_state):
+        """
+        Rejestruje leniwe ładowanie relacji; wywoływane przez zdarzenie sesji `do_orm_execute`.
+        """
+        report = getattr(self._current, 'report', None)
+        source = orm_execute_state.lazy_loaded_from
+        # Ładowania zachłanne (np. selectinload) też są ładowaniami relacji, ale nie mają obiektu źródłowego.
+        if report is None or source is None:
+            return
+        target = ', '.join(mapper.class_.__name__ for mapper in orm_execute_state.all_mappers)
+        report.lazy_loads[f"{source.class_.__name__} -> {target}"] += 1
+
+    def install(self, session):
+        """
+        Podłącza rejestrowanie leniwych ładowań do sesji (lub `scoped_session`) SQLAlchemy.
+        """
+        event.listen(session, 'do_orm_execute', self.lazy_load)
+
+
+# Wspólny audyt procesu, z którego korzysta `AuditedCursor`; konfigurowany przez aplikację (`configure`).
+query_audit = QueryAudit()
+
+
+class AuditedCursor(InstrumentedCursor):
+    """
+    Kursor mierzący zapytania (`InstrumentedCursor`) i przekazujący ich treść do audytu N+1.
+    """
+
+    def execute(self, query, vars=None):
+        query_audit.statement(query)
+        return super().execute(query, vars)
+
+    def executemany(self, query, vars_list):
+        query_audit.statement(query)
+        return super().executemany(query, vars_list)
@@ -0,0 +1,118 @@
+"""
+Pamięć podręczna danych słownikowych (marki, modele, klasy, cennik, stanowiska) w procesie aplikacji.
+
+Każdy wpis jest oznaczony tabelami, z których pochodzi. Trasy zmieniające te tabele wywołują
+`invalidate(...)`, co usuwa wszystkie zależne wpisy. Niezależnie od tego wpisy wygasają po `ttl`
+sekundach (zmiany wprowadzone poza aplikacją), a liczba wpisów jest ograniczona do `max_entries`
+(usuwane są najdawniej używane).
+"""
+import threading
+import time
+from collections import OrderedDict
+
+
+class ReferenceCache:
+    """
+    Ograniczona pamięć podręczna LRU z czasem życia wpisów i unieważnianiem po tabelach.
+
+    Attributes:
+        max_entries (int): Maksymalna liczba wpisów.
+        ttl (float): Czas życia wpisu w sekundach; 0 wyłącza pamięć podręczną.
+        hits (int): Liczba odczytów obsłużonych z pamięci.
+        misses (int): Liczba odczytów wymagających załadowania danych.
+        expirations (int): Liczba wpisów usuniętych po upływie `ttl`.
+        evictions (int): Liczba wpisów usuniętych z powodu limitu rozmiaru.
+        invalidations (int): Liczba wpisów usuniętych przez `invalidate`.
+    """
+
+    def __init__(self, max_entries=256, ttl=300):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.expirations = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self._entries = OrderedDict()
+        self._generations = {}
+        self._epoch = 0
+        self._lock = threading.Lock()
+
+    def get_or_load(self, key, tables, loader):
+        """
+        Zwraca wartość z pamięci lub ładuje ją funkcją `loader` i zapamiętuje.
+
+        Wartość załadowana w trakcie unieważniania którejś z jej tabel nie jest zapamiętywana,
+        więc równoległa zmiana danych nie zostanie przykryta nieaktualnym wynikiem.
+
+        Args:
+            key (Hashable): Klucz wpisu.
+            tables (tuple[str]): Tabele, z których pochodzą dane.
+            loader (Callable): Funkcja bez argumentów ładująca dane.
+        """
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, expires_at, _ = entry
+                if expires_at > now:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._entries[key]
+                self.expirations += 1
+            self.misses += 1
+            generations = self._snapshot(tables)
+
+        value = loader()
+        if self.ttl <= 0:
+            return value
+
+        with self._lock:
+            if generations == self._snapshot(tables):
+                self._entries[key] = (value, time.monotonic() + self.ttl, tuple(tables))
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+                    self.evictions += 1
+        return value
+
+    def _snapshot(self, tables):
+        return self._epoch, [self._generations.get(table, 0) for table in tables]
+
+    def invalidate(self, *tables):
+        """
+        Usuwa wpisy zależne od którejkolwiek z podanych tabel.
+        """
+        with self._lock:
+            for table in tables:
+                self._generations[table] = self._generations.get(table, 0) + 1
+            stale = [key for key, (_, _, entry_tables) in self._entries.items()
+                     if any(table in entry_tables for table in tables)]
+            for key in stale:
+                del self._entries[key]
+            self.invalidations += len(stale)
+
+    def clear(self):
+        """
+        Usuwa wszystkie wpisy.
+        """
+        with self._lock:
+            self._epoch += 1
+            self.invalidations += len(self._entries)
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            requests = self.hits + self.misses
+            return {
+                'wpisy': len(self._entries),
+                'limit': self.max_entries,
+                'ttl_s': self.ttl,
+                'trafienia': self.hits,
+                'chybienia': self.misses,
+                'skutecznosc': round(self.hits / requests, 3) if requests else None,
+                'wygasniecia': self.expirations,
+                'usuniecia_lru': self.evictions,
+                'uniewaznienia': self.invalidations,
+            }
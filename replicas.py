@@ -0,0 +1,139 @@
+"""
+Rozdzielanie odczytów między repliki bazy danych.
+
+Trasy tylko do odczytu (listy, raporty, API) wykonują zapytania na jednej z replik wybieranej po kolei
+(round-robin), a pozostałe - na serwerze głównym. Stan replik sprawdzany jest leniwie przy wyborze:
+zdrowa replika co `check_interval` sekund, niedostępna co `retry_interval` sekund. Sprawdzenie wykonuje
+jedno z żądań (pozostałe korzystają w tym czasie z ostatniego wyniku); replika, która przestała odpowiadać
+lub nie jest w trybie odtwarzania (np. po awansie na serwer główny), jest pomijana do następnego sprawdzenia.
+Replika jest też oznaczana jako niedostępna od razu, gdy jej silnik zgłosi zerwanie połączenia w trakcie żądania.
+Gdy żadna replika nie jest dostępna, odczyty wracają na serwer główny.
+"""
+import threading
+import time
+
+from sqlalchemy import event, text
+
+
+class Replica:
+    """
+    Jedna replika: silnik SQLAlchemy i wynik ostatniego sprawdzenia.
+
+    Attributes:
+        engine (Engine): Silnik z własną pulą połączeń.
+        healthy (bool): Czy replika odpowiadała przy ostatnim sprawdzeniu.
+        checked_at (float): Czas ostatniego sprawdzenia (`time.monotonic`) lub None.
+        selected (int): Liczba żądań skierowanych do repliki.
+        failures (int): Liczba nieudanych sprawdzeń.
+        last_error (str): Ostatni błąd sprawdzenia.
+    """
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.healthy = True
+        self.checked_at = None
+        self.selected = 0
+        self.failures = 0
+        self.last_error = None
+        self._checking = threading.Lock()
+
+    @property
+    def name(self):
+        return self.engine.url.render_as_string(hide_password=True)
+
+
+class ReplicaSet:
+    """
+    Repliki wybierane po kolei z pominięciem niedostępnych.
+
+    Attributes:
+        replicas (list[Replica]): Repliki w kolejności z konfiguracji.
+        check_interval (float): Co ile sekund sprawdzana jest zdrowa replika.
+        retry_interval (float): Co ile sekund ponawiane jest sprawdzenie niedostępnej repliki.
+    """
+
+    def __init__(self, engines, check_interval=10, retry_interval=30):
+        self.replicas = [Replica(engine) for engine in engines]
+        for replica in self.replicas:
+            event.listen(replica.engine, 'handle_error', self._error_handler(replica))
+        self.check_interval = check_interval
+        self.retry_interval = retry_interval
+        self.fallbacks = 0
+        self._position = 0
+        self._lock = threading.Lock()
+
+    def choose(self):
+        """
+        Zwraca silnik kolejnej dostępnej repliki.
+
+        Returns:
+            Engine: Silnik repliki lub None, gdy żadna nie jest dostępna (odczyt należy wykonać na serwerze głównym).
+        """
+        with self._lock:
+            start = self._position
+            self._position = (self._position + 1) % len(self.replicas)
+        for offset in range(len(self.replicas)):
+            replica = self.replicas[(start + offset) % len(self.replicas)]
+            self._check_if_due(replica)
+            if replica.healthy:
+                replica.selected += 1
+                return replica.engine
+        self.fallbacks += 1
+        return None
+
+    def _check_if_due(self, replica):
+        interval = self.check_interval if replica.healthy else self.retry_interval
+        if replica.checked_at is not None and time.monotonic() - replica.checked_at < interval:
+            return
+        # Sprawdza tylko jeden wątek; pozostałe nie czekają i korzystają z poprzedniego wyniku.
+        if not replica._checking.acquire(blocking=False):
+            return
+        try:
+            self.check(replica)
+        finally:
+            replica._checking.release()
+
+    def _error_handler(self, replica):
+        def handle_error(context):
+            if context.is_disconnect:
+                replica.healthy = False
+                replica.failures += 1
+                replica.last_error = str(context.original_exception).strip()
+                replica.checked_at = time.monotonic()
+        return handle_error
+
+    def check(self, replica):
+        """
+        Sprawdza, czy replika odpowiada i nadal odtwarza zmiany z serwera głównego.
+        """
+        try:
+            with replica.engine.connect() as connection:
+                in_recovery = connection.execute(text("select pg_is_in_recovery()")).scalar()
+            replica.healthy = bool(in_recovery)
+            if not in_recovery:
+                replica.failures += 1
+                replica.last_error = "Serwer nie jest repliką (pg_is_in_recovery() = false)."
+        except Exception as e:
+            replica.healthy = False
+            replica.failures += 1
+            replica.last_error = str(e).strip()
+        replica.checked_at = time.monotonic()
+
+    def stats(self):
+        """
+        Zwraca stan replik.
+
+        Returns:
+            dict: Liczba odczytów skierowanych na serwer główny z braku replik oraz stan i pula każdej repliki.
+        """
+        return {
+            'odczyty_na_glownym': self.fallbacks,
+            'repliki': [{
+                'adres': replica.name,
+                'dostepna': replica.healthy,
+                'zadania': replica.selected,
+                'bledy_sprawdzenia': replica.failures,
+                'ostatni_blad': replica.last_error,
+                'pula': replica.engine.pool.stats() if hasattr(replica.engine.pool, 'stats') else None,
+            } for replica in self.replicas],
+        }
@@ -0,0 +1,86 @@
+"""
+Okresowe scalanie zmian podsumowań przychodów w każdym procesie aplikacji.
+
+Wyzwalacz na płatnościach dopisuje zmiany do `przychody_klas_zmiany`, a raporty sumują podsumowania
+z nie scalonymi jeszcze zmianami. Wątek w tle co `interval` sekund wywołuje funkcję `merge`
+(`wypozyczalnia.scal_przychody()`), dzięki czemu liczba zmian czytanych przez raport zależy od liczby
+płatności z ostatniego okresu, a nie od całej historii. Równoległe scalenia z wielu procesów się nie
+dublują: funkcja w bazie pomija scalanie, gdy trwa już inne.
+"""
+import os
+import threading
+import time
+
+
+class RevenueMerger:
+    """
+    Wątek okresowo scalający zmiany podsumowań przychodów.
+
+    Attributes:
+        interval (float): Co ile sekund wykonywane jest scalanie.
+        pid (int): Proces, w którym uruchomiono wątek (po `fork` wątek nie istnieje w procesie potomnym).
+        runs (int): Liczba wykonanych scaleń.
+        merged (int): Łączna liczba scalonych wierszy zmian.
+        errors (int): Liczba nieudanych scaleń.
+        last_run (float): Czas ostatniego udanego scalenia.
+    """
+
+    def __init__(self, merge, interval=60):
+        self.merge = merge
+        self.interval = interval
+        self.pid = None
+        self.runs = 0
+        self.merged = 0
+        self.errors = 0
+        self.last_run = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """
+        Uruchamia wątek scalający w bieżącym procesie.
+        """
+        self.pid = os.getpid()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='revenue-merger', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def running(self):
+        """
+        Sprawdza, czy wątek działa w bieżącym procesie.
+        """
+        return self.pid == os.getpid() and self._thread is not None and self._thread.is_alive()
+
+    def run_once(self):
+        """
+        Scala zmiany od razu.
+
+        Returns:
+            int: Liczba scalonych wierszy zmian (0, gdy błąd lub scalanie trwało w innym procesie).
+        """
+        try:
+            merged = self.merge()
+        except Exception:
+            self.errors += 1
+            return 0
+        self.runs += 1
+        self.merged += merged
+        self.last_run = time.time()
+        return merged
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.run_once()
+
+    def stats(self):
+        return {
+            'interwal_s': self.interval,
+            'dziala': self.running(),
+            'scalenia': self.runs,
+            'scalone_zmiany': self.merged,
+            'bledy': self.errors,
+            'ostatnie_scalenie': self.last_run,
+        }
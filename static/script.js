@@ -1,16 +1,34 @@
+let catalog = null;
+
+function loadCatalog(url){
+    // Katalog marek i modeli jest pobierany raz na stronę; adres zawiera wersję katalogu,
+    // więc przeglądarka odczytuje go z pamięci podręcznej, dopóki dane się nie zmienią.
+    if(!catalog){
+        catalog = fetch(url)
+            .then(response => {
+                if(!response.ok) throw new Error(`HTTP ${response.status}`);
+                return response.json();
+            })
+            .then(data => new Map(data.marki.map(([id_marka, nazwa_marki, modele]) => [String(id_marka), modele])));
+        catalog.catch(() => { catalog = null; });
+    }
+    return catalog;
+}
+
 async function fetchModels(ID){
     try{
-        const response = await fetch(`/get_models/${ID}`);
-        const data = await response.json();
-        document.getElementById('rental_model_id').innerHTML = '<option value="" disabled selected>Wybierz model</option>';
+        const url = document.getElementById('rental_brand_id').dataset.catalogUrl || '/catalog/models';
+        const models = (await loadCatalog(url)).get(String(ID)) || [];
+        const select = document.getElementById('rental_model_id');
+        select.innerHTML = '<option value="" disabled selected>Wybierz model</option>';
 
-        data.forEach(elem=> {
+        models.forEach(([id_model, nazwa_modelu]) => {
             const option = document.createElement('option');
-            option.value = elem.id_model;
-            option.textContent = elem.nazwa_model;
-            document.getElementById('rental_model_id').appendChild(option)
+            option.value = id_model;
+            option.textContent = nazwa_modelu;
+            select.appendChild(option)
         });
-        document.getElementById('rental_model_id').disabled = false
+        select.disabled = false
     }
     catch(error){
         console.error("Blad podczas pobierania marek", error);
@@ -23,6 +41,7 @@ async function fetchModels(ID){
 
 if(document.getElementById('rental_brand_id'))
 {
+    loadCatalog(document.getElementById('rental_brand_id').dataset.catalogUrl || '/catalog/models').catch(() => {});
     document.getElementById('rental_brand_id').addEventListener('change', function (){
         const brand_id = this.value;
         fetchModels(brand_id)
@@ -35,6 +54,30 @@ document.getElementsByClassName("close")[0].onclick =  function closeDialog(){
 }
 }
 
+let clientSearchTimer = null;
+let clientSearchRequest = null;
+
+async function searchClients(query){
+    // Przerywa poprzednie zapytanie, aby wolniejsza odpowiedź nie nadpisała nowszych podpowiedzi.
+    if(clientSearchRequest) clientSearchRequest.abort();
+    clientSearchRequest = new AbortController();
+    try{
+        const response = await fetch(`/clients/search?q=${encodeURIComponent(query)}`, {signal: clientSearchRequest.signal});
+        const clients = await response.json();
+        const datalist = document.getElementById('clients');
+        datalist.innerHTML = '';
+        clients.forEach(client => {
+            const option = document.createElement('option');
+            option.value = `${client.imie} ${client.nazwisko}, ${client.telefon}`;
+            option.setAttribute('data-id', client.id_klient);
+            datalist.appendChild(option);
+        });
+    }
+    catch(error){
+        if(error.name !== 'AbortError') console.error("Blad podczas wyszukiwania klientow", error);
+    }
+}
+
 if(document.getElementById('clientInput')){
 document.getElementById('clientInput').addEventListener('input', function () {
     const inputValue = this.value; // Wartość wpisana przez użytkownika
@@ -46,10 +89,10 @@ document.getElementById('clientInput').addEventListener('input', function () {
         document.getElementById('clientId').value = clientId; // Ustawienie ukrytego pola
     } else {
         document.getElementById('clientId').value = ''; // Wyczyść, jeśli brak dopasowania
+        clearTimeout(clientSearchTimer);
+        if (inputValue.trim().length >= 2) {
+            clientSearchTimer = setTimeout(() => searchClients(inputValue.trim()), 250);
+        }
     }
 });
 }
-
-
-
-
@@ -0,0 +1,27 @@
+import os
+
+import pytest
+from dotenv import load_dotenv
+from sqlalchemy.exc import OperationalError
+
+
+@pytest.fixture(scope='session')
+def app():
+    load_dotenv()
+    if not os.getenv('DATABASE_URL'):
+        pytest.skip("Testy widoków wymagają bazy danych (DATABASE_URL).")
+    # Testy scalają zmiany przychodów same; wątek w tle zmieniałby liczbę zmian w trakcie testu.
+    os.environ['REVENUE_MERGE_ENABLED'] = '0'
+    from app import app, db
+    with app.app_context():
+        try:
+            db.engine.connect().close()
+        except OperationalError as e:
+            pytest.skip(f"Baza danych niedostępna: {e}")
+    app.config['TESTING'] = True
+    return app
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
@@ -0,0 +1,75 @@
+"""
+Stronicowanie kluczem (`KeysetPage`) po kolumnie dopuszczającej NULL i filtrowanie tekstem ze znakami LIKE.
+"""
+import pytest
+
+NULL_PAYMENTS = 3
+
+
+@pytest.fixture
+def null_amounts(app):
+    """
+    Ustawia NULL jako kwotę kilku płatności (jak dla klasy bez stawki w cenniku) i przywraca kwoty po teście.
+    """
+    from app import db
+    with app.app_context():
+        connection = db.engine.raw_connection()
+    cursor = connection.cursor()
+    cursor.execute("""
+        select id_wypozyczenia, kwota from wypozyczalnia.platnosci
+        where kwota is not null order by id_platnosc desc limit %s""", (NULL_PAYMENTS,))
+    saved = cursor.fetchall()
+    cursor.execute("update wypozyczalnia.platnosci set kwota = null where id_wypozyczenia = any(%s)",
+                   ([row[0] for row in saved],))
+    connection.commit()
+    yield
+    cursor.executemany("update wypozyczalnia.platnosci set kwota = %s where id_wypozyczenia = %s",
+                       [(kwota, id_wypozyczenia) for id_wypozyczenia, kwota in saved])
+    connection.commit()
+    connection.close()
+
+
+def walk(client, params, key, cursor=None):
+    """
+    Przechodzi strony kursorami `nastepna` (key='after') lub `poprzednia` (key='before').
+
+    Returns:
+        tuple: (wiersze wszystkich stron w kolejności sortowania, odpowiedź z ostatnio pobraną stroną)
+    """
+    rows = []
+    while True:
+        response = client.get('/api/v1/payments', query_string=dict(params, **({key: cursor} if cursor else {})))
+        assert response.status_code == 200
+        body = response.get_json()
+        assert body['dane'], "strona za kursorem nie może być pusta"
+        rows = rows + body['dane'] if key == 'after' else body['dane'] + rows
+        cursor = body['nastepna' if key == 'after' else 'poprzednia']
+        if cursor is None:
+            return rows, body
+
+
+def ascending_key(row):
+    # Porządek PostgreSQL przy sortowaniu rosnącym: NULL na końcu, remisy wg id.
+    return row['kwota'] is None, float(row['kwota'] or 0), row['id']
+
+
+@pytest.mark.parametrize('direction', ['asc', 'desc'])
+def test_nullable_sort_column_pages_through_every_row(client, null_amounts, direction):
+    params = {'sort': 'kwota', 'dir': direction, 'limit': 4}
+    everything = client.get('/api/v1/payments', query_string=dict(params, limit=500)).get_json()['dane']
+    assert sum(row['kwota'] is None for row in everything) == NULL_PAYMENTS
+    assert everything == sorted(everything, key=ascending_key, reverse=direction == 'desc')
+
+    rows, last = walk(client, params, 'after')
+    assert rows == everything
+
+    # Od ostatniej strony kursory `poprzednia` prowadzą przez wszystkie wcześniejsze wiersze.
+    earlier, _ = walk(client, params, 'before', last['poprzednia'])
+    assert earlier + last['dane'] == everything
+
+
+def test_text_filter_treats_like_wildcards_literally(client):
+    assert client.get('/api/v1/clients', query_string={'limit': 500}).get_json()['dane']
+    for wildcard in ('%', '_'):
+        response = client.get('/api/v1/clients', query_string={'filter': 'nazwisko', 'q': wildcard})
+        assert response.get_json()['dane'] == []
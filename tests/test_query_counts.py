@@ -0,0 +1,46 @@
+"""
+Widoki list wykonują stałą liczbę zapytań niezależnie od liczby wierszy (brak problemu N+1).
+"""
+import pytest
+
+from query_audit import query_audit
+
+
+def count_queries(client, url):
+    client.get(url)  # rozgrzanie pamięci podręcznej danych słownikowych
+    with query_audit.capture() as report:
+        response = client.get(url)
+    assert response.status_code == 200
+    return report
+
+
+@pytest.mark.parametrize('url, expected', [
+    ('/cars', 1),
+    ('/rentals', 1),
+    ('/orders', 1),
+    ('/data?context=cars', 0),
+    ('/data?context=rentals', 0),
+    ('/data?context=workers', 0),
+])
+def test_list_view_runs_fixed_number_of_queries(client, url, expected):
+    report = count_queries(client, url)
+    assert report.total == expected, report.statements
+    assert not report.lazy_loads
+    assert not report.repeated
+
+
+@pytest.mark.parametrize('url', ['/cars', '/rentals', '/orders'])
+def test_query_count_does_not_grow_with_page_size(client, url):
+    small = count_queries(client, f"{url}?limit=5")
+    large = count_queries(client, f"{url}?limit=100")
+    assert small.total == large.total
+    assert not large.lazy_loads
+
+
+def test_data_view_loads_each_reference_table_once(client):
+    from app import reference_cache
+    reference_cache.clear()
+    with query_audit.capture() as report:
+        assert client.get('/data?context=cars').status_code == 200
+    assert report.total == 2, report.statements  # modele i marki
+    assert not report.repeated
@@ -0,0 +1,39 @@
+"""
+Scalanie zmian podsumowań przychodów (`scal_przychody`) nie zmienia raportów i opróżnia tabelę zmian.
+"""
+
+
+def query(sql):
+    from app import db
+    connection = db.engine.raw_connection()
+    try:
+        cursor = connection.cursor()
+        cursor.execute(sql)
+        rows = cursor.fetchall() if cursor.description else None
+        connection.commit()
+        return rows
+    finally:
+        connection.close()
+
+
+def reports():
+    return (query("select * from wypozyczalnia.raport_finansowy"),
+            query("select * from wypozyczalnia.przychody_na_klasy_aut()"),
+            query("select * from wypozyczalnia.przychody_na_klasy_aut_miesiecznie()"))
+
+
+def test_merge_keeps_reports_and_empties_changes(app):
+    from app import merge_revenue
+    with app.app_context():
+        merge_revenue()
+        before = reports()
+        payment = query("select min(id_wypozyczenia) from wypozyczalnia.platnosci where kwota is not null")[0][0]
+        # Zmiana kwoty i jej cofnięcie dopisują cztery wiersze zmian, które się znoszą.
+        query(f"update wypozyczalnia.platnosci set kwota = kwota + 1 where id_wypozyczenia = {payment}")
+        query(f"update wypozyczalnia.platnosci set kwota = kwota - 1 where id_wypozyczenia = {payment}")
+        assert query("select count(*) from wypozyczalnia.przychody_klas_zmiany") == [(4,)]
+        assert reports() == before
+
+        assert merge_revenue() == 4
+        assert query("select count(*) from wypozyczalnia.przychody_klas_zmiany") == [(0,)]
+        assert reports() == before
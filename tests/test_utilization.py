@@ -0,0 +1,101 @@
+"""
+Obliczenia wykorzystania floty (`utilization`) na małych danych policzonych ręcznie.
+"""
+from datetime import date
+
+import numpy as np
+import pytest
+
+from utilization import Utilization, periods, rented_days
+
+
+def test_periods_by_day():
+    assert periods(date(2024, 2, 28), date(2024, 3, 1), 'dzien') == [
+        (date(2024, 2, 28), date(2024, 2, 28)),
+        (date(2024, 2, 29), date(2024, 2, 29)),
+        (date(2024, 3, 1), date(2024, 3, 1)),
+    ]
+
+
+def test_periods_by_week_start_on_monday_and_are_clipped():
+    # 2024-01-31 to środa, 2024-02-12 - poniedziałek.
+    assert periods(date(2024, 1, 31), date(2024, 2, 12), 'tydzien') == [
+        (date(2024, 1, 31), date(2024, 2, 4)),
+        (date(2024, 2, 5), date(2024, 2, 11)),
+        (date(2024, 2, 12), date(2024, 2, 12)),
+    ]
+
+
+def test_periods_by_month_cross_year_and_leap_february():
+    assert periods(date(2023, 12, 20), date(2024, 3, 10), 'miesiac') == [
+        (date(2023, 12, 20), date(2023, 12, 31)),
+        (date(2024, 1, 1), date(2024, 1, 31)),
+        (date(2024, 2, 1), date(2024, 2, 29)),
+        (date(2024, 3, 1), date(2024, 3, 10)),
+    ]
+
+
+def test_periods_reject_unknown_granularity():
+    with pytest.raises(ValueError):
+        periods(date(2024, 1, 1), date(2024, 1, 31), 'rok')
+
+
+# Okres 10 dni podzielony na podokresy dni 0-2, 3-6 i 7-9.
+OFFSETS = np.array([0, 3, 7])
+
+
+@pytest.mark.parametrize('max_cells', [4_000_000, 11])
+def test_rented_days_counts_inclusive_days_per_period(max_cells):
+    # Auto 0: dni 0-1 i zaraz potem 2-4 (przez granicę podokresów); auto 1: dni 5-6 i ostatni dzień okresu;
+    # auto 2: bez wypożyczeń. max_cells=11 wymusza przetwarzanie po jednym aucie.
+    positions = np.array([0, 0, 1, 1])
+    first = np.array([0, 2, 5, 9])
+    last = np.array([1, 4, 6, 9])
+    result = rented_days(positions, first, last, 3, 10, OFFSETS, max_cells)
+    np.testing.assert_array_equal(result, [[3, 2, 0], [0, 2, 1], [0, 0, 0]])
+
+
+def test_rented_days_counts_overlapping_rentals_once():
+    positions = np.array([0, 0])
+    first = np.array([0, 3])
+    last = np.array([5, 7])
+    result = rented_days(positions, first, last, 1, 10, OFFSETS, 4_000_000)
+    np.testing.assert_array_equal(result, [[3, 4, 1]])
+
+
+def sample_utilization():
+    cars = [
+        (1, 'Corolla', 'Toyota', 'AAA', 'B'),
+        (2, 'Corolla', 'Toyota', 'BBB', 'B'),
+        (3, 'X5', 'BMW', 'CCC', 'E'),
+    ]
+    parts = [(date(2024, 1, 1), date(2024, 1, 10)), (date(2024, 1, 11), date(2024, 1, 20))]
+    days = np.array([[10, 5], [0, 5], [2, 0]], dtype=np.int16)
+    return Utilization(date(2024, 1, 1), date(2024, 1, 20), 'dzien', parts, cars, days)
+
+
+def test_rows_by_car():
+    assert sample_utilization().rows('auto') == [
+        ('Toyota Corolla (AAA)', 1, [100.0, 50.0], 75.0),
+        ('Toyota Corolla (BBB)', 1, [0.0, 50.0], 25.0),
+        ('BMW X5 (CCC)', 1, [20.0, 0.0], 10.0),
+    ]
+
+
+def test_rows_by_model_and_class_sum_their_cars():
+    utilization = sample_utilization()
+    assert utilization.rows('model') == [
+        ('Toyota Corolla', 2, [50.0, 50.0], 50.0),
+        ('BMW X5', 1, [20.0, 0.0], 10.0),
+    ]
+    assert utilization.rows('klasa') == [
+        ('B', 2, [50.0, 50.0], 50.0),
+        ('E', 1, [20.0, 0.0], 10.0),
+    ]
+
+
+def test_fleet_and_unknown_level():
+    utilization = sample_utilization()
+    assert utilization.fleet() == ([40.0, 33.3], 36.7)
+    with pytest.raises(ValueError):
+        utilization.rows('marka')
@@ -0,0 +1,236 @@
+"""
+Wykorzystanie floty: odsetek dni, w których auta były wypożyczone, w dowolnym okresie.
+
+Wypożyczenia nakładające się na okres ładowane są jednym zapytaniem do tablic NumPy (pozycja auta,
+pierwszy i ostatni dzień przycięte do okresu). Dla każdego auta budowana jest tablica różnic po dniach
+(+1 w dniu wypożyczenia, -1 dzień po oddaniu), której suma skumulowana daje zajętość auta w każdym dniu,
+a suma po dniach podokresu (`np.add.reduceat`) - liczbę dni wypożyczenia w dniu, tygodniu lub miesiącu.
+Macierz auta x dni przetwarzana jest porcjami aut, aby jej rozmiar nie przekraczał `max_cells` komórek.
+Wyniki dla modeli i klas są sumami wyników ich aut.
+
+Dzień wypożyczenia i dzień oddania liczą się jako dni wypożyczenia (jak `okres` = `daterange(..., '[]')`,
+w którym auto jest niedostępne). Uwzględniane są auta obecne we flocie.
+
+`free_cars_per_day` tą samą metodą (bez podziału na auta) liczy, ile aut modelu, marki lub klasy jest wolnych
+w każdym dniu okresu.
+"""
+from datetime import date, timedelta
+
+import numpy as np
+
+GRANULARITIES = ('dzien', 'tydzien', 'miesiac')
+LEVELS = ('auto', 'model', 'klasa')
+
+
+def periods(start, end, granularity):
+    """
+    Dzieli okres [start, end] na dni, tygodnie (od poniedziałku) lub miesiące kalendarzowe.
+
+    Pierwszy i ostatni podokres są przycinane do granic okresu.
+
+    Returns:
+        list[tuple[date, date]]: Pierwszy i ostatni dzień każdego podokresu.
+    """
+    if granularity not in GRANULARITIES:
+        raise ValueError(f"Nieznana szczegółowość: {granularity} (dostępne: {', '.join(GRANULARITIES)}).")
+    result = []
+    current = start
+    while current <= end:
+        if granularity == 'dzien':
+            last = current
+        elif granularity == 'tydzien':
+            last = current + timedelta(days=6 - current.weekday())
+        else:
+            next_month = date(current.year + current.month // 12, current.month % 12 + 1, 1)
+            last = next_month - timedelta(days=1)
+        last = min(last, end)
+        result.append((current, last))
+        current = last + timedelta(days=1)
+    return result
+
+
+def rented_days(car_positions, first_days, last_days, car_count, day_count, period_offsets, max_cells):
+    """
+    Liczy dni wypożyczenia każdego auta w każdym podokresie.
+
+    Args:
+        car_positions (ndarray): Pozycja auta każdego wypożyczenia (0..car_count-1), posortowane rosnąco.
+        first_days (ndarray): Pierwszy dzień wypożyczenia względem początku okresu (przycięty do 0).
+        last_days (ndarray): Ostatni dzień wypożyczenia względem początku okresu (przycięty do day_count-1).
+        car_count (int): Liczba aut.
+        day_count (int): Liczba dni okresu.
+        period_offsets (ndarray): Pierwszy dzień każdego podokresu względem początku okresu.
+        max_cells (int): Maksymalny rozmiar przetwarzanej naraz macierzy auta x dni.
+
+    Returns:
+        ndarray: Macierz auta x podokresy z liczbą dni wypożyczenia (int16).
+    """
+    result = np.zeros((car_count, len(period_offsets)), dtype=np.int16)
+    chunk = max(max_cells // (day_count + 1), 1)
+    for first_car in range(0, car_count, chunk):
+        last_car = min(first_car + chunk, car_count)
+        lo, hi = np.searchsorted(car_positions, [first_car, last_car])
+        rows = car_positions[lo:hi] - first_car
+        # Dodatkowa kolumna przyjmuje -1 wypożyczeń trwających do ostatniego dnia okresu.
+        diff = np.zeros((last_car - first_car, day_count + 1), dtype=np.int32)
+        np.add.at(diff, (rows, first_days[lo:hi]), 1)
+        np.add.at(diff, (rows, last_days[lo:hi] + 1), -1)
+        occupied = np.cumsum(diff[:, :-1], axis=1) > 0
+        result[first_car:last_car] = np.add.reduceat(occupied, period_offsets, axis=1, dtype=np.int16)
+    return result
+
+
+def free_cars_per_day(connection, start, end, id_model=None, id_marka=None, id_klasa=None):
+    """
+    Liczy auta wolne w każdym dniu okresu jednym przejściem po wypożyczeniach (miotła po dniach).
+
+    Każde wypożyczenie nakładające się na okres dodaje +1 w swoim pierwszym dniu i -1 dzień po ostatnim;
+    suma skumulowana daje liczbę wypożyczonych aut w każdym dniu. Auto nie może mieć nakładających się
+    wypożyczeń (`wyklucz_nakladajace_sie_wypozyczenia`), więc różnica z liczbą aut to liczba aut wolnych,
+    tak jak w `dostepne_auta_w_danym_terminie` dla okresu jednodniowego.
+
+    Args:
+        connection (connection): Połączenie psycopg2.
+        start (date): Pierwszy dzień okresu.
+        end (date): Ostatni dzień okresu.
+        id_model (int): Ogranicza auta do modelu.
+        id_marka (int): Ogranicza auta do marki.
+        id_klasa (int): Ogranicza auta do klasy.
+
+    Returns:
+        tuple: (liczba aut, ndarray z liczbą wolnych aut w kolejnych dniach).
+    """
+    params = {'od': start, 'do': end, 'id_model': id_model, 'id_marka': id_marka, 'id_klasa': id_klasa}
+    condition = " and ".join(f"sa.{column} = %({column})s" for column in ('id_model', 'id_marka', 'id_klasa')
+                             if params[column] is not None) or "true"
+    cursor = connection.cursor()
+    cursor.execute(f"select count(*) from wypozyczalnia.szczegoly_aut sa where {condition}", params)
+    car_count = cursor.fetchone()[0]
+    cursor.execute(f"""
+        select greatest(w.data_wypozyczenia, %(od)s) - %(od)s, least(w.data_oddania, %(do)s) - %(od)s
+        from wypozyczalnia.wypozyczenia w
+        join wypozyczalnia.szczegoly_aut sa on sa.id_auto = w.id_auto
+        where w.okres && daterange(%(od)s, %(do)s, '[]') and {condition}""", params)
+    rentals = np.array(cursor.fetchall(), dtype=np.int64).reshape(-1, 2)
+    cursor.close()
+    day_count = (end - start).days + 1
+    diff = (np.bincount(rentals[:, 0], minlength=day_count + 1)
+            - np.bincount(rentals[:, 1] + 1, minlength=day_count + 1))
+    return car_count, car_count - np.cumsum(diff[:-1])
+
+
+class Utilization:
+    """
+    Dni wypożyczenia aut floty w podokresach danego okresu.
+
+    Attributes:
+        start (date): Pierwszy dzień okresu.
+        end (date): Ostatni dzień okresu.
+        granularity (str): Szczegółowość podokresów (`GRANULARITIES`).
+        periods (list[tuple[date, date]]): Podokresy.
+        cars (list[tuple]): Auta: (id_auto, nazwa_modelu, nazwa_marki, numer_rejestracyjny, nazwa_klasy).
+        days (ndarray): Macierz auta x podokresy z liczbą dni wypożyczenia.
+    """
+
+    def __init__(self, start, end, granularity, periods, cars, days):
+        self.start = start
+        self.end = end
+        self.granularity = granularity
+        self.periods = periods
+        self.cars = cars
+        self.days = days
+
+    @classmethod
+    def load(cls, connection, start, end, granularity, max_periods=400, max_cells=4_000_000):
+        """
+        Wczytuje auta i wypożyczenia nakładające się na okres i liczy ich dni wypożyczenia.
+
+        Args:
+            connection (connection): Połączenie psycopg2.
+            start (date): Pierwszy dzień okresu.
+            end (date): Ostatni dzień okresu.
+            granularity (str): 'dzien', 'tydzien' lub 'miesiac'.
+            max_periods (int): Maksymalna liczba podokresów.
+            max_cells (int): Patrz `rented_days`.
+
+        Raises:
+            ValueError: Gdy okres jest pusty, szczegółowość nieznana lub podokresów jest więcej niż `max_periods`.
+        """
+        if start > end:
+            raise ValueError("Data rozpoczęcia nie może być późniejsza niż data zakończenia.")
+        parts = periods(start, end, granularity)
+        if len(parts) > max_periods:
+            raise ValueError(f"Okres dzieli się na {len(parts)} podokresów, dopuszczalne jest {max_periods}; "
+                             f"wybierz krótszy okres lub mniejszą szczegółowość.")
+        cursor = connection.cursor()
+        cursor.execute("""
+            select id_auto, nazwa_modelu, nazwa_marki, numer_rejestracyjny, nazwa_klasy
+            from wypozyczalnia.szczegoly_aut
+            order by id_auto""")
+        cars = cursor.fetchall()
+        cursor.execute("""
+            select id_auto, greatest(data_wypozyczenia, %(od)s) - %(od)s, least(data_oddania, %(do)s) - %(od)s
+            from wypozyczalnia.wypozyczenia
+            where okres && daterange(%(od)s, %(do)s, '[]')""", {'od': start, 'do': end})
+        rentals = np.array(cursor.fetchall(), dtype=np.int64).reshape(-1, 3)
+        cursor.close()
+
+        car_ids = np.array([car[0] for car in cars], dtype=np.int64)
+        positions = np.searchsorted(car_ids, rentals[:, 0])
+        known = positions < len(car_ids)
+        known[known] = car_ids[positions[known]] == rentals[known, 0]
+        order = np.argsort(positions[known], kind='stable')
+        day_count = (end - start).days + 1
+        offsets = np.array([(first - start).days for first, _ in parts], dtype=np.int64)
+        days = rented_days(positions[known][order], rentals[known, 1][order], rentals[known, 2][order],
+                           len(cars), day_count, offsets, max_cells)
+        return cls(start, end, granularity, parts, cars, days)
+
+    @property
+    def period_lengths(self):
+        return np.array([(last - first).days + 1 for first, last in self.periods], dtype=np.int64)
+
+    def rows(self, level):
+        """
+        Zwraca wykorzystanie aut, modeli lub klas.
+
+        Args:
+            level (str): 'auto', 'model' lub 'klasa'.
+
+        Returns:
+            list[tuple]: (opis, liczba aut, [wykorzystanie w podokresach w %], wykorzystanie w całym okresie w %),
+                od najbardziej wykorzystanych.
+        """
+        if level not in LEVELS:
+            raise ValueError(f"Nieznany poziom: {level} (dostępne: {', '.join(LEVELS)}).")
+        if level == 'auto':
+            labels = [(f"{marka} {model} ({numer})",) for _, model, marka, numer, _ in self.cars]
+        elif level == 'model':
+            labels = [(f"{marka} {model}",) for _, model, marka, _, _ in self.cars]
+        else:
+            labels = [(klasa,) for _, _, _, _, klasa in self.cars]
+        groups = sorted(set(labels))
+        group_of = {label: position for position, label in enumerate(groups)}
+        group_index = np.array([group_of[label] for label in labels], dtype=np.int64)
+
+        rented = np.zeros((len(groups), len(self.periods)), dtype=np.int64)
+        np.add.at(rented, group_index, self.days)
+        car_counts = np.bincount(group_index, minlength=len(groups))
+        lengths = self.period_lengths
+        share = 100 * rented / (car_counts[:, None] * lengths[None, :])
+        total = 100 * rented.sum(axis=1) / (car_counts * lengths.sum())
+        result = [(label[0], int(count), [round(float(value), 1) for value in values], round(float(overall), 1))
+                  for label, count, values, overall in zip(groups, car_counts, share, total)]
+        result.sort(key=lambda row: (-row[3], row[0]))
+        return result
+
+    def fleet(self):
+        """
+        Zwraca wykorzystanie całej floty: ([wykorzystanie w podokresach w %], wykorzystanie w całym okresie w %).
+        """
+        if not self.cars:
+            return [0.0] * len(self.periods), 0.0
+        lengths = self.period_lengths
+        rented = self.days.sum(axis=0, dtype=np.int64)
+        share = 100 * rented / (len(self.cars) * lengths)
+        return [round(float(value), 1) for value in share], round(float(100 * rented.sum() / (len(self.cars) * lengths.sum())), 1)